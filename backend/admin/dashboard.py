@@ -1,9 +1,16 @@
 # backend/admin/dashboard.py
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from decimal import Decimal
+from typing import Dict, Any, List, Optional
 from sqlalchemy import func, and_
 from ..core.database import Session
 from ..core import models
+from .rollups import WATERMARK as ROLLUP_WATERMARK, floor_hour
+
+USER_SUMMARY_COLUMNS = (
+    "day", "tx_count", "deposit_amount", "withdrawal_amount",
+    "stake_amount", "win_amount", "loss_amount", "games_played"
+)
 
 class AdminDashboard:
     """کلاس برای مدیریت داده‌های داشبورد ادمین"""
@@ -11,8 +18,35 @@ class AdminDashboard:
     def __init__(self, db: Session):
         self.db = db
     
-    def get_system_stats(self) -> Dict[str, Any]:
-        """دریافت آمار کلی سیستم"""
+    def get_counters(self) -> Dict[str, Decimal]:
+        """مقدار شمارنده‌های پیش‌محاسبه شده (جمع shardهای هر شمارنده)"""
+        rows = self.db.query(models.StatsCounter.name, func.sum(models.StatsCounter.value))\
+            .group_by(models.StatsCounter.name)\
+            .all()
+        return {name: value for name, value in rows}
+
+    def get_system_stats(self, exact: bool = False) -> Dict[str, Any]:
+        """دریافت آمار کلی سیستم
+
+        به صورت پیش‌فرض از شمارنده‌های پیش‌محاسبه شده خوانده می‌شود (بدون
+        اسکن جدول‌ها)؛ با exact=True یا در نبود شمارنده‌ها مستقیماً شمرده می‌شود.
+        """
+        if not exact:
+            counters = self.get_counters()
+            if counters:
+                return {
+                    "total_users": int(counters.get("users", 0)),
+                    "active_users": int(counters.get("active_users", 0)),
+                    "total_transactions": int(counters.get("transactions", 0)),
+                    "deposit_amount": counters.get(f"transactions:amount:{models.TransactionType.DEPOSIT.name}", 0),
+                    "withdrawal_amount": counters.get(f"transactions:amount:{models.TransactionType.WITHDRAWAL.name}", 0),
+                    "total_games": int(counters.get("games", 0)),
+                    "active_games": int(counters.get(f"games:{models.GameStatus.ACTIVE.name}", 0))
+                }
+        return self.get_exact_system_stats()
+
+    def get_exact_system_stats(self) -> Dict[str, Any]:
+        """آمار کلی سیستم با شمارش مستقیم جدول‌ها"""
         stats = {}
         
         # تعداد کاربران
@@ -38,6 +72,56 @@ class AdminDashboard:
         
         return stats
     
+    def get_rollup_high_water(self) -> Optional[datetime]:
+        """زمانی که خلاصه‌های زمانی تا آن محاسبه شده‌اند (None اگر هنوز ساخته نشده‌اند)"""
+        return self.db.query(models.RollupWatermark.high_water)\
+            .filter(models.RollupWatermark.name == ROLLUP_WATERMARK)\
+            .scalar()
+
+    def count_new_users(self, start_date: datetime, end_date: datetime) -> int:
+        """تعداد کاربران جدید: خلاصه‌های ساعتی تا high-water mark و شمارش مستقیم پس از آن
+
+        ساعت شروع به صورت کامل شمرده می‌شود.
+        """
+        high_water = self.get_rollup_high_water()
+        if high_water is None:
+            high_water = start_date
+            rolled_up = 0
+        else:
+            high_water = min(high_water, end_date)
+            rolled_up = self.db.query(func.coalesce(func.sum(models.ActivityRollupHourly.new_users), 0))\
+                .filter(
+                    models.ActivityRollupHourly.bucket >= floor_hour(start_date),
+                    models.ActivityRollupHourly.bucket < high_water
+                )\
+                .scalar()
+        recent = self.db.query(func.count(models.User.id))\
+            .filter(and_(
+                models.User.created_at >= max(high_water, start_date),
+                models.User.created_at <= end_date
+            ))\
+            .scalar()
+        return int(rolled_up) + recent
+
+    def get_daily_activity(self, start_date: datetime) -> List[Dict[str, Any]]:
+        """سری روزانه تراکنش‌ها (به تفکیک نوع و نوع بازی)، بازی‌ها و کاربران جدید"""
+        rows = self.db.query(models.ActivityRollupDaily)\
+            .filter(models.ActivityRollupDaily.bucket >= start_date.date())\
+            .order_by(models.ActivityRollupDaily.bucket)\
+            .all()
+        return [
+            {
+                "day": row.bucket,
+                "game_type": row.game_type or None,
+                "transaction_type": row.transaction_type or None,
+                "tx_count": row.tx_count,
+                "tx_amount": row.tx_amount,
+                "games_created": row.games_created,
+                "new_users": row.new_users
+            }
+            for row in rows
+        ]
+
     def get_recent_activity(self, days: int = 7) -> Dict[str, Any]:
         """دریافت فعالیت‌های اخیر"""
         end_date = datetime.utcnow()
@@ -46,12 +130,10 @@ class AdminDashboard:
         activity = {}
         
         # کاربران جدید
-        activity["new_users"] = self.db.query(models.User)\
-            .filter(and_(
-                models.User.created_at >= start_date,
-                models.User.created_at <= end_date
-            ))\
-            .count()
+        activity["new_users"] = self.count_new_users(start_date, end_date)
+        
+        # سری روزانه از خلاصه‌های پیش‌محاسبه شده
+        activity["daily"] = self.get_daily_activity(start_date)
         
         # تراکنش‌های اخیر
         activity["recent_transactions"] = self.db.query(models.Transaction)\
@@ -75,7 +157,7 @@ class AdminDashboard:
         
         return activity
     
-    def get_user_activity_report(self, user_id: str) -> Dict[str, Any]:
+    def get_user_activity_report(self, user_id: str, days: int = 90) -> Dict[str, Any]:
         """گزارش فعالیت کاربر"""
         report = {}
         
@@ -100,6 +182,24 @@ class AdminDashboard:
             "locked_credit": wallet.locked_credit if wallet else 0
         }
         
+        # خلاصه روزانه تراکنش‌ها در days روز گذشته (حداکثر یک ردیف برای هر روز)
+        since = (datetime.utcnow() - timedelta(days=days)).date()
+        summaries = self.db.query(models.UserDailySummary)\
+            .filter(
+                models.UserDailySummary.user_id == user_id,
+                models.UserDailySummary.day >= since
+            )\
+            .order_by(models.UserDailySummary.day)\
+            .all()
+        report["daily_summary"] = [
+            {column: getattr(summary, column) for column in USER_SUMMARY_COLUMNS}
+            for summary in summaries
+        ]
+        report["totals"] = {
+            column: sum((getattr(summary, column) for summary in summaries), 0)
+            for column in USER_SUMMARY_COLUMNS if column != "day"
+        }
+        
         # آخرین تراکنش‌ها
         report["recent_transactions"] = self.db.query(models.Transaction)\
             .filter(models.Transaction.user_id == user_id)\
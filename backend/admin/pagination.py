@@ -0,0 +1,74 @@
+# backend/admin/pagination.py
+import base64
+import binascii
+import struct
+import uuid
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple, Type
+from pydantic import BaseModel
+from sqlalchemy import or_
+from sqlalchemy.orm import Query
+
+# cursor: زمان ایجاد (میکروثانیه از epoch) و شناسه آخرین ردیف صفحه قبل
+CURSOR = struct.Struct("<q16s")
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+EXPORT_BATCH_SIZE = 1000
+
+def encode_cursor(created_at: datetime, row_id: uuid.UUID) -> str:
+    """ساخت توکن مات cursor از کلید (created_at, id)"""
+    packed = CURSOR.pack((created_at - EPOCH) // MICROSECOND, row_id.bytes)
+    return base64.urlsafe_b64encode(packed).rstrip(b"=").decode()
+
+def decode_cursor(token: str) -> Tuple[datetime, uuid.UUID]:
+    """بازگرداندن کلید (created_at, id) از توکن cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        micros, row_id = CURSOR.unpack(raw)
+    except (binascii.Error, struct.error, ValueError):
+        raise ValueError("Invalid cursor")
+    return EPOCH + micros * MICROSECOND, uuid.UUID(bytes=row_id)
+
+def apply_keyset(query: Query, model, cursor: Optional[str] = None) -> Query:
+    """مرتب‌سازی نزولی روی (created_at, id) و شروع از بعد از cursor
+
+    شرط به شکل created_at <= t AND (created_at < t OR id < i) نوشته می‌شود تا
+    ایندکس‌های created_at مستقیماً برای بازه استفاده شوند و هزینه هر صفحه
+    مستقل از عمق آن باشد.
+    """
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(
+            model.created_at <= created_at,
+            or_(model.created_at < created_at, model.id < row_id)
+        )
+    return query
+
+def fetch_page(query: Query, model, cursor: Optional[str], limit: int) -> Tuple[List, Optional[str]]:
+    """یک صفحه از ردیف‌ها و cursor صفحه بعد (None در صفحه آخر)"""
+    rows = apply_keyset(query, model, cursor).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+def stream_ndjson(
+    query: Query,
+    model,
+    schema: Type[BaseModel],
+    cursor: Optional[str] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[str]:
+    """خروجی NDJSON همه ردیف‌ها، دسته به دسته با همان keyset
+
+    اشیاء هر دسته پس از ارسال از session جدا می‌شوند تا حافظه ثابت بماند.
+    """
+    while True:
+        rows, cursor = fetch_page(query, model, cursor, batch_size)
+        for row in rows:
+            yield schema.from_orm(row).json() + "\n"
+        query.session.expunge_all()
+        if cursor is None:
+            return
@@ -0,0 +1,157 @@
+# backend/admin/rollups.py
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from sqlalchemy import text
+from ..core.database import Session
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+WATERMARK = "activity"
+
+INIT_WATERMARK = text("""
+    INSERT INTO rollup_watermarks (name, high_water) VALUES (:name, NULL)
+    ON CONFLICT (name) DO NOTHING
+""")
+
+LOCK_WATERMARK = text("SELECT high_water FROM rollup_watermarks WHERE name = :name FOR UPDATE")
+
+EARLIEST_ROW = text("""
+    SELECT LEAST(
+        (SELECT min(created_at) FROM transactions),
+        (SELECT min(created_at) FROM games),
+        (SELECT min(created_at) FROM users)
+    )
+""")
+
+# بازه [start, end) دوباره محاسبه و جایگزین می‌شود؛ اجرای تکراری یک بازه بی‌اثر است
+DELETE_HOURLY = text("DELETE FROM activity_rollups_hourly WHERE bucket >= :start")
+
+INSERT_HOURLY = text("""
+    INSERT INTO activity_rollups_hourly
+        (bucket, game_type, transaction_type, tx_count, tx_amount, games_created, new_users)
+    SELECT bucket, game_type, transaction_type,
+           sum(tx_count), sum(tx_amount), sum(games_created), sum(new_users)
+    FROM (
+        SELECT date_trunc('hour', t.created_at) AS bucket,
+               COALESCE(g.game_type::text, '') AS game_type,
+               COALESCE(t.type::text, '') AS transaction_type,
+               1 AS tx_count, COALESCE(t.amount, 0) AS tx_amount,
+               0 AS games_created, 0 AS new_users
+        FROM transactions t
+        LEFT JOIN games g ON g.id = t.reference_id
+        WHERE t.created_at >= :start AND t.created_at < :end
+        UNION ALL
+        SELECT date_trunc('hour', created_at), COALESCE(game_type::text, ''), '', 0, 0, 1, 0
+        FROM games
+        WHERE created_at >= :start AND created_at < :end
+        UNION ALL
+        SELECT date_trunc('hour', created_at), '', '', 0, 0, 0, 1
+        FROM users
+        WHERE created_at >= :start AND created_at < :end
+    ) AS r
+    GROUP BY bucket, game_type, transaction_type
+""")
+
+# روزهای تحت تأثیر از روی ردیف‌های ساعتی بازسازی می‌شوند
+DELETE_DAILY = text("DELETE FROM activity_rollups_daily WHERE bucket >= :day")
+
+INSERT_DAILY = text("""
+    INSERT INTO activity_rollups_daily
+        (bucket, game_type, transaction_type, tx_count, tx_amount, games_created, new_users)
+    SELECT date_trunc('day', bucket)::date, game_type, transaction_type,
+           sum(tx_count), sum(tx_amount), sum(games_created), sum(new_users)
+    FROM activity_rollups_hourly
+    WHERE bucket >= :day
+    GROUP BY 1, game_type, transaction_type
+""")
+
+# فقط (کاربر، روز)هایی که در این بازه تراکنش داشته‌اند، از روی کل آن روز کاربر
+UPSERT_USER_DAILY = text("""
+    INSERT INTO user_daily_summaries
+        (user_id, day, tx_count, deposit_amount, withdrawal_amount,
+         stake_amount, win_amount, loss_amount, games_played)
+    SELECT t.user_id, touched.day, count(*),
+           COALESCE(sum(t.amount) FILTER (WHERE t.type = 'DEPOSIT'), 0),
+           COALESCE(sum(t.amount) FILTER (WHERE t.type = 'WITHDRAWAL'), 0),
+           COALESCE(sum(t.amount) FILTER (WHERE t.type = 'GAME_STAKE'), 0),
+           COALESCE(sum(t.amount) FILTER (WHERE t.type = 'GAME_WIN'), 0),
+           COALESCE(sum(t.amount) FILTER (WHERE t.type = 'GAME_LOSS'), 0),
+           count(*) FILTER (WHERE t.type IN ('GAME_WIN', 'GAME_LOSS'))
+    FROM (
+        SELECT DISTINCT user_id, created_at::date AS day
+        FROM transactions
+        WHERE created_at >= :start AND created_at < :end AND user_id IS NOT NULL
+    ) AS touched
+    JOIN transactions t
+        ON t.user_id = touched.user_id
+       AND t.created_at >= touched.day
+       AND t.created_at < touched.day + interval '1 day'
+       AND t.created_at < :end
+    GROUP BY t.user_id, touched.day
+    ON CONFLICT (user_id, day) DO UPDATE SET
+        tx_count = EXCLUDED.tx_count,
+        deposit_amount = EXCLUDED.deposit_amount,
+        withdrawal_amount = EXCLUDED.withdrawal_amount,
+        stake_amount = EXCLUDED.stake_amount,
+        win_amount = EXCLUDED.win_amount,
+        loss_amount = EXCLUDED.loss_amount,
+        games_played = EXCLUDED.games_played
+""")
+
+UPDATE_WATERMARK = text("UPDATE rollup_watermarks SET high_water = :end WHERE name = :name")
+
+def floor_hour(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+def refresh_rollups(db: Session, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """به‌روزرسانی افزایشی خلاصه‌های ساعتی، روزانه و روزانه هر کاربر
+
+    بازه هر اجرا از high-water mark منهای ROLLUP_LOOKBACK (برای ردیف‌هایی که
+    دیرتر از created_at خود commit شده‌اند) تا اکنون منهای ROLLUP_SAFETY_LAG
+    است و ساعت‌های آن کامل بازسازی می‌شوند. قفل ردیف watermark اجراهای
+    هم‌زمان را پشت سر هم قرار می‌دهد.
+    """
+    now = now or datetime.utcnow()
+    try:
+        db.execute(INIT_WATERMARK, {"name": WATERMARK})
+        high_water = db.execute(LOCK_WATERMARK, {"name": WATERMARK}).scalar()
+        if high_water is None:
+            high_water = db.execute(EARLIEST_ROW).scalar()
+            if high_water is None:
+                db.rollback()
+                return {"status": "empty"}
+            start = floor_hour(high_water)
+        else:
+            start = floor_hour(high_water - timedelta(seconds=settings.ROLLUP_LOOKBACK))
+
+        end = min(
+            now - timedelta(seconds=settings.ROLLUP_SAFETY_LAG),
+            max(high_water, start) + timedelta(seconds=settings.ROLLUP_MAX_WINDOW)
+        )
+        if end <= start:
+            db.rollback()
+            return {"status": "up_to_date", "high_water": high_water.isoformat()}
+
+        params = {"start": start, "end": end, "day": start.replace(hour=0), "name": WATERMARK}
+        db.execute(DELETE_HOURLY, params)
+        hourly = db.execute(INSERT_HOURLY, params).rowcount
+        db.execute(DELETE_DAILY, params)
+        daily = db.execute(INSERT_DAILY, params).rowcount
+        users = db.execute(UPSERT_USER_DAILY, params).rowcount
+        db.execute(UPDATE_WATERMARK, params)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    logger.info(f"Activity rollups refreshed from {start} to {end}")
+    return {
+        "status": "success",
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "hourly_rows": hourly,
+        "daily_rows": daily,
+        "user_days": users
+    }
@@ -1,12 +1,17 @@
 # backend/admin/routes.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import List
+from typing import List, Optional
 import uuid
 from datetime import datetime, timedelta
 from ..core import models, schemas, crud, auth
-from ..core.database import Session, get_db
+from ..core.database import Session, AsyncSession, get_db, get_async_db, get_read_db
 from ..core.config import settings
+from .pagination import decode_cursor, fetch_page, stream_ndjson
+from .dashboard import AdminDashboard
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
 
 router = APIRouter(
     prefix="/admin",
@@ -18,7 +23,7 @@ security = HTTPBearer()
 
 async def get_admin_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """احراز هویت کاربر ادمین"""
     user = await auth.get_current_user_from_token(credentials.credentials, db)
@@ -26,21 +31,52 @@ async def get_admin_user(
         raise HTTPException(status_code=403, detail="Access forbidden")
     return user
 
+def paginate(
+    query,
+    model,
+    schema,
+    response: Response,
+    cursor: Optional[str],
+    limit: int,
+    export: bool
+):
+    """صفحه‌بندی keyset روی (created_at, id) یا خروجی NDJSON کامل
+
+    cursor صفحه بعد در هدر X-Next-Cursor برگردانده می‌شود.
+    """
+    try:
+        if export:
+            # stream_ndjson تنبل است؛ cursor نامعتبر باید پیش از شروع پاسخ 400 بدهد
+            if cursor:
+                decode_cursor(cursor)
+            return StreamingResponse(
+                stream_ndjson(query, model, schema, cursor),
+                media_type=NDJSON_MEDIA_TYPE
+            )
+        rows, next_cursor = fetch_page(query, model, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
 @router.get("/users", response_model=List[schemas.UserResponse])
 async def list_users(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    export: bool = False,
+    db: Session = Depends(get_read_db),
     admin_user: models.User = Depends(get_admin_user)
 ):
-    """لیست تمام کاربران"""
-    users = db.query(models.User).offset(skip).limit(limit).all()
-    return users
+    """لیست تمام کاربران (export=true: خروجی NDJSON همه کاربران)"""
+    query = db.query(models.User)
+    return paginate(query, models.User, schemas.UserResponse, response, cursor, limit, export)
 
 @router.get("/users/{user_id}", response_model=schemas.UserResponse)
 async def get_user_details(
     user_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     admin_user: models.User = Depends(get_admin_user)
 ):
     """دریافت جزئیات کاربر"""
@@ -81,15 +117,17 @@ async def deactivate_user(
 
 @router.get("/transactions", response_model=List[schemas.TransactionResponse])
 async def list_transactions(
+    response: Response,
     user_id: Optional[uuid.UUID] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    export: bool = False,
+    db: Session = Depends(get_read_db),
     admin_user: models.User = Depends(get_admin_user)
 ):
-    """لیست تراکنش‌ها با امکان فیلتر"""
+    """لیست تراکنش‌ها با امکان فیلتر (export=true: خروجی NDJSON همه نتایج)"""
     query = db.query(models.Transaction)
     
     if user_id:
@@ -101,19 +139,20 @@ async def list_transactions(
     if end_date:
         query = query.filter(models.Transaction.created_at <= end_date)
     
-    transactions = query.order_by(models.Transaction.created_at.desc()).offset(skip).limit(limit).all()
-    return transactions
+    return paginate(query, models.Transaction, schemas.TransactionResponse, response, cursor, limit, export)
 
 @router.get("/games", response_model=List[schemas.GameResponse])
 async def list_games(
+    response: Response,
     status: Optional[schemas.GameStatus] = None,
     game_type: Optional[schemas.GameType] = None,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    export: bool = False,
+    db: Session = Depends(get_read_db),
     admin_user: models.User = Depends(get_admin_user)
 ):
-    """لیست بازی‌ها با امکان فیلتر"""
+    """لیست بازی‌ها با امکان فیلتر (export=true: خروجی NDJSON همه نتایج)"""
     query = db.query(models.Game)
     
     if status:
@@ -122,8 +161,16 @@ async def list_games(
     if game_type:
         query = query.filter(models.Game.game_type == game_type)
     
-    games = query.order_by(models.Game.created_at.desc()).offset(skip).limit(limit).all()
-    return games
+    return paginate(query, models.Game, schemas.GameResponse, response, cursor, limit, export)
+
+@router.get("/stats")
+async def get_system_stats(
+    exact: bool = False,
+    db: Session = Depends(get_read_db),
+    admin_user: models.User = Depends(get_admin_user)
+):
+    """آمار کلی سیستم از شمارنده‌های پیش‌محاسبه شده (exact=true: شمارش مستقیم)"""
+    return AdminDashboard(db).get_system_stats(exact=exact)
 
 @router.post("/system/maintenance")
 async def toggle_maintenance_mode(
@@ -7,7 +7,7 @@ import os
 import sys
 
 # اضافه کردن مسیر پروژه به sys.path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
 
 from backend.core.config import settings
 from backend.core.database import Base
@@ -17,7 +17,7 @@ from backend.core.models import *  # noqa
 config = context.config
 
 # تنظیم URL دیتابیس از تنظیمات پروژه
-config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
+config.set_main_option("sqlalchemy.url", str(settings.DATABASE_URL))
 
 # پیکربندی لاگرها
 if config.config_file_name is not None:
@@ -41,6 +41,14 @@ def run_migrations_offline() -> None:
 
 def run_migrations_online() -> None:
     """اجرای مهاجرت‌ها در حالت آنلاین"""
+    # اتصال آماده (مثلاً در تست‌ها) از config.attributes گرفته می‌شود
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
@@ -0,0 +1,85 @@
+# backend/core/alembic/versions/0001_baseline_schema.py
+"""baseline schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 10:00:00
+
+جداول موجود (که تا کنون با create_all ساخته می‌شدند). روی دیتابیس‌های
+موجود به جای اجرا: alembic stamp 0001
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# شناسه‌های بازنگری
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'users',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('username', sa.String(50), nullable=False, unique=True),
+        sa.Column('email', sa.String(100), nullable=True, unique=True),
+        sa.Column('phone', sa.String(15), nullable=True, unique=True),
+        sa.Column('password_hash', sa.String(255), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('is_verified', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_login', sa.DateTime(), nullable=True),
+    )
+    op.create_table(
+        'wallets',
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('credit', sa.Integer(), nullable=True),
+        sa.Column('real_balance', sa.Numeric(15, 2), nullable=True),
+        sa.Column('locked_credit', sa.Integer(), nullable=True),
+        sa.Column('last_transaction', sa.DateTime(), nullable=True),
+    )
+    op.create_table(
+        'transactions',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('amount', sa.Numeric(15, 2), nullable=True),
+        sa.Column('type', sa.Enum(
+            'DEPOSIT', 'WITHDRAWAL', 'GAME_STAKE', 'GAME_WIN', 'GAME_LOSS', 'COMMISSION',
+            name='transactiontype'
+        ), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('reference_id', postgresql.UUID(as_uuid=True), nullable=True),
+    )
+    op.create_table(
+        'games',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('game_type', sa.Enum('CRASH', 'POKER', 'HOKM', 'RPS', name='gametype'), nullable=True),
+        sa.Column('status', sa.Enum('WAITING', 'ACTIVE', 'COMPLETED', 'ABORTED', name='gamestatus'), nullable=True),
+        sa.Column('stake', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.Column('winner', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('prize_pool', sa.Integer(), nullable=True),
+    )
+    op.create_table(
+        'game_players',
+        sa.Column('game_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('games.id'), primary_key=True),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('joined_at', sa.DateTime(), nullable=True),
+        sa.Column('position', sa.Integer(), nullable=True),
+        sa.Column('credit_change', sa.Integer(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('game_players')
+    op.drop_table('games')
+    op.drop_table('transactions')
+    op.drop_table('wallets')
+    op.drop_table('users')
+    for enum_name in ('gamestatus', 'gametype', 'transactiontype'):
+        op.execute(f"DROP TYPE IF EXISTS {enum_name}")
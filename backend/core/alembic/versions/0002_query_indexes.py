@@ -0,0 +1,44 @@
+# backend/core/alembic/versions/0002_query_indexes.py
+"""composite indexes for games, game_players and users
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:05:00
+
+ایندکس‌ها به صورت CONCURRENTLY ساخته می‌شوند تا جدول‌ها در حین ساخت
+قفل نوشتن نگیرند (خارج از تراکنش مهاجرت).
+
+- games(status, created_at): list_games با فیلتر وضعیت و بازی‌های رها شده در cleanup_old_games
+- games(status, completed_at): بازی‌های تکمیل شده قدیمی در cleanup_old_games
+- games(created_at): list_games بدون فیلتر و فعالیت‌های اخیر داشبورد
+- game_players(user_id): آخرین بازی‌های کاربر در get_user_activity_report
+- users(created_at): شمارش کاربران جدید در داشبورد
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# شناسه‌های بازنگری
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_games_status_created_at', 'games', ['status', sa.text('created_at DESC')]),
+    ('ix_games_status_completed_at', 'games', ['status', 'completed_at']),
+    ('ix_games_created_at', 'games', [sa.text('created_at DESC')]),
+    ('ix_game_players_user_id', 'game_players', ['user_id']),
+    ('ix_users_created_at', 'users', ['created_at']),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,117 @@
+# backend/core/alembic/versions/0003_partition_transactions.py
+"""partition transactions by month with composite indexes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 10:10:00
+
+جدول transactions به جدول پارتیشن‌بندی شده بر اساس ماه created_at تبدیل
+می‌شود؛ کوئری‌های بازه زمانی فقط پارتیشن‌های لازم را می‌خوانند و حذف
+داده‌های قدیمی با DETACH/DROP یک پارتیشن انجام می‌شود. کلید اصلی باید
+ستون پارتیشن را شامل شود: (id, created_at).
+
+ایندکس‌ها روی جدول والد تعریف می‌شوند و به همه پارتیشن‌ها منتقل می‌شوند:
+- (user_id, created_at DESC): list_transactions با فیلتر کاربر و get_user_activity_report
+- (type, created_at DESC): جمع واریز/برداشت داشبورد و check_pending_payments
+- (created_at DESC): list_transactions بدون فیلتر و فعالیت‌های اخیر
+- (reference_id, type) برای ردیف‌های دارای reference_id: بررسی تسویه تکراری بازی
+
+داده‌ها در همین مهاجرت کپی می‌شوند و جدول در این مدت قفل است؛ روی
+دیتابیس‌های بزرگ در پنجره تعمیرات اجرا شود. پارتیشن‌های ماه‌های آینده
+با وظیفه ensure_transaction_partitions ساخته می‌شوند.
+"""
+from alembic import op
+
+# شناسه‌های بازنگری
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+# تعداد ماه‌های آینده که پارتیشن آن‌ها از قبل ساخته می‌شود
+MONTHS_AHEAD = 3
+
+CREATE_PARTITION_FUNCTION = """
+CREATE OR REPLACE FUNCTION create_transactions_partition(month date) RETURNS text AS $$
+DECLARE
+    start_at date := date_trunc('month', month)::date;
+    partition_name text := 'transactions_' || to_char(start_at, 'YYYY_MM');
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF transactions FOR VALUES FROM (%L) TO (%L)',
+        partition_name, start_at, (start_at + interval '1 month')::date
+    );
+    RETURN partition_name;
+END
+$$ LANGUAGE plpgsql
+"""
+
+INDEXES = [
+    "CREATE INDEX ix_transactions_user_id_created_at ON transactions (user_id, created_at DESC)",
+    "CREATE INDEX ix_transactions_type_created_at ON transactions (type, created_at DESC)",
+    "CREATE INDEX ix_transactions_created_at ON transactions (created_at DESC)",
+    "CREATE INDEX ix_transactions_reference_id_type ON transactions (reference_id, type) "
+    "WHERE reference_id IS NOT NULL",
+]
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE transactions RENAME TO transactions_unpartitioned")
+    op.execute("ALTER TABLE transactions_unpartitioned RENAME CONSTRAINT transactions_pkey TO transactions_unpartitioned_pkey")
+    op.execute("""
+        CREATE TABLE transactions (
+            id uuid NOT NULL,
+            user_id uuid REFERENCES users (id),
+            amount numeric(15, 2),
+            type transactiontype,
+            description text,
+            created_at timestamp without time zone NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+            reference_id uuid,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute(CREATE_PARTITION_FUNCTION)
+
+    # یک پارتیشن برای هر ماه از قدیمی‌ترین تراکنش تا چند ماه آینده
+    op.execute(f"""
+        SELECT create_transactions_partition(month::date)
+        FROM generate_series(
+            date_trunc('month', COALESCE((SELECT min(created_at) FROM transactions_unpartitioned), now())),
+            date_trunc('month', now()) + interval '{MONTHS_AHEAD} months',
+            interval '1 month'
+        ) AS month
+    """)
+    # فقط برای اطمینان؛ با ساخت پیشاپیش پارتیشن‌ها باید خالی بماند
+    op.execute("CREATE TABLE transactions_default PARTITION OF transactions DEFAULT")
+
+    op.execute("""
+        INSERT INTO transactions (id, user_id, amount, type, description, created_at, reference_id)
+        SELECT id, user_id, amount, type, description,
+               COALESCE(created_at, now() AT TIME ZONE 'utc'), reference_id
+        FROM transactions_unpartitioned
+    """)
+    op.execute("DROP TABLE transactions_unpartitioned")
+
+    # ساخت ایندکس‌ها پس از کپی داده سریع‌تر از به‌روزرسانی آن‌ها ردیف به ردیف است
+    for statement in INDEXES:
+        op.execute(statement)
+    op.execute("ANALYZE transactions")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE transactions RENAME TO transactions_partitioned")
+    op.execute("ALTER TABLE transactions_partitioned RENAME CONSTRAINT transactions_pkey TO transactions_partitioned_pkey")
+    op.execute("""
+        CREATE TABLE transactions (
+            id uuid PRIMARY KEY,
+            user_id uuid REFERENCES users (id),
+            amount numeric(15, 2),
+            type transactiontype,
+            description text,
+            created_at timestamp without time zone,
+            reference_id uuid
+        )
+    """)
+    op.execute("INSERT INTO transactions SELECT * FROM transactions_partitioned")
+    op.execute("DROP TABLE transactions_partitioned")
+    op.execute("DROP FUNCTION IF EXISTS create_transactions_partition(date)")
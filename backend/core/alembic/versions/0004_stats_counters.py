@@ -0,0 +1,128 @@
+# backend/core/alembic/versions/0004_stats_counters.py
+"""incrementally maintained stats counters
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 11:00:00
+
+شمارنده‌های داشبورد (تعداد کاربران، کاربران فعال، تعداد و جمع تراکنش‌ها
+به تفکیک نوع، بازی‌ها به تفکیک وضعیت) با triggerهای سطح دستور و
+جدول‌های transition در همان تراکنش نوشتن به‌روز می‌شوند؛ یک insert دسته‌ای
+فقط یک upsert برای هر شمارنده دارد.
+
+هر شمارنده به STATS_SHARDS ردیف (بر اساس pg_backend_pid) تقسیم شده تا
+نوشتن‌های هم‌زمان روی یک ردیف داغ صف نکشند؛ مقدار نهایی جمع shardهاست.
+"""
+from alembic import op
+
+# شناسه‌های بازنگری
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+STATS_SHARDS = 16
+
+# (نام شمارنده، مقدار هر ردیف) برای هر جدول
+COUNTERS = {
+    'users': [
+        ("'users'", "1"),
+        ("'active_users'", "CASE WHEN is_active THEN 1 ELSE 0 END"),
+    ],
+    'transactions': [
+        ("'transactions'", "1"),
+        ("'transactions:count:' || type", "1"),
+        ("'transactions:amount:' || type", "COALESCE(amount, 0)"),
+    ],
+    'games': [
+        ("'games'", "1"),
+        ("'games:' || status", "1"),
+    ],
+}
+
+
+def _deltas(counters, relation: str, sign: int) -> str:
+    return " UNION ALL ".join(
+        f"SELECT {name} AS name, {sign} * ({value}) AS delta FROM {relation}"
+        for name, value in counters
+    )
+
+
+def _apply(counters, parts) -> str:
+    deltas = " UNION ALL ".join(_deltas(counters, relation, sign) for relation, sign in parts)
+    return f"""
+        INSERT INTO stats_counters (name, shard, value)
+        SELECT name, pg_backend_pid() % {STATS_SHARDS}, sum(delta)
+        FROM ({deltas}) AS d
+        WHERE name IS NOT NULL
+        GROUP BY name
+        HAVING sum(delta) <> 0
+        ON CONFLICT (name, shard) DO UPDATE SET value = stats_counters.value + EXCLUDED.value;
+    """
+
+
+def _trigger_function(table: str, counters) -> str:
+    # در UPDATE ردیف‌های قدیم کم و ردیف‌های جدید اضافه می‌شوند؛ ستون‌های
+    # تغییر نکرده یکدیگر را خنثی می‌کنند
+    return f"""
+        CREATE OR REPLACE FUNCTION stats_{table}_changed() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                {_apply(counters, [('new_rows', 1)])}
+            ELSIF TG_OP = 'DELETE' THEN
+                {_apply(counters, [('old_rows', -1)])}
+            ELSE
+                {_apply(counters, [('new_rows', 1), ('old_rows', -1)])}
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE stats_counters (
+            name varchar(64) NOT NULL,
+            shard smallint NOT NULL,
+            value numeric(20, 2) NOT NULL DEFAULT 0,
+            PRIMARY KEY (name, shard)
+        )
+    """)
+
+    for table, counters in COUNTERS.items():
+        op.execute(_trigger_function(table, counters))
+        # جدول transition فقط برای triggerهای تک‌رویدادی مجاز است
+        op.execute(f"""
+            CREATE TRIGGER stats_{table}_insert AFTER INSERT ON {table}
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION stats_{table}_changed()
+        """)
+        op.execute(f"""
+            CREATE TRIGGER stats_{table}_update AFTER UPDATE ON {table}
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION stats_{table}_changed()
+        """)
+        op.execute(f"""
+            CREATE TRIGGER stats_{table}_delete AFTER DELETE ON {table}
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION stats_{table}_changed()
+        """)
+
+        # مقدار اولیه؛ CREATE TRIGGER تا پایان این تراکنش نوشتن روی جدول را
+        # مسدود می‌کند پس هیچ ردیفی دو بار یا هیچ بار شمرده نمی‌شود
+        op.execute(f"""
+            INSERT INTO stats_counters (name, shard, value)
+            SELECT name, 0, sum(delta)
+            FROM ({_deltas(counters, table, 1)}) AS d
+            WHERE name IS NOT NULL
+            GROUP BY name
+        """)
+
+
+def downgrade() -> None:
+    for table in COUNTERS:
+        for event in ('insert', 'update', 'delete'):
+            op.execute(f"DROP TRIGGER IF EXISTS stats_{table}_{event} ON {table}")
+        op.execute(f"DROP FUNCTION IF EXISTS stats_{table}_changed()")
+    op.execute("DROP TABLE stats_counters")
@@ -0,0 +1,60 @@
+# backend/core/alembic/versions/0005_activity_rollups.py
+"""hourly and daily activity rollups and per-user daily summaries
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 12:00:00
+
+جدول‌ها خالی ساخته می‌شوند؛ وظیفه refresh_activity_rollups آن‌ها را از
+قدیمی‌ترین ردیف تا اکنون (حداکثر ROLLUP_MAX_WINDOW در هر اجرا) پر می‌کند.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# شناسه‌های بازنگری
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def _rollup_columns(bucket_type):
+    return [
+        sa.Column('bucket', bucket_type, primary_key=True),
+        sa.Column('game_type', sa.String(16), primary_key=True, server_default=''),
+        sa.Column('transaction_type', sa.String(16), primary_key=True, server_default=''),
+        sa.Column('tx_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('tx_amount', sa.Numeric(20, 2), nullable=False, server_default='0'),
+        sa.Column('games_created', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('new_users', sa.Integer(), nullable=False, server_default='0'),
+    ]
+
+
+def upgrade() -> None:
+    op.create_table('activity_rollups_hourly', *_rollup_columns(sa.DateTime()))
+    op.create_table('activity_rollups_daily', *_rollup_columns(sa.Date()))
+    op.create_table(
+        'user_daily_summaries',
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('tx_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('deposit_amount', sa.Numeric(20, 2), nullable=False, server_default='0'),
+        sa.Column('withdrawal_amount', sa.Numeric(20, 2), nullable=False, server_default='0'),
+        sa.Column('stake_amount', sa.Numeric(20, 2), nullable=False, server_default='0'),
+        sa.Column('win_amount', sa.Numeric(20, 2), nullable=False, server_default='0'),
+        sa.Column('loss_amount', sa.Numeric(20, 2), nullable=False, server_default='0'),
+        sa.Column('games_played', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.create_table(
+        'rollup_watermarks',
+        sa.Column('name', sa.String(64), primary_key=True),
+        sa.Column('high_water', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('rollup_watermarks')
+    op.drop_table('user_daily_summaries')
+    op.drop_table('activity_rollups_daily')
+    op.drop_table('activity_rollups_hourly')
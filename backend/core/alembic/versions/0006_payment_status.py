@@ -0,0 +1,110 @@
+# backend/core/alembic/versions/0006_payment_status.py
+"""payment status columns for deposit reconciliation
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 13:00:00
+
+وضعیت پرداخت‌های درگاه به جای جستجوی '%pending%' در description در
+ستون‌های جدا نگه داشته می‌شود:
+- payment_status: PENDING تا تایید یا رد درگاه، سپس COMPLETED یا FAILED
+- payment_provider و payment_authority: درگاه و شناسه پرداخت در آن
+- payment_attempts و payment_next_check_at: backoff تطبیق پس از خطای درگاه
+
+ایندکس جزئی روی payment_next_check_at فقط ردیف‌های PENDING را دارد و
+کوچک می‌ماند؛ وظیفه check_pending_payments ردیف‌های سررسیده را از آن
+می‌خواند. ساخت ایندکس روی جدول پارتیشن‌بندی شده CONCURRENTLY ممکن نیست.
+
+واریزهای درگاه موجود از روی description مقداردهی می‌شوند: "Deposit
+request via ..." هنوز PENDING است و authority از پسوند "authority:" آن
+خوانده می‌شود؛ "Deposit completed successfully" تکمیل شده است. واریز pending
+بدون authority در اولین تطبیق FAILED می‌شود. واریزهای مستقیم ("Deposit via
+...") همان لحظه به کیف پول اضافه شده‌اند و از درگاه نگذشته‌اند، پس ستون‌های
+پرداخت آن‌ها خالی می‌ماند و تطبیق سراغشان نمی‌رود.
+
+payment_authorities کلید یکتای (payment_provider, payment_authority) است؛
+روی جدول پارتیشن‌بندی شده ایندکس یکتای بدون created_at ممکن نیست. اگر
+authority تکراری در داده‌های قدیمی باشد فقط قدیمی‌ترین تراکنش آن را نگه
+می‌دارد و authority واریزهای pending دیگر پاک می‌شود تا تطبیق آن‌ها را رد کند.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from backend.core.config import settings
+
+# شناسه‌های بازنگری
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+payment_status = sa.Enum('PENDING', 'COMPLETED', 'FAILED', name='paymentstatus')
+
+# description واریزهای درگاه پیش از این مهاجرت: درخواست در انتظار و واریز تکمیل شده
+PENDING_DESCRIPTION = 'Deposit request via %'
+COMPLETED_DESCRIPTION = 'Deposit completed successfully'
+
+
+def upgrade() -> None:
+    payment_status.create(op.get_bind())
+    op.add_column('transactions', sa.Column('payment_status', payment_status, nullable=True))
+    op.add_column('transactions', sa.Column('payment_provider', sa.String(16), nullable=True))
+    op.add_column('transactions', sa.Column('payment_authority', sa.String(64), nullable=True))
+    op.add_column('transactions', sa.Column('payment_attempts', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('transactions', sa.Column('payment_next_check_at', sa.DateTime(), nullable=True))
+
+    # واریزهای درگاه قدیمی همگی از درگاه پیش‌فرض همان زمان ثبت شده‌اند
+    op.execute(sa.text("""
+        UPDATE transactions
+        SET payment_provider = :provider,
+            payment_status = 'PENDING'::paymentstatus,
+            payment_authority = NULLIF(left(btrim(split_part(description, 'authority:', 2)), 64), ''),
+            payment_next_check_at = created_at + interval '1 hour'
+        WHERE type = 'DEPOSIT' AND description LIKE :pending
+    """).bindparams(provider=settings.PAYMENT_PROVIDER, pending=PENDING_DESCRIPTION))
+    op.execute(sa.text("""
+        UPDATE transactions
+        SET payment_provider = :provider,
+            payment_status = 'COMPLETED'::paymentstatus
+        WHERE type = 'DEPOSIT' AND description = :completed
+    """).bindparams(provider=settings.PAYMENT_PROVIDER, completed=COMPLETED_DESCRIPTION))
+
+    op.create_table(
+        'payment_authorities',
+        sa.Column('payment_provider', sa.String(16), primary_key=True),
+        sa.Column('payment_authority', sa.String(64), primary_key=True),
+        sa.Column('transaction_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('transaction_created_at', sa.DateTime(), nullable=False),
+    )
+    op.execute("""
+        INSERT INTO payment_authorities (payment_provider, payment_authority, transaction_id, transaction_created_at)
+        SELECT DISTINCT ON (payment_provider, payment_authority)
+            payment_provider, payment_authority, id, created_at
+        FROM transactions
+        WHERE type = 'DEPOSIT' AND payment_authority IS NOT NULL
+        ORDER BY payment_provider, payment_authority, created_at, id
+    """)
+    op.execute("""
+        UPDATE transactions AS t
+        SET payment_authority = NULL
+        WHERE t.type = 'DEPOSIT' AND t.payment_status = 'PENDING' AND t.payment_authority IS NOT NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM payment_authorities AS a
+              WHERE a.transaction_id = t.id AND a.transaction_created_at = t.created_at
+          )
+    """)
+
+    op.execute("""
+        CREATE INDEX ix_transactions_pending_payments
+        ON transactions (payment_next_check_at)
+        WHERE payment_status = 'PENDING'
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transactions_pending_payments', table_name='transactions')
+    op.drop_table('payment_authorities')
+    for column in ('payment_next_check_at', 'payment_attempts', 'payment_authority',
+                   'payment_provider', 'payment_status'):
+        op.drop_column('transactions', column)
+    payment_status.drop(op.get_bind())
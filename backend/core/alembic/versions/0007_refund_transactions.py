@@ -0,0 +1,26 @@
+# backend/core/alembic/versions/0007_refund_transactions.py
+"""refund transaction type for abandoned games
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 14:00:00
+
+پاکسازی بازی‌های رها شده شرط قفل شده بازیکنان را به credit برمی‌گرداند
+و برای هر بازیکن یک تراکنش REFUND ثبت می‌کند. مقدار enum در PostgreSQL
+حذف‌شدنی نیست، پس downgrade کاری انجام نمی‌دهد.
+"""
+from alembic import op
+
+# شناسه‌های بازنگری
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TYPE transactiontype ADD VALUE IF NOT EXISTS 'REFUND'")
+
+
+def downgrade() -> None:
+    pass
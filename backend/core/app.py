@@ -1,12 +1,15 @@
 # backend/core/app.py
-from fastapi import FastAPI, Depends, HTTPException, status, WebSocket
+from fastapi import FastAPI, Depends, HTTPException, status, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
 import uuid
 from . import models, schemas, crud, auth
-from .database import SessionLocal, engine
+from .database import SessionLocal, AsyncSessionLocal, AsyncSession, Session, engine, get_async_db
 from .config import settings
+from .ledger import WalletLedger
+from ..game_engine.registry import game_rooms
+from ..notification.websocket import manager
 
 # ایجاد جداول دیتابیس (برای محیط توسعه)
 models.Base.metadata.create_all(bind=engine)
@@ -84,12 +87,12 @@ def read_current_user(
 
 # ----- Wallet Endpoints -----
 @app.get("/api/wallet", response_model=schemas.WalletResponse)
-def get_user_wallet(
+async def get_user_wallet(
     current_user: models.User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """دریافت موجودی کیف پول کاربر"""
-    wallet = crud.get_wallet(db, current_user.id)
+    """دریافت موجودی کیف پول کاربر (در حالت عادی از کش و بدون مراجعه به دیتابیس)"""
+    wallet = await WalletLedger(db).get_balance_async(current_user.id)
     if not wallet:
         raise HTTPException(status_code=404, detail="Wallet not found")
     return wallet
@@ -105,21 +108,16 @@ def deposit_to_wallet(
         # در اینجا باید منطق اتصال به درگاه پرداخت پیاده‌سازی شود
         # برای نمونه، مستقیماً موجودی را افزایش می‌دهیم
         
-        # افزایش موجودی ریالی
-        wallet = crud.get_wallet(db, current_user.id)
-        wallet.real_balance += deposit_data.amount
-        db.commit()
-        
-        # ثبت تراکنش
-        crud.create_transaction(
-            db,
+        # افزایش اتمیک موجودی ریالی و ثبت تراکنش در یک commit
+        balance, _ = WalletLedger(db).apply(
             current_user.id,
-            deposit_data.amount,
             schemas.TransactionType.DEPOSIT,
-            f"Deposit via {deposit_data.payment_method}"
+            deposit_data.amount,
+            real_delta=deposit_data.amount,
+            description=f"Deposit via {deposit_data.payment_method}"
         )
         
-        return {"status": "success", "new_balance": wallet.real_balance}
+        return {"status": "success", "new_balance": balance["real_balance"]}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -138,14 +136,14 @@ def create_new_game(
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/games/{game_id}/join")
-def join_game(
+async def join_game(
     game_id: uuid.UUID,
     current_user: models.User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """پیوستن به بازی موجود"""
     try:
-        player = crud.add_player_to_game(db, game_id, current_user.id)
+        player = await crud.add_player_to_game(db, game_id, current_user.id)
         return {"status": "success", "game_id": game_id}
     except crud.CRUDException as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -156,22 +154,39 @@ async def game_websocket(
     websocket: WebSocket,
     game_id: uuid.UUID,
     token: str,
-    db: Session = Depends(get_db)
+    encoding: str = "json"
 ):
-    """اتصال WebSocket برای بازی‌های زنده"""
+    """اتصال WebSocket برای بازی‌های زنده
+
+    کلاینت می‌تواند با encoding=compact فریم‌های باینری تیک ضریب و
+    ارسال تغییرات دست (به جای کل دست) را درخواست کند.
+    """
+    connection_id = uuid.uuid4()
     try:
-        # احراز هویت کاربر
-        user = await auth.get_current_user_from_token(token, db)
+        # احراز هویت کاربر؛ session فقط برای همین کوئری باز است و اتصال
+        # دیتابیس در طول عمر WebSocket نگه داشته نمی‌شود
+        async with AsyncSessionLocal() as db:
+            user = await auth.get_current_user_from_token(token, db)
         
-        await websocket.accept()
-        
-        # TODO: پیاده‌سازی منطق بازی
+        await manager.connect(websocket, user.id, connection_id, encoding)
+        manager.join_game(connection_id, game_id)
         
         while True:
             data = await websocket.receive_json()
-            # پردازش رویدادهای بازی
+            # پردازش رویدادهای بازی روی موتور ساکن در حافظه
+            try:
+                await game_rooms.dispatch(game_id, user.id, data)
+            except (ValueError, KeyError, TypeError) as e:
+                await manager.send_to_connection(connection_id, {
+                    "type": "error",
+                    "message": str(e)
+                })
             
+    except WebSocketDisconnect:
+        pass
     except HTTPException as e:
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
     except Exception as e:
         await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+    finally:
+        manager.disconnect(connection_id)
@@ -6,8 +6,10 @@ from passlib.context import CryptContext
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from .database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import get_async_db
 from .models import User
 from .schemas import Token, TokenData, UserCreate
 from .config import settings
@@ -48,11 +50,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     )
     return encoded_jwt
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    """دریافت کاربر جاری از توکن"""
+async def get_current_user_from_token(token: str, db: AsyncSession) -> User:
+    """دریافت کاربر از توکن (برای endpointهای HTTP و اتصال‌های WebSocket)"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -71,11 +70,19 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == token_data.username).first()
+    result = await db.execute(select(User).where(User.username == token_data.username))
+    user = result.scalar_one_or_none()
     if user is None:
         raise credentials_exception
     return user
 
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """دریافت کاربر جاری از توکن"""
+    return await get_current_user_from_token(token, db)
+
 async def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
@@ -12,7 +12,8 @@ celery_app = Celery(
     include=[
         "backend.tasks.email",
         "backend.tasks.payment",
-        "backend.tasks.game"
+        "backend.tasks.game",
+        "backend.tasks.maintenance"
     ]
 )
 
@@ -30,7 +31,8 @@ celery_app.conf.update(
 celery_app.conf.task_routes = {
     "backend.tasks.email.*": {"queue": "email"},
     "backend.tasks.payment.*": {"queue": "payment"},
-    "backend.tasks.game.*": {"queue": "game"}
+    "backend.tasks.game.*": {"queue": "game"},
+    "backend.tasks.maintenance.*": {"queue": "maintenance"}
 }
 
 # تنظیمات Beat برای کارهای زمان‌بندی شده
@@ -46,6 +48,18 @@ celery_app.conf.beat_schedule = {
     "send_daily_stats": {
         "task": "backend.tasks.email.send_daily_stats_email",
         "schedule": 86400.0,  # هر روز
+    },
+    "ensure_transaction_partitions": {
+        "task": "backend.tasks.maintenance.ensure_transaction_partitions",
+        "schedule": 86400.0,  # هر روز
+    },
+    "refresh_activity_rollups": {
+        "task": "backend.tasks.maintenance.refresh_activity_rollups",
+        "schedule": float(settings.ROLLUP_INTERVAL),
+    },
+    "export_columnar_history": {
+        "task": "backend.tasks.maintenance.export_columnar_history",
+        "schedule": 3600.0,  # هر ساعت؛ هر روز فقط یک بار خروجی گرفته می‌شود
     }
 }
 
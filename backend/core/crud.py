@@ -1 +1,80 @@
+# backend/core/crud.py
+import uuid
+from datetime import datetime
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models
+from .ledger import APPLY_DELTA, balance_cache
 
+class CRUDException(Exception):
+    """خطای قابل نمایش به کاربر در عملیات دیتابیس"""
+    pass
+
+# حداکثر بازیکنان هر نوع بازی (نوع‌های بدون محدودیت در این جدول نیستند)
+MAX_PLAYERS = {
+    models.GameType.HOKM: 4,
+    models.GameType.RPS: 2,
+}
+
+async def add_player_to_game(db: AsyncSession, game_id: uuid.UUID, user_id: uuid.UUID) -> models.GamePlayer:
+    """پیوستن بازیکن به بازی و قفل کردن شرط او در یک تراکنش
+
+    ردیف بازی قفل می‌شود تا موقعیت‌ها و ظرفیت بازی در پیوستن‌های هم‌زمان
+    درست بمانند؛ شرط با همان UPDATE اتمیک دفتر کل از credit به locked_credit
+    منتقل می‌شود.
+    """
+    now = datetime.utcnow()
+    try:
+        result = await db.execute(
+            select(models.Game).where(models.Game.id == game_id).with_for_update()
+        )
+        game = result.scalar_one_or_none()
+        if game is None:
+            raise CRUDException("Game not found")
+        if game.status != models.GameStatus.WAITING:
+            raise CRUDException("Game is not accepting players")
+
+        players = (await db.execute(
+            select(models.GamePlayer.user_id).where(models.GamePlayer.game_id == game_id)
+        )).scalars().all()
+        if user_id in players:
+            raise CRUDException("Already joined this game")
+        max_players = MAX_PLAYERS.get(game.game_type)
+        if max_players is not None and len(players) >= max_players:
+            raise CRUDException("Game is full")
+
+        stake = game.stake or 0
+        row = (await db.execute(APPLY_DELTA, {
+            "user_id": user_id,
+            "real_delta": 0,
+            "credit_delta": -stake,
+            "locked_delta": stake,
+            "now": now
+        })).first()
+        if row is None:
+            raise CRUDException("Insufficient credit")
+
+        player = models.GamePlayer(
+            game_id=game_id,
+            user_id=user_id,
+            joined_at=now,
+            position=len(players)
+        )
+        db.add(player)
+        if stake:
+            await db.execute(insert(models.Transaction).values(
+                id=uuid.uuid4(),
+                user_id=user_id,
+                amount=stake,
+                type=models.TransactionType.GAME_STAKE,
+                description=f"Game {game_id} stake",
+                created_at=now,
+                reference_id=game_id
+            ))
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    await balance_cache.invalidate_async([user_id])
+    return player
@@ -1,7 +1,13 @@
 # backend/core/database.py
-from sqlalchemy import create_engine
+import time
+import logging
+import threading
+from typing import Any, Dict, Optional
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
 from backend.core.config import settings
 
 # URL اتصال به دیتابیس از تنظیمات محیطی می‌آید
@@ -9,16 +15,154 @@ SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    pool_size=20,
-    max_overflow=30,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+    pool_recycle=3600
+)
+
+# همان دیتابیس با درایور asyncpg برای endpointهای پرترافیک؛ انتظار برای
+# دیتابیس event loop را آزاد می‌کند و به threadpool محدود نیست
+ASYNC_DATABASE_URL = make_url(str(SQLALCHEMY_DATABASE_URL)).set(drivername="postgresql+asyncpg")
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
     pool_pre_ping=True,
     pool_recycle=3600
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# session بلندمدت برای موتورهای بازی ساکن در حافظه؛ پس از commit اشیاء
+# منقضی نمی‌شوند تا هر عمل بازیکن باعث بارگذاری دوباره از دیتابیس نشود
+GameSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+    bind=engine
+)
+
+# بدون expire پس از commit تا دسترسی به ویژگی‌ها در کد async باعث I/O ضمنی نشود
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
+logger = logging.getLogger(__name__)
+
+# تأخیر replica در PostgreSQL؛ اگر همه WAL دریافتی اعمال شده باشد تأخیری نیست
+# (زمان آخرین replay در نبود نوشتن روی primary قدیمی می‌ماند)
+REPLICA_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class SessionRouter:
+    """مسیریابی sessionهای فقط‌خواندنی به replica
+
+    خواندن‌های سنگین (پنل ادمین، گزارش‌ها و ایمیل آمار روزانه) در صورت
+    سالم بودن replica و کمتر بودن تأخیر آن از max_lag به replica می‌روند و
+    در غیر این صورت به primary. تأخیر حداکثر هر check_interval ثانیه یک بار
+    بررسی می‌شود. روی دیتابیس‌های غیر PostgreSQL (مثلاً دو فایل SQLite) فقط
+    در دسترس بودن replica بررسی می‌شود.
+    """
+
+    def __init__(
+        self,
+        primary: Engine,
+        replica: Optional[Engine] = None,
+        max_lag: float = settings.DB_REPLICA_MAX_LAG,
+        check_interval: float = settings.DB_REPLICA_CHECK_INTERVAL
+    ):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.primary_factory = sessionmaker(autocommit=False, autoflush=False, bind=primary)
+        self.replica = replica
+        self.replica_factory = (
+            sessionmaker(autocommit=False, autoflush=False, bind=replica)
+            if replica is not None else None
+        )
+        self._lock = threading.Lock()
+        self._checked_at = float("-inf")
+        self._healthy = False
+        self.lag: Optional[float] = None
+        self.stats = {"replica_reads": 0, "primary_reads": 0, "fallbacks": 0, "checks": 0}
+
+    def _measure_lag(self) -> float:
+        with self.replica.connect() as conn:
+            if self.replica.dialect.name == "postgresql":
+                return float(conn.execute(REPLICA_LAG_QUERY).scalar() or 0)
+            conn.execute(text("SELECT 1"))
+            return 0.0
+
+    def replica_available(self) -> bool:
+        """آیا replica سالم و به اندازه کافی به‌روز است (با نتیجه کش شده)"""
+        if self.replica is None:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at < self.check_interval:
+                return self._healthy
+            self._checked_at = now
+            self.stats["checks"] += 1
+            try:
+                self.lag = self._measure_lag()
+                self._healthy = self.lag <= self.max_lag
+                if not self._healthy:
+                    logger.warning(f"Replica lag {self.lag:.1f}s exceeds {self.max_lag}s, reading from primary")
+            except Exception as e:
+                self.lag = None
+                self._healthy = False
+                logger.error(f"Replica check failed, reading from primary: {str(e)}")
+            return self._healthy
+
+    def read_session(self) -> Session:
+        """session برای کوئری‌های فقط‌خواندنی؛ replica در صورت امکان"""
+        if self.replica_available():
+            self.stats["replica_reads"] += 1
+            db = self.replica_factory()
+            db.info["replica"] = True
+            return db
+        if self.replica is not None:
+            self.stats["fallbacks"] += 1
+        self.stats["primary_reads"] += 1
+        return self.primary_factory()
+
+    def write_session(self) -> Session:
+        return self.primary_factory()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "replica_configured": self.replica is not None,
+            "replica_healthy": self._healthy,
+            "replica_lag_seconds": self.lag,
+            **self.stats
+        }
+
+
+replica_engine = (
+    create_engine(
+        settings.DATABASE_REPLICA_URL,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=3600
+    )
+    if settings.DATABASE_REPLICA_URL else None
+)
+
+db_router = SessionRouter(engine, replica_engine)
+
 def get_db():
     """
     تابع برای ایجاد session دیتابیس
@@ -30,3 +174,22 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    """
+    نسخه async از get_db برای endpointهای async
+    اتصال فقط هنگام اجرای کوئری از pool گرفته می‌شود
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_read_db():
+    """
+    session فقط‌خواندنی برای گزارش‌ها و پنل ادمین
+    در صورت سالم بودن replica از آن و در غیر این صورت از primary
+    """
+    db = db_router.read_session()
+    try:
+        yield db
+    finally:
+        db.close()
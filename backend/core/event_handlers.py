@@ -23,12 +23,76 @@ async def startup_event_handler(app: FastAPI) -> None:
         celery_app.conf.broker_connection_retry_on_startup = True
         logger.info("Background services initialized")
     
+    # دریافت invalidation کش موجودی کیف پول از سایر workerها
+    from ..core.ledger import balance_cache
+    balance_cache.start()
+    logger.info("Wallet balance cache listener started")
+    
+    # راه‌اندازی نویسنده لاگ رویدادهای بازی
+    from ..game_engine.event_log import game_log
+    game_log.start()
+    logger.info("Game event log writer started")
+    
+    # تمدید مالکیت بازی‌ها و snapshot موتورها
+    from ..game_engine.snapshots import snapshots
+    snapshots.start()
+    logger.info("Game snapshot store started")
+    
+    # راه‌اندازی رجیستری اتاق‌های بازی
+    from ..game_engine.registry import game_rooms
+    game_rooms.start()
+    logger.info("Game room registry started")
+    
+    # اجرای دورهای بازی زمان‌بندی شده روی همین event loop
+    if settings.GAME_RUNNER_ENABLED:
+        from ..game_engine.runner import game_runner
+        game_runner.start()
+        logger.info("Game runner started")
+    
+    # اتصال WebSocketها به bus مشترک بین workerها
+    if settings.WS_BUS_ENABLED:
+        from ..notification.bus import bus
+        bus.start()
+        logger.info("WebSocket bus started")
+    
     logger.info("Application startup completed")
 
 async def shutdown_event_handler(app: FastAPI) -> None:
     """هندلر اجرایی هنگام خاموشی برنامه"""
     logger.info("Application shutdown initiated")
     
+    if settings.WS_BUS_ENABLED:
+        from ..notification.bus import bus
+        await bus.stop()
+        logger.info("WebSocket bus stopped")
+    
+    if settings.GAME_RUNNER_ENABLED:
+        from ..game_engine.runner import game_runner
+        await game_runner.stop()
+        logger.info("Game runner stopped")
+    
+    # آزادسازی اتاق‌های بازی
+    from ..game_engine.registry import game_rooms
+    await game_rooms.stop()
+    logger.info("Game room registry stopped")
+    
+    # ذخیره آخرین snapshotها و رها کردن مالکیت بازی‌ها برای سایر workerها
+    from ..game_engine.snapshots import snapshots
+    await snapshots.stop()
+    logger.info("Game snapshot store stopped")
+    
+    from ..game_engine.event_log import game_log
+    await game_log.stop()
+    logger.info("Game event log flushed")
+    
+    from ..core.ledger import balance_cache
+    await balance_cache.stop()
+    logger.info("Wallet balance cache listener stopped")
+    
+    from ..payment_gateway.providers import close_payment_providers
+    await close_payment_providers()
+    logger.info("Payment gateway connections closed")
+    
     # توقف سرویس‌های پس‌زمینه
     if not settings.DEBUG:
         from ..core.celery_app import celery_app
@@ -68,12 +132,10 @@ def register_event_handlers(app: FastAPI) -> None:
 
 async def game_event_handler(game_id: str, event_type: str) -> None:
     """هندلر رویدادهای بازی"""
-    from ..core.database import SessionLocal
-    from ..game_engine.base import GameFactory
+    from ..game_engine.registry import game_rooms
     
-    db = SessionLocal()
     try:
-        game_engine = GameFactory.create_game(None, db, game_id)
+        game_engine = (await game_rooms.get(game_id)).engine
         
         if event_type == "game_started":
             logger.info(f"Game {game_id} started")
@@ -95,8 +157,6 @@ async def game_event_handler(game_id: str, event_type: str) -> None:
             
     except Exception as e:
         logger.error(f"Error handling game event: {str(e)}")
-    finally:
-        db.close()
 
 async def transaction_event_handler(transaction_id: str, event_type: str) -> None:
     """هندلر رویدادهای تراکنش"""
@@ -71,3 +71,27 @@ async def full_health_check(db: Session = Depends(get_db)) -> Dict[str, Any]:
         "status": overall_status,
         "checks": jsonable_encoder(checks)
     }
+
+@router.get("/metrics/game-rooms")
+async def game_rooms_metrics() -> Dict[str, Any]:
+    """آمار اتاق‌های بازی ساکن در حافظه این پروسه"""
+    from ..game_engine.registry import game_rooms
+    return game_rooms.metrics()
+
+@router.get("/metrics/game-runner")
+async def game_runner_metrics() -> Dict[str, Any]:
+    """آمار game runner و تأخیر event loop این پروسه"""
+    from ..game_engine.runner import game_runner
+    return game_runner.metrics()
+
+@router.get("/metrics/database")
+async def database_metrics() -> Dict[str, Any]:
+    """وضعیت replica و تعداد خواندن‌های مسیریابی شده"""
+    from ..core.database import db_router
+    return db_router.metrics()
+
+@router.get("/metrics/payments")
+async def payment_metrics() -> Dict[str, Any]:
+    """وضعیت circuit breaker درگاه‌های پرداخت در این پروسه"""
+    from ..payment_gateway.providers import payment_metrics
+    return payment_metrics()
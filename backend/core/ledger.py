@@ -0,0 +1,322 @@
+# backend/core/ledger.py
+import asyncio
+import threading
+import time
+import uuid
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Tuple, Union
+from sqlalchemy import select, text
+from . import models
+from .database import Session, AsyncSession
+from .redis_client import RedisClient
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# تغییر اتمیک موجودی: بدون خواندن قبلی و با شرط کافی بودن موجودی در همان دستور
+APPLY_DELTA = text("""
+    UPDATE wallets
+    SET real_balance = real_balance + :real_delta,
+        credit = credit + :credit_delta,
+        locked_credit = locked_credit + :locked_delta,
+        last_transaction = :now
+    WHERE user_id = :user_id
+      AND real_balance + :real_delta >= 0
+      AND credit + :credit_delta >= 0
+      AND locked_credit + :locked_delta >= 0
+    RETURNING user_id, credit, real_balance, locked_credit, last_transaction
+""")
+
+
+class BalanceCache:
+    """کش درون‌حافظه‌ای موجودی کیف پول‌ها (read-through)
+
+    پس از هر نوشتن، این پروسه مقدار تازه (خروجی RETURNING) را نگه می‌دارد
+    و شناسه کاربر از طریق Redis به سایر workerها اعلام می‌شود تا ورودی
+    قدیمی خود را حذف کنند. ttl سقف کهنگی در صورت از دست رفتن پیام است.
+    """
+
+    def __init__(
+        self,
+        ttl: int = settings.WALLET_CACHE_TTL,
+        max_size: int = settings.WALLET_CACHE_SIZE,
+        channel: str = settings.WALLET_CACHE_CHANNEL
+    ):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.channel = channel
+        self.worker_id = uuid.uuid4().hex
+        self._entries: "OrderedDict[uuid.UUID, Tuple[float, Dict]]" = OrderedDict()
+        # endpointهای همگون در threadpool اجرا می‌شوند
+        self._lock = threading.Lock()
+        self._listener: Optional[asyncio.Task] = None
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, user_id: uuid.UUID) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.stats["hits"] += 1
+            return entry[1]
+
+    def put(self, user_id: uuid.UUID, balance: Dict):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, balance)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, user_ids: Iterable[uuid.UUID]):
+        with self._lock:
+            for user_id in user_ids:
+                if self._entries.pop(user_id, None) is not None:
+                    self.stats["invalidations"] += 1
+
+    def _message(self, user_ids: Iterable[uuid.UUID]) -> Optional[str]:
+        ids = ",".join(str(user_id) for user_id in user_ids)
+        return f"{self.worker_id}:{ids}" if ids else None
+
+    def publish(self, user_ids: Iterable[uuid.UUID]):
+        """اعلام تغییر موجودی به سایر workerها"""
+        message = self._message(user_ids)
+        if message is None:
+            return
+        try:
+            RedisClient.get_sync_client().publish(self.channel, message)
+        except Exception as e:
+            logger.error(f"Wallet cache invalidation publish failed: {str(e)}")
+
+    async def publish_async(self, user_ids: Iterable[uuid.UUID]):
+        """نسخه async همان publish برای handlerهای async (بدون بلاک کردن event loop)"""
+        message = self._message(user_ids)
+        if message is None:
+            return
+        try:
+            await RedisClient.publish(self.channel, message)
+        except Exception as e:
+            logger.error(f"Wallet cache invalidation publish failed: {str(e)}")
+
+    def invalidate(self, user_ids: Iterable[uuid.UUID]):
+        """حذف ورودی‌ها در این پروسه و سایر workerها"""
+        user_ids = list(user_ids)
+        self.discard(user_ids)
+        self.publish(user_ids)
+
+    async def invalidate_async(self, user_ids: Iterable[uuid.UUID]):
+        """invalidate برای کدهای async"""
+        user_ids = list(user_ids)
+        self.discard(user_ids)
+        await self.publish_async(user_ids)
+
+    def handle_message(self, message: str):
+        worker_id, _, ids = message.partition(":")
+        if worker_id == self.worker_id:
+            return
+        self.discard(uuid.UUID(user_id) for user_id in ids.split(","))
+
+    async def _listen(self):
+        retry_delay = 1
+        while True:
+            try:
+                pubsub = await RedisClient.subscribe(self.channel)
+                retry_delay = 1
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self.handle_message(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # پیام‌های از دست رفته در این فاصله: کش را کامل خالی می‌کنیم
+                with self._lock:
+                    self._entries.clear()
+                logger.error(f"Wallet cache listener failed: {str(e)}")
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 30)
+
+    def start(self):
+        """راه‌اندازی دریافت پیام‌های invalidation"""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+# نمونه پیش‌فرض برای استفاده در سراسر برنامه
+balance_cache = BalanceCache()
+
+
+class WalletLedger:
+    """سرویس دفتر کل کیف پول
+
+    هر تغییر موجودی با یک UPDATE ... RETURNING اتمیک و ثبت ردیف Transaction
+    متناظر در همان تراکنش دیتابیس انجام می‌شود؛ جدول تراکنش‌ها فقط
+    افزوده می‌شود و هیچ کدی موجودی را به صورت خواندن-تغییر-نوشتن تغییر نمی‌دهد.
+    متدهای *_async با AsyncSession و بقیه با Session کار می‌کنند.
+    """
+
+    def __init__(self, db: Union[Session, AsyncSession], cache: BalanceCache = balance_cache):
+        self.db = db
+        self.cache = cache
+
+    def _cache_wallet(self, user_id: uuid.UUID, wallet: Optional[models.Wallet]) -> Optional[Dict]:
+        if wallet is None:
+            return None
+        balance = {
+            "user_id": wallet.user_id,
+            "credit": wallet.credit,
+            "real_balance": wallet.real_balance,
+            "locked_credit": wallet.locked_credit,
+            "last_transaction": wallet.last_transaction
+        }
+        self.cache.put(user_id, balance)
+        return balance
+
+    def get_balance(self, user_id: uuid.UUID) -> Optional[Dict]:
+        """موجودی کیف پول از کش یا در صورت نبود، از دیتابیس"""
+        balance = self.cache.get(user_id)
+        if balance is not None:
+            return balance
+
+        wallet = self.db.query(models.Wallet).filter(models.Wallet.user_id == user_id).first()
+        return self._cache_wallet(user_id, wallet)
+
+    async def get_balance_async(self, user_id: uuid.UUID) -> Optional[Dict]:
+        """نسخه async از get_balance (db باید AsyncSession باشد)"""
+        balance = self.cache.get(user_id)
+        if balance is not None:
+            return balance
+
+        result = await self.db.execute(select(models.Wallet).where(models.Wallet.user_id == user_id))
+        return self._cache_wallet(user_id, result.scalar_one_or_none())
+
+    def _delta_params(
+        self,
+        user_id: uuid.UUID,
+        real_delta: Decimal,
+        credit_delta: int,
+        locked_delta: int
+    ) -> Dict:
+        return {
+            "user_id": user_id,
+            "real_delta": real_delta,
+            "credit_delta": credit_delta,
+            "locked_delta": locked_delta,
+            "now": datetime.utcnow()
+        }
+
+    def _record(
+        self,
+        user_id: uuid.UUID,
+        transaction_type: models.TransactionType,
+        amount: Decimal,
+        description: Optional[str],
+        reference_id: Optional[uuid.UUID],
+        transaction: Optional[models.Transaction]
+    ) -> models.Transaction:
+        """ساخت ردیف تراکنش جدید یا به‌روزرسانی تراکنش داده شده"""
+        if transaction is None:
+            transaction = models.Transaction(
+                user_id=user_id,
+                amount=amount,
+                type=transaction_type,
+                description=description,
+                reference_id=reference_id
+            )
+            self.db.add(transaction)
+        elif description is not None:
+            transaction.description = description
+        return transaction
+
+    def apply(
+        self,
+        user_id: uuid.UUID,
+        transaction_type: models.TransactionType,
+        amount: Decimal,
+        real_delta: Decimal = Decimal(0),
+        credit_delta: int = 0,
+        locked_delta: int = 0,
+        description: Optional[str] = None,
+        reference_id: Optional[uuid.UUID] = None,
+        transaction: Optional[models.Transaction] = None
+    ) -> Tuple[Dict, models.Transaction]:
+        """اعمال تغییر موجودی و ثبت تراکنش آن در یک commit (db باید Session باشد)
+
+        اگر transaction داده شود (مثلاً تراکنش pending واریز) همان به‌روز
+        می‌شود و ردیف جدیدی ساخته نمی‌شود.
+        """
+        try:
+            row = self.db.execute(
+                APPLY_DELTA, self._delta_params(user_id, real_delta, credit_delta, locked_delta)
+            ).mappings().first()
+
+            if row is None:
+                exists = self.db.query(models.Wallet.user_id)\
+                    .filter(models.Wallet.user_id == user_id)\
+                    .first()
+                self.db.rollback()
+                raise ValueError("Insufficient balance" if exists else "Wallet not found")
+
+            transaction = self._record(user_id, transaction_type, amount, description, reference_id, transaction)
+            self.db.commit()
+        except ValueError:
+            raise
+        except Exception:
+            self.db.rollback()
+            raise
+
+        balance = dict(row)
+        self.cache.put(user_id, balance)
+        self.cache.publish([user_id])
+        return balance, transaction
+
+    async def apply_async(
+        self,
+        user_id: uuid.UUID,
+        transaction_type: models.TransactionType,
+        amount: Decimal,
+        real_delta: Decimal = Decimal(0),
+        credit_delta: int = 0,
+        locked_delta: int = 0,
+        description: Optional[str] = None,
+        reference_id: Optional[uuid.UUID] = None,
+        transaction: Optional[models.Transaction] = None
+    ) -> Tuple[Dict, models.Transaction]:
+        """نسخه async از apply (db باید AsyncSession باشد)"""
+        try:
+            result = await self.db.execute(
+                APPLY_DELTA, self._delta_params(user_id, real_delta, credit_delta, locked_delta)
+            )
+            row = result.mappings().first()
+
+            if row is None:
+                exists = (await self.db.execute(
+                    select(models.Wallet.user_id).where(models.Wallet.user_id == user_id)
+                )).first()
+                await self.db.rollback()
+                raise ValueError("Insufficient balance" if exists else "Wallet not found")
+
+            transaction = self._record(user_id, transaction_type, amount, description, reference_id, transaction)
+            await self.db.commit()
+        except ValueError:
+            raise
+        except Exception:
+            await self.db.rollback()
+            raise
+
+        balance = dict(row)
+        self.cache.put(user_id, balance)
+        await self.cache.publish_async([user_id])
+        return balance, transaction
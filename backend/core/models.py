@@ -3,8 +3,8 @@ import uuid
 from datetime import datetime
 from enum import Enum as PyEnum
 from sqlalchemy import (
-    Column, Integer, String, Boolean, DateTime, 
-    ForeignKey, Numeric, Text, Enum
+    Column, Integer, String, Boolean, DateTime, Date,
+    ForeignKey, Numeric, Text, Enum, Index
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -24,6 +24,10 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     last_login = Column(DateTime, nullable=True)
 
+    __table_args__ = (
+        Index("ix_users_created_at", "created_at"),
+    )
+
     wallet = relationship("Wallet", back_populates="user", uselist=False)
     transactions = relationship("Transaction", back_populates="user")
 
@@ -49,6 +53,14 @@ class TransactionType(str, PyEnum):
     GAME_WIN = "game_win"
     GAME_LOSS = "game_loss"
     COMMISSION = "commission"
+    REFUND = "refund"  # آزاد شدن شرط قفل شده بدون برد و باخت، مثلاً بازی رها شده (مهاجرت 0007)
+
+
+class PaymentStatus(str, PyEnum):
+    """وضعیت پرداخت‌های درگاه (واریز)"""
+    PENDING = "pending"
+    COMPLETED = "completed"
+    FAILED = "failed"
 
 
 class Transaction(Base):
@@ -60,12 +72,48 @@ class Transaction(Base):
     amount = Column(Numeric(15, 2))
     type = Column(Enum(TransactionType))
     description = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    # کلید پارتیشن ماهانه؛ در PostgreSQL کلید اصلی باید آن را شامل شود (مهاجرت 0003)
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
     reference_id = Column(UUID(as_uuid=True), nullable=True)  # برای پیوند به بازی یا پرداخت
+    # وضعیت پرداخت در درگاه؛ برای تراکنش‌های غیر درگاهی خالی است (مهاجرت 0006)
+    payment_status = Column(Enum(PaymentStatus), nullable=True)
+    payment_provider = Column(String(16), nullable=True)
+    payment_authority = Column(String(64), nullable=True)
+    payment_attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    payment_next_check_at = Column(DateTime, nullable=True)  # زمان بررسی بعدی توسط check_pending_payments
+
+    __table_args__ = (
+        Index("ix_transactions_user_id_created_at", "user_id", created_at.desc()),
+        Index("ix_transactions_type_created_at", "type", created_at.desc()),
+        Index("ix_transactions_created_at", created_at.desc()),
+        Index(
+            "ix_transactions_reference_id_type", "reference_id", "type",
+            postgresql_where=reference_id.isnot(None)
+        ),
+        Index(
+            "ix_transactions_pending_payments", "payment_next_check_at",
+            postgresql_where=payment_status == PaymentStatus.PENDING
+        ),
+    )
 
     user = relationship("User", back_populates="transactions")
 
 
+class PaymentAuthority(Base):
+    """یکتایی شناسه پرداخت هر درگاه (مهاجرت 0006)
+
+    جدول transactions پارتیشن‌بندی شده است و ایندکس یکتای آن باید
+    created_at را شامل شود؛ این جدول جدا تضمین می‌کند یک authority فقط به
+    یک تراکنش تعلق داشته باشد.
+    """
+    __tablename__ = "payment_authorities"
+
+    payment_provider = Column(String(16), primary_key=True)
+    payment_authority = Column(String(64), primary_key=True)
+    transaction_id = Column(UUID(as_uuid=True), nullable=False)
+    transaction_created_at = Column(DateTime, nullable=False)
+
+
 class GameType(str, PyEnum):
     """انواع بازی‌های موجود"""
     CRASH = "crash"
@@ -96,6 +144,12 @@ class Game(Base):
     winner = Column(UUID(as_uuid=True), nullable=True)
     prize_pool = Column(Integer, nullable=True)
 
+    __table_args__ = (
+        Index("ix_games_status_created_at", "status", created_at.desc()),
+        Index("ix_games_status_completed_at", "status", "completed_at"),
+        Index("ix_games_created_at", created_at.desc()),
+    )
+
     # رابطه با کاربران از طریق جدول واسط
     players = relationship(
         "User",
@@ -115,6 +169,73 @@ class GamePlayer(Base):
     position = Column(Integer)  # موقعیت بازیکن در بازی
     credit_change = Column(Integer, default=0)  # تغییر امتیاز در پایان بازی
 
+    __table_args__ = (
+        Index("ix_game_players_user_id", "user_id"),
+    )
+
+class StatsCounter(Base):
+    """شمارنده‌های آماری که با trigger به‌روز می‌شوند (مهاجرت 0004)
+
+    هر شمارنده چند shard دارد؛ مقدار آن جمع value همه shardهاست.
+    """
+    __tablename__ = "stats_counters"
+
+    name = Column(String(64), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    value = Column(Numeric(20, 2), nullable=False, default=0)
+
+class ActivityRollupHourly(Base):
+    """خلاصه ساعتی فعالیت‌ها (به‌روزرسانی با وظیفه refresh_activity_rollups)
+
+    ردیف‌های تراکنش: game_type بازی مرتبط (یا خالی) و transaction_type نوع تراکنش.
+    ردیف‌های بازی و کاربر جدید: transaction_type خالی.
+    """
+    __tablename__ = "activity_rollups_hourly"
+
+    bucket = Column(DateTime, primary_key=True)
+    game_type = Column(String(16), primary_key=True, default="")
+    transaction_type = Column(String(16), primary_key=True, default="")
+    tx_count = Column(Integer, nullable=False, default=0)
+    tx_amount = Column(Numeric(20, 2), nullable=False, default=0)
+    games_created = Column(Integer, nullable=False, default=0)
+    new_users = Column(Integer, nullable=False, default=0)
+
+
+class ActivityRollupDaily(Base):
+    """خلاصه روزانه فعالیت‌ها (جمع ردیف‌های ساعتی)"""
+    __tablename__ = "activity_rollups_daily"
+
+    bucket = Column(Date, primary_key=True)
+    game_type = Column(String(16), primary_key=True, default="")
+    transaction_type = Column(String(16), primary_key=True, default="")
+    tx_count = Column(Integer, nullable=False, default=0)
+    tx_amount = Column(Numeric(20, 2), nullable=False, default=0)
+    games_created = Column(Integer, nullable=False, default=0)
+    new_users = Column(Integer, nullable=False, default=0)
+
+
+class UserDailySummary(Base):
+    """خلاصه روزانه تراکنش‌های هر کاربر"""
+    __tablename__ = "user_daily_summaries"
+
+    user_id = Column(UUID(as_uuid=True), primary_key=True)
+    day = Column(Date, primary_key=True)
+    tx_count = Column(Integer, nullable=False, default=0)
+    deposit_amount = Column(Numeric(20, 2), nullable=False, default=0)
+    withdrawal_amount = Column(Numeric(20, 2), nullable=False, default=0)
+    stake_amount = Column(Numeric(20, 2), nullable=False, default=0)
+    win_amount = Column(Numeric(20, 2), nullable=False, default=0)
+    loss_amount = Column(Numeric(20, 2), nullable=False, default=0)
+    games_played = Column(Integer, nullable=False, default=0)
+
+
+class RollupWatermark(Base):
+    """نقطه‌ای که خلاصه‌ها تا آن محاسبه شده‌اند (و checkpoint پاکسازی بازی‌ها)"""
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String(64), primary_key=True)
+    high_water = Column(DateTime, nullable=True)
+
 # اضافه کردن رابطه به مدل User
 User.games = relationship(
     "Game",
@@ -12,6 +12,7 @@ class RedisClient:
     
     _instance = None
     _async_instance = None
+    _async_binary_instance = None
     
     def __new__(cls):
         if cls._instance is None:
@@ -51,6 +52,13 @@ class RedisClient:
                 raise
         return cls._async_instance
     
+    @classmethod
+    async def get_async_binary_client(cls) -> AsyncRedis:
+        """دریافت کلاینت ناهمگون Redis بدون decode برای داده‌های باینری"""
+        if cls._async_binary_instance is None:
+            cls._async_binary_instance = AsyncRedis.from_url(settings.REDIS_URL)
+        return cls._async_binary_instance
+    
     @staticmethod
     def get_sync_client() -> redis.Redis:
         """دریافت کلاینت همگون Redis"""
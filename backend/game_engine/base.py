@@ -2,18 +2,33 @@
 from abc import ABC, abstractmethod
 import uuid
 from datetime import datetime
-from typing import List, Dict, Optional
-from ..core import models, schemas, crud
+from typing import List, Dict, Optional, Sequence
+from sqlalchemy.exc import SQLAlchemyError
+from ..core import models, schemas
 from ..core.database import Session
+from ..notification.websocket import manager
+from .event_log import game_log, EVENT_JSON, Event
+from .snapshots import snapshots
+from .settlement import settle_game
 
 class GameEngine(ABC):
     """کلاس پایه برای تمام موتورهای بازی"""
     
-    def __init__(self, db: Session, game_id: uuid.UUID):
+    def __init__(
+        self,
+        db: Session,
+        game_id: uuid.UUID,
+        game: Optional[models.Game] = None,
+        players: Optional[List[models.User]] = None
+    ):
         self.db = db
         self.game_id = game_id
-        self.game = self._load_game()
-        self.players = self._load_players()
+        # برای اجرای بدون دیتابیس (مثلاً شبیه‌ساز) بازی و بازیکنان مستقیم داده می‌شوند
+        self.game = game if game is not None else self._load_game()
+        self.players = players if players is not None else self._load_players()
+        self.player_ids = {player.id for player in self.players}
+        self.player_seats = {player.id: seat for seat, player in enumerate(self.players)}
+        self.replaying = False  # هنگام بازسازی از لاگ، پیامی ارسال و رویدادی ثبت نمی‌شود
     
     def _load_game(self) -> models.Game:
         """بارگذاری اطلاعات بازی از دیتابیس"""
@@ -41,33 +56,77 @@ class GameEngine(ABC):
         """پایان دادن به بازی (پیاده‌سازی در کلاس فرزند)"""
         pass
     
+    async def apply_event(self, code: int, timestamp: float, fields: tuple):
+        """اعمال یک رویداد لاگ شده روی وضعیت موتور (پیاده‌سازی در کلاس فرزند)"""
+        pass
+    
+    async def replay(self, events: List[Event]):
+        """بازسازی وضعیت موتور با اعمال رویدادها به ترتیب"""
+        self.replaying = True
+        try:
+            for code, timestamp, fields in events:
+                if code != EVENT_JSON:
+                    await self.apply_event(code, timestamp, fields)
+        finally:
+            self.replaying = False
+    
+    def record_event(self, code: int, *fields):
+        """ثبت رویداد در لاگ باینری بازی و علامت‌گذاری برای snapshot"""
+        if not self.replaying:
+            game_log.append(self.game_id, code, fields)
+            snapshots.mark(self)
+    
+    @abstractmethod
+    def snapshot(self) -> bytes:
+        """وضعیت فشرده موتور برای ادامه بازی در worker دیگر (پیاده‌سازی در کلاس فرزند)"""
+        pass
+    
+    @abstractmethod
+    def restore(self, data: bytes):
+        """بازگردانی وضعیت از خروجی snapshot (پیاده‌سازی در کلاس فرزند)"""
+        pass
+    
+    @abstractmethod
+    async def resume(self):
+        """ادامه بازی پس از restore یا replay (پیاده‌سازی در کلاس فرزند)"""
+        pass
+    
     async def broadcast(self, message: Dict):
-        """ارسال پیام به تمام بازیکنان"""
-        # TODO: پیاده‌سازی سیستم broadcast واقعی
-        print(f"Broadcasting to all players: {message}")
+        """ارسال پیام به تمام اتصالات این بازی"""
+        if self.replaying:
+            return
+        await manager.send_to_game(self.game_id, message)
     
     async def notify_player(self, player_id: uuid.UUID, message: Dict):
         """ارسال پیام به بازیکن خاص"""
-        # TODO: پیاده‌سازی سیستم notify واقعی
-        print(f"Notifying player {player_id}: {message}")
+        if self.replaying:
+            return
+        await manager.send_personal_message(message, player_id)
     
-    def _distribute_prizes(self, winner_id: uuid.UUID, prize_distribution: Dict[uuid.UUID, int]):
-        """توزیع جوایز به بازیکنان"""
+    def _distribute_prizes(
+        self,
+        user_ids: Sequence[uuid.UUID],
+        payouts: Sequence[int],
+        stakes: Optional[Sequence[int]] = None
+    ):
+        """توزیع جوایز به بازیکنان و ذخیره نتیجه بازی در یک تراکنش
+
+        payouts مبلغ بازگشتی به credit هر بازیکن (هم‌ترتیب با user_ids) و
+        stakes شرط قفل شده او است (پیش‌فرض: stake بازی برای همه).
+        """
+        if self.replaying:
+            return None
+        if stakes is None:
+            stakes = [self.game.stake or 0] * len(user_ids)
         try:
-            updated_game = crud.complete_game(
-                self.db,
-                self.game_id,
-                winner_id,
-                prize_distribution
-            )
-            self.db.refresh(updated_game)
-            return updated_game
-        except crud.CRUDException as e:
+            settle_game(self.db, self.game, list(user_ids), list(stakes), list(payouts))
+            return self.game
+        except SQLAlchemyError as e:
             raise ValueError(f"Prize distribution failed: {str(e)}")
     
     def validate_player(self, player_id: uuid.UUID):
         """اعتبارسنجی اینکه کاربر در این بازی شرکت دارد"""
-        if player_id not in [p.id for p in self.players]:
+        if player_id not in self.player_ids:
             raise ValueError("Player is not part of this game")
     
     def validate_game_status(self, expected_status: schemas.GameStatus):
@@ -77,8 +136,7 @@ class GameEngine(ABC):
     
     def log_event(self, event_type: str, data: Dict):
         """ثبت رویدادهای بازی برای اهداف تحلیلی"""
-        # TODO: پیاده‌سازی سیستم لاگ‌گیری
-        print(f"Game Event - {event_type}: {data}")
+        self.record_event(EVENT_JSON, event_type, data)
 
 class GameFactory:
     """فکتوری برای ایجاد نمونه‌های موتور بازی"""
@@ -87,15 +145,16 @@ class GameFactory:
     def create_game(
         game_type: schemas.GameType,
         db: Session,
-        game_id: uuid.UUID
+        game_id: uuid.UUID,
+        **kwargs
     ) -> GameEngine:
         """ایجاد موتور بازی بر اساس نوع بازی"""
         if game_type == schemas.GameType.CRASH:
             from .crash import CrashGame
-            return CrashGame(db, game_id)
+            return CrashGame(db, game_id, **kwargs)
         elif game_type == schemas.GameType.HOKM:
             from .hokm import HokmGame
-            return HokmGame(db, game_id)
+            return HokmGame(db, game_id, **kwargs)
         # سایر بازی‌ها...
         else:
             raise ValueError(f"Unsupported game type: {game_type}")
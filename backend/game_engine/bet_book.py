@@ -0,0 +1,121 @@
+# backend/game_engine/bet_book.py
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+
+# مقدار صفر در ستون‌های ضریب یعنی «تعیین نشده» (ضرایب معتبر همیشه بزرگ‌تر از 1 هستند)
+UNSET = 0.0
+# ضرایب به صورت صدم صحیح ذخیره می‌شوند؛ هدف‌های بزرگ‌تر از این سقف هرگز به Crash نمی‌رسند
+MAX_CENTS = np.iinfo(np.uint32).max
+
+def to_cents(multiplier: float) -> int:
+    """ضریب دو رقم اعشاری به عدد صحیح صدم (3.25 -> 325)"""
+    return min(int(round(multiplier * 100)), MAX_CENTS)
+
+class BetBook:
+    """دفتر شرط‌های یک دور Crash به صورت ستون‌های NumPy
+
+    هر بازیکن حداکثر یک شرط دارد، پس ستون‌ها یک بار به اندازه تعداد
+    بازیکنان ساخته می‌شوند و شرط‌ها با صندلی بازیکن (نه UUID) شناخته
+    می‌شوند. هر شرط 20 بایت است: صندلی، مبلغ، خروج و هدف auto-cashout به
+    صدم صحیح، و اندیس slot آن صندلی. جایزه، مجموع، برنده و مبلغ بازگشتی
+    بازیکنان با عملیات برداری روی کل ستون محاسبه می‌شوند.
+    """
+
+    def __init__(self, players: int):
+        self.count = 0
+        self.slots = np.full(players, -1, dtype=np.int32)  # {seat: slot}
+        self.seats = np.zeros(players, dtype=np.uint32)  # {slot: seat}
+        self.amounts = np.zeros(players, dtype=np.int32)
+        self.cashouts = np.zeros(players, dtype=np.uint32)
+        self.auto_cashouts = np.zeros(players, dtype=np.uint32)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, seat: int) -> bool:
+        return self.slots.item(seat) >= 0
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in (self.slots, self.seats, self.amounts, self.cashouts, self.auto_cashouts))
+
+    def place(self, seat: int, amount: int, auto_cashout: Optional[float] = None) -> int:
+        """ثبت یا جایگزینی شرط بازیکن و بازگرداندن slot آن"""
+        slot = self.slots.item(seat)
+        if slot < 0:
+            slot = self.count
+            self.count += 1
+            self.slots[seat] = slot
+            self.seats[slot] = seat
+        self.amounts[slot] = amount
+        self.cashouts[slot] = 0
+        self.auto_cashouts[slot] = to_cents(auto_cashout) if auto_cashout else 0
+        return slot
+
+    def load(self, seats: np.ndarray, amounts: np.ndarray, cashouts: np.ndarray, auto_cashouts: np.ndarray):
+        """بازگردانی کل ستون‌ها (مثلاً از snapshot)"""
+        self.count = len(seats)
+        self.seats[:self.count] = seats
+        self.amounts[:self.count] = amounts
+        self.cashouts[:self.count] = cashouts
+        self.auto_cashouts[:self.count] = auto_cashouts
+        self.slots.fill(-1)
+        self.slots[self.seats[:self.count]] = np.arange(self.count, dtype=np.int32)
+
+    def columns(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """ستون‌های شرط‌های ثبت شده: (صندلی، مبلغ، خروج، هدف خودکار)"""
+        count = self.count
+        return self.seats[:count], self.amounts[:count], self.cashouts[:count], self.auto_cashouts[:count]
+
+    def slot_of(self, seat: int) -> Optional[int]:
+        slot = self.slots.item(seat)
+        return slot if slot >= 0 else None
+
+    def seat_of(self, slot: int) -> int:
+        return self.seats.item(slot)
+
+    def cashout_of(self, slot: int) -> Optional[float]:
+        """ضریب خروج ثبت شده برای slot (یا None)"""
+        cashout = self.cashouts.item(slot)
+        return cashout / 100 if cashout else None
+
+    def set_cashout(self, slot: int, multiplier: float):
+        self.cashouts[slot] = to_cents(multiplier)
+
+    def is_pending_auto(self, slot: int, target: float) -> bool:
+        """آیا هدف auto-cashout هنوز برای این slot معتبر و تسویه نشده است"""
+        return self.cashouts.item(slot) == 0 and self.auto_cashouts.item(slot) == to_cents(target)
+
+    def pending_auto_cashouts(self) -> Sequence[Tuple[float, int]]:
+        """هدف‌های خودکار تسویه نشده به صورت (target, slot) برای ساخت دوباره heap"""
+        _, _, cashouts, auto_cashouts = self.columns()
+        slots = np.flatnonzero((cashouts == 0) & (auto_cashouts != 0))
+        return list(zip((auto_cashouts[slots] / 100).tolist(), slots.tolist()))
+
+    def prizes(self) -> np.ndarray:
+        """جایزه هر slot: floor(amount × cashout) با حساب صحیح؛ شرط‌های خارج نشده صفر می‌شوند"""
+        _, amounts, cashouts, _ = self.columns()
+        return amounts.astype(np.int64) * cashouts // 100
+
+    def settle(self) -> Tuple[np.ndarray, Optional[int], int]:
+        """محاسبه جوایز، صندلی برنده (بیشترین جایزه) و مجموع جوایز"""
+        prizes = self.prizes()
+        if not self.count:
+            return prizes, None, 0
+
+        # argmax اولین بیشینه را برمی‌گرداند؛ اگر هیچ بازیکنی خارج نشده باشد، اولین شرط‌بند برنده ثبت می‌شود
+        return prizes, int(self.seats[int(prizes.argmax())]), int(prizes.sum())
+
+    def payouts(self, stake: int, prizes: np.ndarray) -> np.ndarray:
+        """مبلغ بازگشتی به credit هر صندلی: stake قفل شده منهای شرط به علاوه جایزه
+
+        بازیکنی که شرط نبسته کل stake خود را پس می‌گیرد.
+        """
+        seats, amounts, _, _ = self.columns()
+        payouts = np.full(len(self.slots), stake, dtype=np.int64)
+        payouts[seats] += prizes - amounts
+        return payouts
+
+    def prize_distribution(self, prizes: np.ndarray, keys: Sequence) -> Dict:
+        """تبدیل ستون جوایز به دیکشنری {keys[seat]: prize}"""
+        return dict(zip(map(keys.__getitem__, self.columns()[0].tolist()), prizes.tolist()))
@@ -0,0 +1,114 @@
+# backend/game_engine/cards.py
+from enum import Enum
+from typing import Dict, List, Optional, Sequence
+
+class Suit(Enum):
+    HEARTS = "hearts"
+    DIAMONDS = "diamonds"
+    CLUBS = "clubs"
+    SPADES = "spades"
+
+class Rank(Enum):
+    TWO = "2"
+    THREE = "3"
+    FOUR = "4"
+    FIVE = "5"
+    SIX = "6"
+    SEVEN = "7"
+    EIGHT = "8"
+    NINE = "9"
+    TEN = "10"
+    JACK = "J"
+    QUEEN = "Q"
+    KING = "K"
+    ACE = "A"
+
+# کدگذاری عددی کارت‌ها: code = suit * 13 + rank (0..51)
+# ترتیب Rank از ضعیف به قوی است، بنابراین اندیس rank همان ارزش کارت است.
+SUITS: List[Suit] = list(Suit)
+RANKS: List[Rank] = list(Rank)
+DECK_SIZE = len(SUITS) * len(RANKS)
+FULL_DECK_MASK = (1 << DECK_SIZE) - 1
+
+CARD_SUIT: List[int] = [code // len(RANKS) for code in range(DECK_SIZE)]
+CARD_RANK: List[int] = [code % len(RANKS) for code in range(DECK_SIZE)]
+
+# نمایش رشته‌ای کارت‌ها فقط در مرز شبکه استفاده می‌شود (مثلاً "10H")
+CARD_STR: List[str] = [
+    f"{RANKS[CARD_RANK[code]].value}{SUITS[CARD_SUIT[code]].value[0].upper()}"
+    for code in range(DECK_SIZE)
+]
+CARD_CODES: Dict[str, int] = {}
+for _code, _card in enumerate(CARD_STR):
+    CARD_CODES[_card] = _code
+    CARD_CODES[_card[:-1] + _card[-1].lower()] = _code
+
+SUIT_CODES: Dict[str, int] = {suit.value: index for index, suit in enumerate(SUITS)}
+
+# ماسک بیتی تمام کارت‌های هر خال
+SUIT_MASKS: List[int] = [
+    sum(1 << (suit * len(RANKS) + rank) for rank in range(len(RANKS)))
+    for suit in range(len(SUITS))
+]
+
+# قدرت هر کارت در یک دست بر اساس (خال حکم، خال شروع): کارت حکم از همه قوی‌تر،
+# سپس کارت‌های خال شروع و در نهایت سایر کارت‌ها که هرگز برنده نمی‌شوند (-1)
+TRICK_STRENGTH: List[List[List[int]]] = [
+    [
+        [
+            CARD_RANK[code] + 2 * len(RANKS) if CARD_SUIT[code] == trump
+            else CARD_RANK[code] + len(RANKS) if CARD_SUIT[code] == lead
+            else -1
+            for code in range(DECK_SIZE)
+        ]
+        for lead in range(len(SUITS))
+    ]
+    for trump in range(len(SUITS))
+]
+
+def parse_card(card_str: str) -> int:
+    """تبدیل رشته کارت به کد عددی"""
+    try:
+        return CARD_CODES[card_str]
+    except (KeyError, TypeError):
+        raise ValueError("Invalid card format")
+
+def parse_suit(suit: str) -> int:
+    """تبدیل نام خال به کد عددی"""
+    try:
+        return SUIT_CODES[suit]
+    except (KeyError, TypeError):
+        raise ValueError("Invalid suit selected")
+
+def hand_cards(hand: int) -> List[int]:
+    """کدهای کارت‌های موجود در ماسک دست به ترتیب صعودی"""
+    cards = []
+    while hand:
+        low = hand & -hand
+        cards.append(low.bit_length() - 1)
+        hand ^= low
+    return cards
+
+def hand_to_strings(hand: int) -> List[str]:
+    """نمایش رشته‌ای کارت‌های دست برای ارسال به کلاینت"""
+    return [CARD_STR[code] for code in hand_cards(hand)]
+
+def legal_moves(hand: int, lead_suit: Optional[int]) -> int:
+    """ماسک کارت‌های مجاز: در صورت داشتن خال شروع فقط همان خال"""
+    if lead_suit is not None:
+        follow = hand & SUIT_MASKS[lead_suit]
+        if follow:
+            return follow
+    return hand
+
+def trick_winner(cards: Sequence[int], trump: int) -> int:
+    """اندیس کارت برنده در یک دست (اولین کارت خال شروع را تعیین می‌کند)"""
+    strength = TRICK_STRENGTH[trump][CARD_SUIT[cards[0]]]
+    best = 0
+    best_strength = strength[cards[0]]
+    for index in range(1, len(cards)):
+        card_strength = strength[cards[index]]
+        if card_strength > best_strength:
+            best = index
+            best_strength = card_strength
+    return best
@@ -0,0 +1,285 @@
+# backend/game_engine/cleanup.py
+import os
+import time
+import uuid
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import and_, insert, or_, select, text
+from ..core import models
+from ..core.database import Session
+from ..core.config import settings
+from ..core.ledger import APPLY_DELTA, balance_cache
+from .event_log import ARCHIVE_GAME, ARCHIVE_PLAYER, ARCHIVE_REFUND, decode_events, encode_event, game_log
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+NO_ID = bytes(16)
+
+# اندیس‌ها در فایل‌های بایگانی ذخیره می‌شوند؛ اعضای جدید enum فقط به انتها اضافه شوند
+GAME_TYPES = list(models.GameType)
+GAME_STATUSES = list(models.GameStatus)
+
+GAME_COLUMNS = [
+    models.Game.id, models.Game.game_type, models.Game.status, models.Game.stake,
+    models.Game.created_at, models.Game.started_at, models.Game.completed_at,
+    models.Game.winner, models.Game.prize_pool
+]
+
+PLAYER_COLUMNS = [
+    models.GamePlayer.game_id, models.GamePlayer.user_id, models.GamePlayer.joined_at,
+    models.GamePlayer.position, models.GamePlayer.credit_change
+]
+
+# تعداد پارامترها به اندازه دسته وابسته نیست: یک آرایه uuid برای کل دسته
+SELECT_PLAYERS = text("""
+    SELECT game_id, user_id, joined_at, position, credit_change
+    FROM game_players
+    WHERE game_id = ANY(CAST(:ids AS uuid[]))
+    ORDER BY game_id, position
+""").columns(*PLAYER_COLUMNS)
+
+DELETE_PLAYERS = text("DELETE FROM game_players WHERE game_id = ANY(CAST(:ids AS uuid[]))")
+
+DELETE_GAMES = text("DELETE FROM games WHERE id = ANY(CAST(:ids AS uuid[]))")
+
+INIT_CHECKPOINT = text("""
+    INSERT INTO rollup_watermarks (name, high_water) VALUES (:name, NULL)
+    ON CONFLICT (name) DO NOTHING
+""")
+
+SELECT_CHECKPOINT = text("SELECT high_water FROM rollup_watermarks WHERE name = :name")
+
+UPDATE_CHECKPOINT = text("UPDATE rollup_watermarks SET high_water = :high_water WHERE name = :name")
+
+
+class CleanupKind:
+    """یک دسته از بازی‌های قابل حذف با کلید مرتب‌سازی و checkpoint جدا"""
+
+    def __init__(self, name: str, key, condition: Callable[[datetime], Any]):
+        self.name = name
+        self.key = key
+        self.condition = condition
+        self.checkpoint = f"game_cleanup:{name}"
+
+
+KINDS = [
+    CleanupKind("completed", models.Game.completed_at, lambda cutoff: and_(
+        models.Game.status == models.GameStatus.COMPLETED,
+        models.Game.completed_at < cutoff
+    )),
+    CleanupKind("abandoned", models.Game.created_at, lambda cutoff: and_(
+        models.Game.status.in_([models.GameStatus.WAITING, models.GameStatus.ACTIVE]),
+        models.Game.created_at < cutoff
+    )),
+]
+
+def _timestamp(moment: Optional[datetime]) -> float:
+    return (moment - EPOCH).total_seconds() if moment is not None else 0.0
+
+def _number(value: Optional[int]) -> int:
+    return value if value is not None else -1
+
+def _index(members: list, value) -> int:
+    return members.index(value) if value is not None else -1
+
+def refund_stakes(db: Session, games: Sequence[Any], players: Sequence[Any], now: datetime) -> Dict[uuid.UUID, List[Tuple[uuid.UUID, int]]]:
+    """آزاد کردن شرط قفل شده بازیکنان بازی‌های تسویه نشده در تراکنش جاری
+
+    تسویه وضعیت بازی را در همان commit به COMPLETED می‌برد، پس شرط بازیکنان
+    هر بازی دیگری هنوز قفل است.
+
+    شرط هر بازیکن با همان UPDATE اتمیک دفتر کل از locked_credit به credit
+    برمی‌گردد و یک تراکنش REFUND ثبت می‌شود. اگر locked_credit کافی نباشد
+    (شرطی که هرگز قفل نشده) بازگشتی انجام نمی‌شود. خروجی: {game_id: [(user_id, مبلغ)]}
+    """
+    stakes = {
+        game.id: game.stake for game in games
+        if game.status != models.GameStatus.COMPLETED and game.stake
+    }
+    refunds: Dict[uuid.UUID, List[Tuple[uuid.UUID, int]]] = {}
+    rows = []
+    for player in players:
+        stake = stakes.get(player.game_id)
+        if stake is None:
+            continue
+        refunded = db.execute(APPLY_DELTA, {
+            "user_id": player.user_id,
+            "real_delta": 0,
+            "credit_delta": stake,
+            "locked_delta": -stake,
+            "now": now
+        }).first()
+        if refunded is None:
+            logger.warning(f"No locked stake to refund for user {player.user_id} in game {player.game_id}")
+            continue
+        refunds.setdefault(player.game_id, []).append((player.user_id, stake))
+        rows.append({
+            "id": uuid.uuid4(),
+            "user_id": player.user_id,
+            "amount": stake,
+            "type": models.TransactionType.REFUND,
+            "description": f"Game {player.game_id} abandoned, stake refunded",
+            "created_at": now,
+            "reference_id": player.game_id
+        })
+    if rows:
+        db.execute(insert(models.Transaction), rows)
+    return refunds
+
+def encode_archive(
+    games: Sequence[Any],
+    players: Sequence[Any],
+    archived_at: float,
+    refunds: Optional[Dict[uuid.UUID, List[Tuple[uuid.UUID, int]]]] = None
+) -> bytes:
+    """رکوردهای بایگانی یک دسته: برای هر بازی ردیف آن، بازیکنان، شرط‌های بازگردانده و لاگ رویدادهایش
+
+    رویدادهای لاگ بازی دوباره کدگذاری می‌شوند تا رکورد ناقص انتهای یک فایل
+    رکوردهای بازی بعدی را خراب نکند.
+    """
+    by_game: Dict[uuid.UUID, List[Any]] = {}
+    for player in players:
+        by_game.setdefault(player.game_id, []).append(player)
+
+    data = bytearray()
+    for game in games:
+        data += encode_event(ARCHIVE_GAME, (
+            game.id.bytes,
+            _index(GAME_TYPES, game.game_type),
+            _index(GAME_STATUSES, game.status),
+            _number(game.stake),
+            _timestamp(game.created_at),
+            _timestamp(game.started_at),
+            _timestamp(game.completed_at),
+            game.winner.bytes if game.winner is not None else NO_ID,
+            _number(game.prize_pool)
+        ), archived_at)
+        for player in by_game.get(game.id, ()):
+            data += encode_event(ARCHIVE_PLAYER, (
+                player.user_id.bytes,
+                _timestamp(player.joined_at),
+                _number(player.position),
+                _number(player.credit_change)
+            ), archived_at)
+        for user_id, amount in (refunds or {}).get(game.id, ()):
+            data += encode_event(ARCHIVE_REFUND, (user_id.bytes, amount), archived_at)
+
+        path = game_log.path_for(game.id)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                for code, timestamp, fields in decode_events(f.read()):
+                    data += encode_event(code, fields, timestamp)
+    return bytes(data)
+
+def write_archive(directory: str, name: str, data: bytes) -> str:
+    """نوشتن پایدار فایل بایگانی پیش از حذف ردیف‌ها؛ مسیر فایل را برمی‌گرداند"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}.log")
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    return path
+
+def _next_batch(db: Session, kind: CleanupKind, cutoff: datetime, after, checkpoint, batch_size: int):
+    query = select(*GAME_COLUMNS).where(kind.condition(cutoff))
+    if after is not None:
+        key, game_id = after
+        query = query.where(kind.key >= key, or_(kind.key > key, models.Game.id > game_id))
+    elif checkpoint is not None:
+        # ردیف‌های هم‌زمان با checkpoint دوباره دیده می‌شوند؛ ردیف‌های حذف شده دیگر وجود ندارند
+        query = query.where(kind.key >= checkpoint)
+    query = query.order_by(kind.key, models.Game.id).limit(batch_size).with_for_update()
+    return db.execute(query).all()
+
+def cleanup_games(
+    db: Session,
+    now: Optional[datetime] = None,
+    directory: str = settings.GAME_ARCHIVE_DIR,
+    batch_size: int = settings.GAME_CLEANUP_BATCH_SIZE,
+    max_batches: int = settings.GAME_CLEANUP_MAX_BATCHES
+) -> Dict[str, Any]:
+    """بایگانی و حذف دسته‌ای بازی‌های تمام شده و رها شده قدیمی
+
+    بازی‌ها با keyset روی (کلید زمانی، id) دسته به دسته خوانده و قفل
+    می‌شوند؛ هر دسته ابتدا در یک فایل بایگانی با فرمت لاگ رویدادها روی
+    دیسک نوشته می‌شود و سپس ردیف‌های آن با یک DELETE آرایه‌ای در یک
+    تراکنش کوتاه حذف می‌شوند؛ شرط قفل شده بازیکنان بازی‌های تسویه نشده
+    در همان تراکنش بازگردانده می‌شود. checkpoint هر نوع (در rollup_watermarks) در
+    همان تراکنش جلو می‌رود تا اجرای بعدی از همان نقطه ادامه دهد.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=settings.GAME_RETENTION_DAYS)
+    run_directory = os.path.join(directory, now.strftime("%Y-%m-%d"))
+    started = time.monotonic()
+    result: Dict[str, Any] = {"status": "success"}
+    batches = 0
+
+    for kind in KINDS:
+        stats = {"games": 0, "players": 0, "refunds": 0, "refunded_credit": 0, "batches": 0, "archive_bytes": 0}
+        result[kind.name] = stats
+        db.execute(INIT_CHECKPOINT, {"name": kind.checkpoint})
+        checkpoint = db.execute(SELECT_CHECKPOINT, {"name": kind.checkpoint}).scalar()
+        db.commit()
+
+        after: Optional[Tuple[datetime, uuid.UUID]] = None
+        while batches < max_batches:
+            path = None
+            try:
+                games = _next_batch(db, kind, cutoff, after, checkpoint, batch_size)
+                if not games:
+                    db.rollback()
+                    break
+                ids = [str(game.id) for game in games]
+                players = db.execute(SELECT_PLAYERS, {"ids": ids}).all()
+                # شرط‌های قفل شده پیش از حذف ردیف بازیکنان و در همین تراکنش آزاد می‌شوند
+                refunds = refund_stakes(db, games, players, datetime.utcnow())
+
+                data = encode_archive(games, players, time.time(), refunds)
+                path = write_archive(run_directory, f"{kind.name}-{now:%H%M%S}-{batches:05d}", data)
+
+                db.execute(DELETE_PLAYERS, {"ids": ids})
+                db.execute(DELETE_GAMES, {"ids": ids})
+                last = games[-1]
+                after = (getattr(last, kind.key.key), last.id)
+                db.execute(UPDATE_CHECKPOINT, {"name": kind.checkpoint, "high_water": after[0]})
+                db.commit()
+            except Exception:
+                db.rollback()
+                # ردیف‌ها باقی مانده‌اند؛ بایگانی این دسته در اجرای بعدی دوباره نوشته می‌شود
+                if path is not None and os.path.exists(path):
+                    os.remove(path)
+                raise
+
+            for game in games:
+                log_path = game_log.path_for(game.id)
+                if os.path.exists(log_path):
+                    os.remove(log_path)
+            refunded = [refund for game_refunds in refunds.values() for refund in game_refunds]
+            if refunded:
+                balance_cache.invalidate({user_id for user_id, _ in refunded})
+
+            batches += 1
+            stats["games"] += len(games)
+            stats["players"] += len(players)
+            stats["refunds"] += len(refunded)
+            stats["refunded_credit"] += sum(amount for _, amount in refunded)
+            stats["batches"] += 1
+            stats["archive_bytes"] += len(data)
+
+    elapsed = time.monotonic() - started
+    games_cleaned = sum(result[kind.name]["games"] for kind in KINDS)
+    result.update({
+        "elapsed": round(elapsed, 3),
+        "games_per_second": round(games_cleaned / elapsed, 1) if elapsed > 0 else 0.0,
+        "complete": batches < max_batches
+    })
+    logger.info(
+        f"Cleaned up {games_cleaned} old games in {batches} batches "
+        f"({result['games_per_second']} games/s)"
+    )
+    return result
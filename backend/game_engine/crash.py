@@ -1,33 +1,69 @@
 # backend/game_engine/crash.py
 import asyncio
+import heapq
+import math
 import random
-from typing import Dict, List, Optional
+import struct
+import time
+from typing import Dict, List, Optional, Tuple
 import uuid
 from datetime import datetime
 from decimal import Decimal
+import numpy as np
 from ..core import models, schemas, crud
 from ..core.database import Session
+from ..core.config import settings
+from ..core.utils import generate_fair_random
 from .base import GameEngine
+from .bet_book import BetBook, UNSET
+from .event_log import CRASH_ROUND, CRASH_BET, CRASH_FLIGHT, CRASH_CASHOUT, CRASH_CRASHED
+from .seed_chain import get_seed_chain
+
+def multiplier_at(elapsed: float, growth_rate: float = settings.CRASH_GROWTH_RATE) -> float:
+    """ضریب پس از elapsed ثانیه از شروع پرواز: m(t) = e^(r·t) گرد شده به پایین تا دو رقم"""
+    if elapsed <= 0:
+        return 1.0
+    return math.floor(math.exp(growth_rate * elapsed) * 100) / 100
+
+def crash_point_from_seed(seed: bytes, client_seed: str = settings.CRASH_CLIENT_SEED) -> float:
+    """تعیین نقطه Crash از بذر زنجیره؛ هر کسی با داشتن بذر می‌تواند آن را بازتولید کند"""
+    random_value = generate_fair_random(seed.hex(), client_seed, 0)  # عددی بین 0 تا 1
+    if random_value >= 1.0:
+        return 100.0
+    
+    # فرمول تعیین نقطه Crash (میتواند تنظیم شود)
+    crash_point = 1.0 + (100.0 / (1.0 - random_value) - 1.0) * 0.01
+    return min(round(crash_point, 2), 100.0)  # حداکثر 100x
+
+def crash_time(crash_point: float, growth_rate: float = settings.CRASH_GROWTH_RATE) -> float:
+    """زمان رسیدن منحنی به نقطه Crash (معکوس m(t))"""
+    return math.log(crash_point) / growth_rate
+# snapshot: اندیس و بذر، نقطه Crash، ضریب، پایان شرط‌بندی و شروع پرواز (زمان یونیکس، 0 یعنی نامشخص)،
+# وضعیت Crash و تعداد شرط‌ها؛ سپس ستون‌های دفتر شرط (صندلی، مبلغ، خروج، هدف خودکار)
+SNAPSHOT = struct.Struct("<Q32sddddBI")
+SNAPSHOT_COLUMNS = (np.uint32, np.int32, np.uint32, np.uint32)  # ضرایب به صدم صحیح
 
 class CrashGame(GameEngine):
     """موتور بازی Crash (انفجار)"""
     
-    def __init__(self, db: Session, game_id: uuid.UUID):
-        super().__init__(db, game_id)
+    def __init__(self, db: Session, game_id: uuid.UUID, **kwargs):
+        super().__init__(db, game_id, **kwargs)
         self.multiplier: float = 1.0
-        self.crash_point: float = self._generate_crash_point()
-        self.player_bets: Dict[uuid.UUID, Dict] = {}  # {player_id: {'amount': int, 'cashout': float}}
-        self.cashed_out: Dict[uuid.UUID, float] = {}  # {player_id: cashout_multiplier}
+        self.seed_index: Optional[int] = None
+        self.server_seed: Optional[bytes] = None
+        self.crash_point: Optional[float] = None  # هنگام شروع بازی از زنجیره بذر تعیین می‌شود
+        self.bets = BetBook(len(self.players))
+        self.auto_cashouts: List[Tuple[float, int]] = []  # heap: (target, slot)
+        self.growth_rate: float = settings.CRASH_GROWTH_RATE
+        self.betting_ends_at: Optional[float] = None  # time.time() پایان مرحله شرط‌بندی
+        self.flight_started_at: Optional[float] = None  # time.monotonic() شروع پرواز
+        self.crashed: bool = False
     
     def _generate_crash_point(self) -> float:
         """تولید نقطه Crash با الگوریتم منصفانه"""
         # استفاده از hash chain برای اطمینان از منصفانه بودن
-        game_hash = str(self.game_id) + str(datetime.utcnow().timestamp())
-        hash_int = int(hash(game_hash) % 1000) / 1000  # عددی بین 0 تا 1
-        
-        # فرمول تعیین نقطه Crash (میتواند تنظیم شود)
-        crash_point = 1.0 + (100.0 / (1.0 - hash_int) - 1.0) * 0.01
-        return min(crash_point, 100.0)  # حداکثر 100x
+        self.seed_index, self.server_seed = get_seed_chain().next_seed()
+        return crash_point_from_seed(self.server_seed)
     
     async def start_game(self):
         """شروع بازی Crash"""
@@ -37,6 +73,9 @@ class CrashGame(GameEngine):
         if len(self.players) < 2:
             raise ValueError("Minimum 2 players required")
         
+        self.crash_point = self._generate_crash_point()
+        self.record_event(CRASH_ROUND, self.seed_index, self.server_seed)
+        
         # تغییر وضعیت بازی به ACTIVE
         self.game.status = schemas.GameStatus.ACTIVE
         self.game.started_at = datetime.utcnow()
@@ -51,26 +90,63 @@ class CrashGame(GameEngine):
         })
         
         # مرحله شرط‌بندی
+        self.betting_ends_at = time.time() + 15
         await asyncio.sleep(15)
         
         # شروع محاسبه ضریب
         await self.run_multiplier()
     
+    def elapsed(self) -> float:
+        """زمان سپری شده از شروع پرواز بر حسب ثانیه"""
+        if self.flight_started_at is None:
+            return 0.0
+        return time.monotonic() - self.flight_started_at
+    
+    def has_crashed(self) -> bool:
+        """آیا منحنی به نقطه Crash رسیده است"""
+        if self.crashed:
+            return True
+        if self.flight_started_at is None:
+            return False
+        return self.elapsed() >= crash_time(self.crash_point, self.growth_rate)
+    
+    def current_multiplier(self) -> float:
+        """ضریب لحظه‌ای با محاسبه O(1) از روی زمان"""
+        return min(multiplier_at(self.elapsed(), self.growth_rate), self.crash_point)
+    
     async def run_multiplier(self):
-        """اجرای محاسبه و افزایش ضریب"""
-        while self.multiplier < self.crash_point:
-            await asyncio.sleep(0.5)
-            self.multiplier = round(self.multiplier + 0.1, 1)
-            
-            # ارسال ضریب به همه بازیکنان
-            await self.broadcast({
-                "type": "multiplier_update",
-                "multiplier": self.multiplier,
-                "time_left": 1.0  # زمان تا بروزرسانی بعدی
-            })
-            
-            # بررسی بازیکنانی که می‌خواهند خارج شوند
-            await self.check_cashouts()
+        """اجرای پرواز: پارامترهای منحنی یک بار ارسال می‌شوند و کلاینت‌ها ضریب را محلی رسم می‌کنند"""
+        # پس از resume، پرواز از همان زمان شروع قبلی ادامه پیدا می‌کند
+        if self.flight_started_at is None:
+            self.flight_started_at = time.monotonic()
+            self.record_event(CRASH_FLIGHT)
+        
+        await self.broadcast({
+            "type": "flight_started",
+            "started_at": time.time() - self.elapsed(),
+            "growth_rate": self.growth_rate
+        })
+        
+        # به جای تیک‌های دوره‌ای، فقط در زمان رسیدن به هدف‌های auto-cashout
+        # و سپس در لحظه Crash بیدار می‌شویم
+        while self.auto_cashouts and self.auto_cashouts[0][0] < self.crash_point:
+            target = self.auto_cashouts[0][0]
+            delay = crash_time(target, self.growth_rate) - self.elapsed()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.check_cashouts(max(self.current_multiplier(), target))
+        
+        delay = crash_time(self.crash_point, self.growth_rate) - self.elapsed()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self.crashed = True
+        self.multiplier = self.crash_point
+        self.record_event(CRASH_CRASHED, self.crash_point)
+        
+        await self.broadcast({
+            "type": "crashed",
+            "crash_point": self.crash_point
+        })
         
         # پایان بازی
         await self.end_game()
@@ -88,82 +164,135 @@ class CrashGame(GameEngine):
     
     async def handle_bet(self, player_id: uuid.UUID, action: Dict):
         """پردازش شرط‌بندی بازیکن"""
-        if self.game.status != schemas.GameStatus.ACTIVE:
+        if self.game.status != schemas.GameStatus.ACTIVE or self.flight_started_at is not None:
             raise ValueError("Betting is closed")
         
         bet_amount = action.get("amount", 0)
-        if bet_amount <= 0:
+        if not isinstance(bet_amount, int) or isinstance(bet_amount, bool) or bet_amount <= 0:
             raise ValueError("Invalid bet amount")
+        # شرط از همان stake قفل شده هنگام پیوستن برداشته می‌شود
+        if bet_amount > (self.game.stake or 0):
+            raise ValueError("Bet exceeds locked stake")
+        
+        auto_cashout = action.get("auto_cashout")
+        if auto_cashout is not None:
+            # فقط عدد یا رشته عددی؛ float روی dict و list خطای TypeError می‌دهد
+            if isinstance(auto_cashout, bool) or not isinstance(auto_cashout, (int, float, str)):
+                raise ValueError("Invalid auto cashout target")
+            try:
+                auto_cashout = round(float(auto_cashout), 2)
+            except ValueError:
+                raise ValueError("Invalid auto cashout target")
+            if not math.isfinite(auto_cashout) or auto_cashout <= 1.0:
+                raise ValueError("Invalid auto cashout target")
         
         # ذخیره اطلاعات شرط‌بندی
-        self.player_bets[player_id] = {
-            "amount": bet_amount,
-            "cashout": None
-        }
+        seat = self.player_seats[player_id]
+        slot = self.bets.place(seat, bet_amount, auto_cashout)
+        self.record_event(CRASH_BET, seat, bet_amount, auto_cashout or UNSET)
+        if auto_cashout is not None:
+            heapq.heappush(self.auto_cashouts, (auto_cashout, slot))
         
         await self.notify_player(player_id, {
             "type": "bet_accepted",
             "amount": bet_amount,
+            "auto_cashout": auto_cashout,
             "message": "Your bet has been placed"
         })
     
     async def handle_cashout(self, player_id: uuid.UUID):
         """پردازش درخواست خارج شدن بازیکن"""
-        if player_id not in self.player_bets:
+        slot = self.bets.slot_of(self.player_seats[player_id])
+        if slot is None:
             raise ValueError("No active bet for this player")
         
-        if self.player_bets[player_id]["cashout"] is not None:
+        if self.bets.cashout_of(slot) is not None:
             raise ValueError("Already cashed out")
         
-        # ثبت نقطه خارج شدن
-        self.player_bets[player_id]["cashout"] = self.multiplier
-        self.cashed_out[player_id] = self.multiplier
+        if self.flight_started_at is None:
+            raise ValueError("Flight has not started")
+        
+        if self.has_crashed():
+            raise ValueError("Game already crashed")
+        
+        # ثبت نقطه خارج شدن بر اساس m(now)؛ هدف‌های خودکار عقب‌افتاده اول تسویه می‌شوند.
+        # وضعیت خروج پیش از اولین await ثبت می‌شود تا Crash و end_game در حین
+        # ارسال پیام‌ها نتوانند پیش از آن تسویه شوند
+        multiplier = self.current_multiplier()
+        settled = self._settle_auto_cashouts(multiplier)
+        already_cashed_out = self.bets.cashout_of(slot) is not None
+        if not already_cashed_out:
+            self.multiplier = multiplier
+            self.bets.set_cashout(slot, multiplier)
+            self.record_event(CRASH_CASHOUT, self.player_seats[player_id], multiplier)
+        
+        await self._notify_auto_cashouts(settled)
+        if already_cashed_out:
+            raise ValueError("Already cashed out")
         
         await self.notify_player(player_id, {
             "type": "cashout_processed",
-            "multiplier": self.multiplier,
-            "message": f"Successfully cashed out at {self.multiplier}x"
+            "multiplier": multiplier,
+            "message": f"Successfully cashed out at {multiplier}x"
         })
     
-    async def check_cashouts(self):
-        """بررسی خودکار خارج شدن بازیکنان"""
-        # TODO: پیاده‌سازی منطق auto-cashout اگر نیاز باشد
-        pass
+    async def check_cashouts(self, multiplier: float) -> List[uuid.UUID]:
+        """تسویه تمام هدف‌های auto-cashout کوچک‌تر یا مساوی ضریب فعلی
+
+        فقط هدف‌های اکیداً کمتر از نقطه Crash تسویه می‌شوند (همان شرط
+        run_multiplier). هدف‌ها در یک heap نگهداری می‌شوند، بنابراین هزینه
+        هر بار فراخوانی O(k log n) برای k هدف تسویه شده است و کل شرط‌ها
+        پیمایش نمی‌شوند.
+        """
+        settled = self._settle_auto_cashouts(multiplier)
+        await self._notify_auto_cashouts(settled)
+        return [player_id for player_id, _ in settled]
+    
+    def _settle_auto_cashouts(self, multiplier: float) -> List[Tuple[uuid.UUID, float]]:
+        """ثبت خروج هدف‌های رسیده بدون await؛ خروجی: [(player_id, target)]"""
+        settled = []
+        while self.auto_cashouts:
+            target, slot = self.auto_cashouts[0]
+            if target > multiplier or target >= self.crash_point:
+                break
+            heapq.heappop(self.auto_cashouts)
+            # ورودی‌های کهنه (خروج دستی یا شرط جایگزین شده) نادیده گرفته می‌شوند
+            if not self.bets.is_pending_auto(slot, target):
+                continue
+            self.bets.set_cashout(slot, target)
+            seat = self.bets.seat_of(slot)
+            self.record_event(CRASH_CASHOUT, seat, target)
+            settled.append((self.players[seat].id, target))
+        return settled
+    
+    async def _notify_auto_cashouts(self, settled: List[Tuple[uuid.UUID, float]]):
+        for player_id, target in settled:
+            await self.notify_player(player_id, {
+                "type": "cashout_processed",
+                "multiplier": target,
+                "auto": True,
+                "message": f"Auto cashed out at {target}x"
+            })
     
     async def end_game(self):
         """پایان بازی و محاسبه نتایج"""
         self.game.status = schemas.GameStatus.COMPLETED
         self.game.completed_at = datetime.utcnow()
         
-        # محاسبه جوایز
-        prize_distribution = {}
-        winner_id = None
-        max_prize = 0
-        
-        for player_id, bet_info in self.player_bets.items():
-            if bet_info["cashout"] is not None:
-                # بازیکن با موفقیت خارج شده
-                prize = int(bet_info["amount"] * bet_info["cashout"])
-                prize_distribution[player_id] = prize
-                
-                if prize > max_prize:
-                    max_prize = prize
-                    winner_id = player_id
-            else:
-                # بازیکن خارج نشده و تمام شرط را از دست داده
-                prize_distribution[player_id] = 0
-        
-        # اگر همه بازیکنان خارج نشده‌اند، کسی با بیشترین مقدار خارج شده برنده است
-        if not winner_id and self.player_bets:
-            winner_id = next(iter(self.player_bets.keys()))
-        
-        # ذخیره نتایج
-        self.game.winner = winner_id
-        self.game.prize_pool = sum(prize_distribution.values())
-        self.db.commit()
+        # محاسبه جوایز روی ستون‌های دفتر شرط (بازیکنان خارج نشده جایزه صفر دارند)
+        prizes, winner_seat, prize_pool = self.bets.settle()
+        winner_id = self.players[winner_seat].id if winner_seat is not None else None
+        player_ids = [player.id for player in self.players]
+        prize_distribution = self.bets.prize_distribution(prizes, player_ids)
         
-        # توزیع جوایز
-        self._distribute_prizes(winner_id, prize_distribution)
+        # stake قفل شده همه بازیکنان آزاد می‌شود؛ بخش شرط نشده آن به همراه جایزه برمی‌گردد
+        # (تراکنش هر بازیکن نتیجه خالص است: برد، باخت مبلغ شرط، یا آزاد شدن stake بدون شرط)
+        payouts = self.bets.payouts(self.game.stake or 0, prizes)
+        
+        # ذخیره نتایج و توزیع جوایز در یک تراکنش
+        self.game.winner = winner_id
+        self.game.prize_pool = prize_pool
+        self._distribute_prizes(player_ids, payouts.tolist())
         
         # ارسال نتایج نهایی
         await self.broadcast({
@@ -171,12 +300,96 @@ class CrashGame(GameEngine):
             "winner": winner_id,
             "crash_point": self.crash_point,
             "final_multiplier": self.multiplier,
-            "prize_distribution": prize_distribution
+            "prize_distribution": prize_distribution,
+            # افشای بذر برای بررسی: sha256(server_seed) برابر بذر بازی قبلی است
+            "server_seed": self.server_seed.hex(),
+            "seed_index": self.seed_index
         })
         
         # لاگ رویداد
         self.log_event("game_completed", {
             "crash_point": self.crash_point,
+            "seed_index": self.seed_index,
             "multiplier": self.multiplier,
             "prize_distribution": prize_distribution
         })
+    
+    async def apply_event(self, code: int, timestamp: float, fields: tuple):
+        """بازسازی وضعیت از لاگ؛ خروج‌ها با همان ضریب ثبت شده اعمال می‌شوند"""
+        if code == CRASH_ROUND:
+            self.seed_index, self.server_seed = fields
+            self.crash_point = crash_point_from_seed(self.server_seed)
+            self.game.status = schemas.GameStatus.ACTIVE
+        elif code == CRASH_BET:
+            seat, amount, auto_cashout = fields
+            slot = self.bets.place(seat, amount, auto_cashout or None)
+            if auto_cashout != UNSET:
+                heapq.heappush(self.auto_cashouts, (auto_cashout, slot))
+        elif code == CRASH_FLIGHT:
+            # زمان شروع پرواز از ساعت دیواری ثبت شده به ساعت monotonic این پروسه منتقل می‌شود
+            self.flight_started_at = time.monotonic() - (time.time() - timestamp)
+        elif code == CRASH_CASHOUT:
+            seat, multiplier = fields
+            self.multiplier = multiplier
+            self.bets.set_cashout(self.bets.slot_of(seat), multiplier)
+        elif code == CRASH_CRASHED:
+            self.crashed = True
+            self.multiplier = self.crash_point
+            await self.end_game()
+    
+    def snapshot(self) -> bytes:
+        """وضعیت فشرده دور جاری؛ ستون‌های دفتر شرط مستقیماً کپی می‌شوند"""
+        now = time.time()
+        header = SNAPSHOT.pack(
+            self.seed_index or 0,
+            self.server_seed or bytes(32),
+            self.crash_point or 0.0,
+            self.multiplier,
+            self.betting_ends_at or 0.0,
+            now - self.elapsed() if self.flight_started_at is not None else 0.0,
+            self.crashed,
+            len(self.bets)
+        )
+        # join بافر ستون‌ها را مستقیماً کپی می‌کند (بدون tobytes میانی)
+        return b"".join((header, *self.bets.columns()))
+    
+    def restore(self, data: bytes):
+        """بازگردانی وضعیت از snapshot و ساخت دوباره heap هدف‌های auto-cashout"""
+        (
+            self.seed_index, self.server_seed, self.crash_point, self.multiplier,
+            betting_ends_at, flight_started, crashed, count
+        ) = SNAPSHOT.unpack_from(data, 0)
+        self.betting_ends_at = betting_ends_at or None
+        self.flight_started_at = (
+            time.monotonic() - (time.time() - flight_started) if flight_started else None
+        )
+        self.crashed = bool(crashed)
+        
+        columns = []
+        offset = SNAPSHOT.size
+        for dtype in SNAPSHOT_COLUMNS:
+            columns.append(np.frombuffer(data, dtype=dtype, count=count, offset=offset))
+            offset += np.dtype(dtype).itemsize * count
+        
+        self.bets = BetBook(len(self.players))
+        self.bets.load(*columns)
+        self.auto_cashouts = self.bets.pending_auto_cashouts()
+        heapq.heapify(self.auto_cashouts)
+    
+    async def resume(self):
+        """ادامه دور از همان مرحله‌ای که متوقف شده بود"""
+        if self.crashed:
+            await self.end_game()
+            return
+        
+        if self.flight_started_at is None:
+            delay = (self.betting_ends_at or 0.0) - time.time()
+            await self.broadcast({
+                "type": "game_resumed",
+                "message": "Game resumed! Place your bets",
+                "time_left": max(delay, 0)
+            })
+            if delay > 0:
+                await asyncio.sleep(delay)
+        
+        await self.run_multiplier()
@@ -0,0 +1,272 @@
+# backend/game_engine/event_log.py
+import argparse
+import asyncio
+import atexit
+import json
+import os
+import struct
+import time
+import uuid
+import logging
+from typing import Dict, Iterator, List, Optional, Tuple
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# هر رکورد: طول بدنه، کد رویداد، زمان یونیکس و سپس بدنه با ساختار ثابت همان رویداد
+FRAME = struct.Struct("<IBd")
+
+# کدهای رویداد (مقادیر در فایل‌ها ذخیره می‌شوند و نباید تغییر کنند)
+EVENT_JSON = 0  # رویدادهای عمومی log_event: (نام، داده)
+HOKM_DEAL = 1  # (صندلی حکم‌دهنده، ترتیب دسته پس از بُر زدن)
+HOKM_TRUMP = 2  # (صندلی، خال)
+HOKM_PLAY = 3  # (صندلی، کد کارت)
+CRASH_ROUND = 10  # (اندیس بذر، بذر سرور)
+CRASH_BET = 11  # (صندلی، مبلغ، هدف auto-cashout یا 0)
+CRASH_FLIGHT = 12  # شروع پرواز
+CRASH_CASHOUT = 13  # (صندلی، ضریب)
+CRASH_CRASHED = 14  # (نقطه Crash)
+ARCHIVE_GAME = 20  # ردیف بازی حذف شده؛ رویدادهای بعدی تا رکورد ARCHIVE_GAME بعدی متعلق به آن هستند
+ARCHIVE_PLAYER = 21  # (شناسه کاربر، زمان ورود، موقعیت، تغییر امتیاز)
+ARCHIVE_REFUND = 22  # (شناسه کاربر، شرط قفل شده بازگردانده شده)
+
+EVENT_STRUCTS: Dict[int, struct.Struct] = {
+    HOKM_DEAL: struct.Struct("<B52s"),
+    HOKM_TRUMP: struct.Struct("<BB"),
+    HOKM_PLAY: struct.Struct("<BB"),
+    CRASH_ROUND: struct.Struct("<Q32s"),
+    CRASH_BET: struct.Struct("<Hqd"),
+    CRASH_FLIGHT: struct.Struct("<"),
+    CRASH_CASHOUT: struct.Struct("<Hd"),
+    CRASH_CRASHED: struct.Struct("<d"),
+    # (شناسه، اندیس نوع، اندیس وضعیت، شرط، زمان ایجاد، شروع و پایان، برنده، جایزه)
+    # مقادیر خالی: اندیس و عدد -1، زمان 0 و شناسه ۱۶ بایت صفر
+    ARCHIVE_GAME: struct.Struct("<16sbbqddd16sq"),
+    ARCHIVE_PLAYER: struct.Struct("<16sdqq"),
+    ARCHIVE_REFUND: struct.Struct("<16sq"),
+}
+
+Event = Tuple[int, float, tuple]  # (کد، زمان، فیلدها)
+
+def _jsonable(value):
+    """کلیدهای غیررشته‌ای (مثل UUID بازیکنان) در JSON مجاز نیستند"""
+    if isinstance(value, dict):
+        return {str(key): _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    return value
+
+def encode_event(code: int, fields: tuple, timestamp: Optional[float] = None) -> bytes:
+    """تبدیل یک رویداد به رکورد باینری با پیشوند طول"""
+    if code == EVENT_JSON:
+        body = json.dumps(_jsonable(fields), separators=(",", ":"), default=str).encode()
+    else:
+        body = EVENT_STRUCTS[code].pack(*fields)
+    return FRAME.pack(len(body), code, timestamp or time.time()) + body
+
+def decode_events(data: bytes) -> Iterator[Event]:
+    """خواندن رکوردها به ترتیب؛ رکورد ناقص انتهای فایل (نوشتن نیمه‌کاره) نادیده گرفته می‌شود"""
+    view = memoryview(data)
+    offset = 0
+    while offset + FRAME.size <= len(view):
+        length, code, timestamp = FRAME.unpack_from(view, offset)
+        start = offset + FRAME.size
+        if start + length > len(view):
+            logger.warning(f"Truncated game log record at offset {offset}")
+            break
+        body = view[start:start + length]
+        if code == EVENT_JSON:
+            fields = tuple(json.loads(bytes(body)))
+        else:
+            fields = EVENT_STRUCTS[code].unpack(body)
+        yield code, timestamp, fields
+        offset = start + length
+
+
+def read_archive(data: bytes) -> Iterator[Tuple[tuple, List[tuple], List[Event]]]:
+    """بازی‌های یک فایل بایگانی: (فیلدهای ARCHIVE_GAME، بازیکنان، رویدادها)"""
+    game = None
+    players: List[tuple] = []
+    events: List[Event] = []
+    for code, timestamp, fields in decode_events(data):
+        if code == ARCHIVE_GAME:
+            if game is not None:
+                yield game, players, events
+            game, players, events = fields, [], []
+        elif code == ARCHIVE_PLAYER:
+            players.append(fields)
+        elif game is not None:
+            events.append((code, timestamp, fields))
+    if game is not None:
+        yield game, players, events
+
+
+class GameEventLog:
+    """لاگ رویدادهای بازی: یک فایل append-only برای هر بازی
+
+    رکوردها ابتدا در بافر حافظه جمع می‌شوند و نویسنده پس‌زمینه آن‌ها را
+    به صورت دسته‌ای (هر flush_interval ثانیه یا با پر شدن batch_bytes) و
+    خارج از event loop روی دیسک می‌نویسد. بدون نویسنده پس‌زمینه
+    (مثلاً در workerهای Celery) بافر با رسیدن به همان batch_bytes همزمان
+    نوشته می‌شود و باقی‌مانده آن با flush یا هنگام خروج پروسه.
+    """
+
+    def __init__(
+        self,
+        directory: str = settings.GAME_LOG_DIR,
+        flush_interval: float = settings.GAME_LOG_FLUSH_INTERVAL,
+        batch_bytes: int = settings.GAME_LOG_BATCH_BYTES
+    ):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.batch_bytes = batch_bytes
+        self._pending: Dict[uuid.UUID, bytearray] = {}
+        self._pending_bytes = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._writer: Optional[asyncio.Task] = None
+        self.stats = {"events": 0, "batches": 0, "bytes_written": 0, "errors": 0}
+
+    def path_for(self, game_id: uuid.UUID) -> str:
+        return os.path.join(self.directory, f"{game_id}.log")
+
+    def append(self, game_id: uuid.UUID, code: int, fields: tuple):
+        """افزودن یک رویداد به لاگ بازی"""
+        record = encode_event(code, fields)
+        self.stats["events"] += 1
+
+        self._pending.setdefault(game_id, bytearray()).extend(record)
+        self._pending_bytes += len(record)
+        if self._pending_bytes >= self.batch_bytes:
+            if self._writer is None:
+                self.flush()
+            else:
+                self._wakeup.set()
+
+    def _write_batch(self, batch: Dict[uuid.UUID, bytes]):
+        os.makedirs(self.directory, exist_ok=True)
+        for game_id, data in batch.items():
+            try:
+                with open(self.path_for(game_id), "ab") as f:
+                    f.write(data)
+                self.stats["bytes_written"] += len(data)
+            except OSError as e:
+                self.stats["errors"] += 1
+                logger.error(f"Failed to write game log for {game_id}: {str(e)}")
+        self.stats["batches"] += 1
+
+    def _take_pending(self) -> Dict[uuid.UUID, bytearray]:
+        batch, self._pending = self._pending, {}
+        self._pending_bytes = 0
+        return batch
+
+    async def _writer_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            batch = self._take_pending()
+            if batch:
+                await loop.run_in_executor(None, self._write_batch, batch)
+
+    def read(self, game_id: uuid.UUID) -> List[Event]:
+        """تمام رویدادهای بازی شامل رکوردهای هنوز نوشته نشده"""
+        data = b""
+        path = self.path_for(game_id)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+        data += bytes(self._pending.get(game_id, b""))
+        return list(decode_events(data))
+
+    def flush(self):
+        """نوشتن همزمان تمام رکوردهای بافر شده"""
+        batch = self._take_pending()
+        if batch:
+            self._write_batch(batch)
+
+    def start(self):
+        """راه‌اندازی نویسنده پس‌زمینه"""
+        if self._writer is None or self._writer.done():
+            self._wakeup = asyncio.Event()
+            self._writer = asyncio.create_task(self._writer_loop())
+
+    async def stop(self):
+        """توقف نویسنده پس‌زمینه و نوشتن باقی‌مانده بافر"""
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+        self.flush()
+
+
+# نمونه پیش‌فرض برای استفاده در سراسر برنامه
+game_log = GameEventLog()
+atexit.register(game_log.flush)
+
+async def replay_game(game, players, events: Optional[List[Event]] = None):
+    """بازسازی وضعیت دقیق یک بازی از روی لاگ در یک موتور جدا از دیتابیس
+
+    game و players فقط برای اطلاعات ثابت بازی (نوع، مبلغ شرط، ترتیب صندلی‌ها)
+    استفاده می‌شوند و تغییری نمی‌کنند.
+    """
+    from ..core import models, schemas
+    from .base import GameFactory
+    from .simulator import NullSession
+
+    detached = models.Game(
+        id=game.id,
+        game_type=game.game_type,
+        status=schemas.GameStatus.WAITING,
+        stake=game.stake,
+        created_at=game.created_at
+    )
+    engine = GameFactory.create_game(
+        game.game_type,
+        NullSession(),
+        game.id,
+        game=detached,
+        players=list(players)
+    )
+    await engine.replay(game_log.read(game.id) if events is None else events)
+    return engine
+
+EVENT_NAMES = {
+    EVENT_JSON: "event",
+    HOKM_DEAL: "hokm_deal",
+    HOKM_TRUMP: "hokm_trump",
+    HOKM_PLAY: "hokm_play",
+    CRASH_ROUND: "crash_round",
+    CRASH_BET: "crash_bet",
+    CRASH_FLIGHT: "crash_flight",
+    CRASH_CASHOUT: "crash_cashout",
+    CRASH_CRASHED: "crash_crashed",
+    ARCHIVE_GAME: "archive_game",
+    ARCHIVE_PLAYER: "archive_player",
+    ARCHIVE_REFUND: "archive_refund",
+}
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Game event log tools")
+    parser.add_argument("command", choices=["dump", "archive"])
+    parser.add_argument("target", help="game id, or archive file path for the archive command")
+    parser.add_argument("--dir", default=settings.GAME_LOG_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "archive":
+        with open(args.target, "rb") as f:
+            events = list(decode_events(f.read()))
+    else:
+        events = GameEventLog(args.dir).read(uuid.UUID(args.target))
+    for code, timestamp, fields in events:
+        fields = [field.hex() if isinstance(field, bytes) else field for field in fields]
+        print(f"{timestamp:.3f} {EVENT_NAMES.get(code, code)} {json.dumps(fields, default=str)}")
+
+if __name__ == "__main__":
+    main()
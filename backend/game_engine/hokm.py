@@ -1,50 +1,31 @@
 # backend/game_engine/hokm.py
 import asyncio
 import random
+import struct
 from typing import Dict, List, Optional, Tuple
 import uuid
-from enum import Enum
 from datetime import datetime
 from ..core import models, schemas, crud
 from ..core.database import Session
 from .base import GameEngine
+from .event_log import HOKM_DEAL, HOKM_TRUMP, HOKM_PLAY
+from .cards import (
+    Suit, SUITS, CARD_STR, CARD_SUIT, SUIT_MASKS, DECK_SIZE,
+    parse_card, parse_suit, hand_to_strings, trick_winner
+)
 
-class Suit(Enum):
-    HEARTS = "hearts"
-    DIAMONDS = "diamonds"
-    CLUBS = "clubs"
-    SPADES = "spades"
-
-class Rank(Enum):
-    TWO = "2"
-    THREE = "3"
-    FOUR = "4"
-    FIVE = "5"
-    SIX = "6"
-    SEVEN = "7"
-    EIGHT = "8"
-    NINE = "9"
-    TEN = "10"
-    JACK = "J"
-    QUEEN = "Q"
-    KING = "K"
-    ACE = "A"
-
-class Card:
-    def __init__(self, suit: Suit, rank: Rank):
-        self.suit = suit
-        self.rank = rank
-    
-    def __str__(self):
-        return f"{self.rank.value}{self.suit.value[0].upper()}"
+# snapshot: حکم‌دهنده، نوبت، دور، خال حکم، امتیاز دو تیم، طول دسته، دست چهار صندلی و کارت‌های دست جاری
+# و پس از آن دسته باقی‌مانده و تاریخچه دست‌ها (4 کارت + تیم برنده)
+SNAPSHOT = struct.Struct("<7B4Q4s")
+NO_CARD = 0xFF
 
 class HokmGame(GameEngine):
     """موتور بازی حکم (Hokm)"""
     
-    def __init__(self, db: Session, game_id: uuid.UUID):
-        super().__init__(db, game_id)
-        self.deck: List[Card] = []
-        self.trump_suit: Optional[Suit] = None
+    def __init__(self, db: Session, game_id: uuid.UUID, **kwargs):
+        super().__init__(db, game_id, **kwargs)
+        self.deck: List[int] = []  # کدهای عددی کارت‌ها (0 تا 51)
+        self.trump_suit: Optional[int] = None  # کد خال حکم
         self.hakem_index: int = 0  # ایندکس بازیکن حکم‌دهنده
         self.current_turn: int = 0
         self.current_round: int = 1
@@ -52,28 +33,24 @@ class HokmGame(GameEngine):
             (self.players[0].id, self.players[2].id),  # تیم 1
             (self.players[1].id, self.players[3].id)   # تیم 2
         ]
-        self.player_hands: Dict[uuid.UUID, List[Card]] = {}
+        self.player_hands: Dict[uuid.UUID, int] = {}  # ماسک بیتی 52 بیتی دست هر بازیکن
         self.played_cards: List[Dict] = []  # لیست کارت‌های بازی شده در دور جاری
         self.scores: Dict[int, int] = {0: 0, 1: 0}  # امتیازات تیم‌ها
-        self.game_rounds: List[Dict] = []  # تاریخچه دورها
+        self.game_rounds: List[Tuple[Tuple[int, ...], int]] = []  # (کارت‌های دست، تیم برنده)؛ تاریخچه کامل در لاگ رویدادها است
 
     def _initialize_deck(self):
         """آماده‌سازی دسته کارت"""
-        self.deck = [
-            Card(suit, rank)
-            for suit in Suit
-            for rank in Rank
-        ]
+        self.deck = list(range(DECK_SIZE))
         random.shuffle(self.deck)
     
     def _deal_cards(self):
         """تقسیم کارت‌ها بین بازیکنان"""
-        self.player_hands = {player.id: [] for player in self.players}
+        self.player_hands = {player.id: 0 for player in self.players}
         
         # تقسیم 5 کارت به هر بازیکن
         for i in range(5):
             for player in self.players:
-                self.player_hands[player.id].append(self.deck.pop())
+                self.player_hands[player.id] |= 1 << self.deck.pop()
     
     async def start_game(self):
         """شروع بازی حکم"""
@@ -90,20 +67,21 @@ class HokmGame(GameEngine):
         
         # آماده‌سازی بازی
         self._initialize_deck()
-        self._deal_cards()
         
         # انتخاب تصادفی حکم‌دهنده اول
         self.hakem_index = random.randint(0, 3)
         hakem = self.players[self.hakem_index]
         
-        # اطلاع‌رسانی به بازیکنان
+        # ترتیب دسته ثبت می‌شود تا بازی قابل بازسازی باشد
+        self.record_event(HOKM_DEAL, self.hakem_index, bytes(self.deck))
+        self._deal_cards()
+        
+        # اطلاع‌رسانی به بازیکنان (دست حکم‌دهنده فقط در پیام choose_trump برای خودش ارسال می‌شود)
         await self.broadcast({
             "type": "game_started",
+            "game_id": self.game_id,
             "message": "Game started!",
-            "hakem": hakem.id,
-            "your_hand": [
-                str(card) for card in self.player_hands[hakem.id]
-            ] if self.current_user.id == hakem.id else None
+            "hakem": hakem.id
         })
         
         # شروع دور اول
@@ -114,8 +92,9 @@ class HokmGame(GameEngine):
         hakem = self.players[self.hakem_index]
         await self.notify_player(hakem.id, {
             "type": "choose_trump",
+            "game_id": self.game_id,
             "message": "Please choose trump suit",
-            "your_hand": [str(card) for card in self.player_hands[hakem.id]],
+            "your_hand": hand_to_strings(self.player_hands[hakem.id]),
             "options": [suit.value for suit in Suit]
         })
     
@@ -135,21 +114,21 @@ class HokmGame(GameEngine):
         if player_id != self.players[self.hakem_index].id:
             raise ValueError("Only hakem can choose trump")
         
-        try:
-            self.trump_suit = Suit(action["suit"])
-        except ValueError:
-            raise ValueError("Invalid suit selected")
+        self.trump_suit = parse_suit(action["suit"])
+        trump_name = SUITS[self.trump_suit].value
+        self.record_event(HOKM_TRUMP, self.hakem_index, self.trump_suit)
         
-        # تقسیم بقیه کارت‌ها (حکم‌دهنده 5 کارت اضافه می‌گیرد)
-        for _ in range(5):
-            self.player_hands[player_id].append(self.deck.pop())
+        # تقسیم بقیه کارت‌ها تا هر بازیکن 13 کارت داشته باشد
+        while self.deck:
+            for player in self.players:
+                self.player_hands[player.id] |= 1 << self.deck.pop()
         
         # اطلاع‌رسانی به همه بازیکنان
         await self.broadcast({
             "type": "trump_selected",
-            "trump_suit": self.trump_suit.value,
+            "trump_suit": trump_name,
             "hakem": player_id,
-            "message": f"Trump suit is {self.trump_suit.value}"
+            "message": f"Trump suit is {trump_name}"
         })
         
         # شروع بازی
@@ -162,19 +141,29 @@ class HokmGame(GameEngine):
             raise ValueError("Not your turn")
         
         # یافتن کارت در دست بازیکن
-        card_str = action["card"]
-        card = self._parse_card(card_str)
+        card = parse_card(action["card"])
+        card_str = CARD_STR[card]
+        card_bit = 1 << card
         
-        if card not in self.player_hands[player_id]:
+        if not self.player_hands[player_id] & card_bit:
             raise ValueError("Card not in your hand")
         
+        # بازیکن در صورت داشتن خال شروع باید همان را بازی کند
+        if self.played_cards:
+            lead_suit = CARD_SUIT[self.played_cards[0]["code"]]
+            if CARD_SUIT[card] != lead_suit and self.player_hands[player_id] & SUIT_MASKS[lead_suit]:
+                raise ValueError("You must follow the leading suit")
+        
+        self.record_event(HOKM_PLAY, self.current_turn, card)
+        
         # حذف کارت از دست بازیکن
-        self.player_hands[player_id].remove(card)
+        self.player_hands[player_id] ^= card_bit
         
         # ذخیره کارت بازی شده
         self.played_cards.append({
             "player_id": player_id,
             "card": card_str,
+            "code": card,
             "team": 0 if player_id in self.teams[0] else 1
         })
         
@@ -197,19 +186,16 @@ class HokmGame(GameEngine):
     async def end_round(self):
         """پایان یک دور و محاسبه برنده دور"""
         # تعیین برنده دور
-        winning_card, winning_team = self._determine_round_winner()
+        _, winning_team, winner_id = self._determine_round_winner()
         
         # افزایش امتیاز تیم برنده
         self.scores[winning_team] += 1
         
         # ذخیره اطلاعات دور
-        self.game_rounds.append({
-            "round": self.current_round,
-            "played_cards": self.played_cards.copy(),
-            "winning_team": winning_team,
-            "winning_card": winning_card,
-            "scores": self.scores.copy()
-        })
+        self.game_rounds.append((
+            tuple(played["code"] for played in self.played_cards),
+            winning_team
+        ))
         
         # پاکسازی کارت‌های بازی شده
         self.played_cards.clear()
@@ -220,7 +206,7 @@ class HokmGame(GameEngine):
         else:
             # شروع دور جدید
             self.current_round += 1
-            self.current_turn = winning_team * 2  # اولین بازیکن تیم برنده
+            self.current_turn = self._get_player_index(winner_id)  # برنده دست، دست بعد را شروع می‌کند
             await self.next_turn()
     
     async def end_game(self):
@@ -238,49 +224,37 @@ class HokmGame(GameEngine):
             prize = self.game.stake * 2 if player.id in winner_ids else 0
             prize_distribution[player.id] = prize
         
-        # ذخیره نتایج
+        # ذخیره نتایج و توزیع جوایز در یک تراکنش
         self.game.winner = winner_ids[0]  # اولین بازیکن تیم برنده
         self.game.prize_pool = sum(prize_distribution.values())
-        self.db.commit()
-        
-        # توزیع جوایز
-        self._distribute_prizes(self.game.winner, prize_distribution)
+        self._distribute_prizes(list(prize_distribution), list(prize_distribution.values()))
         
         # ارسال نتایج نهایی
         await self.broadcast({
             "type": "game_result",
+            "game_id": self.game_id,
             "winning_team": winning_team,
             "team_members": winner_ids,
             "final_scores": self.scores,
             "prize_distribution": prize_distribution
         })
+        
+        # لاگ رویداد
+        self.log_event("game_completed", {
+            "winning_team": winning_team,
+            "final_scores": self.scores,
+            "prize_distribution": prize_distribution
+        })
     
-    def _determine_round_winner(self) -> Tuple[str, int]:
+    def _determine_round_winner(self) -> Tuple[str, int, uuid.UUID]:
         """تعیین برنده دور بر اساس کارت‌های بازی شده"""
-        # اولین کارت تعیین کننده رنگ دور است
-        first_card = self._parse_card(self.played_cards[0]["card"])
-        leading_suit = first_card.suit
-        
-        # پیدا کردن قوی‌ترین کارت
-        winning_card = first_card
-        winning_index = 0
-        
-        for i, played in enumerate(self.played_cards[1:], start=1):
-            card = self._parse_card(played["card"])
-            
-            # کارت حکم همیشه برنده است
-            if card.suit == self.trump_suit:
-                if winning_card.suit != self.trump_suit or self._compare_ranks(card.rank, winning_card.rank) > 0:
-                    winning_card = card
-                    winning_index = i
-            # کارت با رنگ اصلی دور
-            elif card.suit == leading_suit and winning_card.suit != self.trump_suit:
-                if self._compare_ranks(card.rank, winning_card.rank) > 0:
-                    winning_card = card
-                    winning_index = i
-        
-        winning_team = self.played_cards[winning_index]["team"]
-        return str(winning_card), winning_team
+        # قدرت کارت‌ها از جدول از پیش محاسبه شده (خال حکم، خال شروع) خوانده می‌شود
+        winning_index = trick_winner(
+            [played["code"] for played in self.played_cards],
+            self.trump_suit
+        )
+        winning = self.played_cards[winning_index]
+        return winning["card"], winning["team"], winning["player_id"]
     
     async def next_turn(self):
         """آماده‌سازی برای نوبت بعدی"""
@@ -289,42 +263,97 @@ class HokmGame(GameEngine):
         # ارسال اطلاعات به بازیکن فعلی
         await self.notify_player(current_player.id, {
             "type": "your_turn",
+            "game_id": self.game_id,
             "message": "It's your turn to play",
-            "your_hand": [str(card) for card in self.player_hands[current_player.id]],
+            "your_hand": hand_to_strings(self.player_hands[current_player.id]),
             "played_cards": [pc["card"] for pc in self.played_cards],
-            "trump_suit": self.trump_suit.value,
+            "trump_suit": SUITS[self.trump_suit].value,
             "leading_suit": self.played_cards[0]["card"][-1].lower() if self.played_cards else None
         })
     
     def _get_player_index(self, player_id: uuid.UUID) -> int:
         """دریافت ایندکس بازیکن در لیست بازیکنان"""
-        for i, player in enumerate(self.players):
-            if player.id == player_id:
-                return i
-        raise ValueError("Player not found")
-    
-    def _parse_card(self, card_str: str) -> Card:
-        """تبدیل رشته کارت به شی Card"""
-        rank_str = card_str[:-1]
-        suit_char = card_str[-1].lower()
-        
         try:
-            rank = Rank(rank_str)
-            suit = {
-                'h': Suit.HEARTS,
-                'd': Suit.DIAMONDS,
-                'c': Suit.CLUBS,
-                's': Suit.SPADES
-            }[suit_char]
-            return Card(suit, rank)
-        except (KeyError, ValueError):
-            raise ValueError("Invalid card format")
+            return self.player_seats[player_id]
+        except KeyError:
+            raise ValueError("Player not found")
+    
+    async def apply_event(self, code: int, timestamp: float, fields: tuple):
+        """بازسازی وضعیت از لاگ؛ حرکت‌ها از همان مسیر اعتبارسنجی بازی زنده عبور می‌کنند"""
+        if code == HOKM_DEAL:
+            self.hakem_index, deck = fields
+            self.game.status = schemas.GameStatus.ACTIVE
+            self.deck = list(deck)
+            self._deal_cards()
+        elif code == HOKM_TRUMP:
+            seat, suit = fields
+            await self.handle_trump_selection(self.players[seat].id, {"suit": SUITS[suit].value})
+        elif code == HOKM_PLAY:
+            seat, card = fields
+            await self.handle_play_card(self.players[seat].id, {"card": CARD_STR[card]})
+    
+    def snapshot(self) -> bytes:
+        """وضعیت فشرده بازی (کمتر از 150 بایت)"""
+        played = bytes(played_card["code"] for played_card in self.played_cards)
+        header = SNAPSHOT.pack(
+            self.hakem_index,
+            self.current_turn,
+            self.current_round,
+            NO_CARD if self.trump_suit is None else self.trump_suit,
+            self.scores[0],
+            self.scores[1],
+            len(self.deck),
+            *(self.player_hands.get(player.id, 0) for player in self.players),
+            played.ljust(4, bytes((NO_CARD,)))
+        )
+        tricks = b"".join(bytes(codes) + bytes((team,)) for codes, team in self.game_rounds)
+        return header + bytes(self.deck) + tricks
     
-    def _compare_ranks(self, rank1: Rank, rank2: Rank) -> int:
-        """مقایسه ارزش دو کارت"""
-        rank_order = [
-            Rank.TWO, Rank.THREE, Rank.FOUR, Rank.FIVE, Rank.SIX,
-            Rank.SEVEN, Rank.EIGHT, Rank.NINE, Rank.TEN,
-            Rank.JACK, Rank.QUEEN, Rank.KING, Rank.ACE
+    def restore(self, data: bytes):
+        """بازگردانی وضعیت از snapshot"""
+        (
+            self.hakem_index, self.current_turn, self.current_round, trump,
+            score_0, score_1, deck_size, *hands, played
+        ) = SNAPSHOT.unpack_from(data, 0)
+        self.trump_suit = None if trump == NO_CARD else trump
+        self.scores = {0: score_0, 1: score_1}
+        self.player_hands = {player.id: hand for player, hand in zip(self.players, hands)}
+        
+        offset = SNAPSHOT.size
+        self.deck = list(data[offset:offset + deck_size])
+        offset += deck_size
+        self.game_rounds = [
+            (tuple(data[index:index + 4]), data[index + 4])
+            for index in range(offset, len(data), 5)
         ]
-        return rank_order.index(rank1) - rank_order.index(rank2)
+        
+        # بازیکن هر کارت از روی نوبت فعلی و تعداد کارت‌های بازی شده مشخص می‌شود
+        codes = [code for code in played if code != NO_CARD]
+        leader = (self.current_turn - len(codes)) % 4
+        self.played_cards = []
+        for position, code in enumerate(codes):
+            player_id = self.players[(leader + position) % 4].id
+            self.played_cards.append({
+                "player_id": player_id,
+                "card": CARD_STR[code],
+                "code": code,
+                "team": 0 if player_id in self.teams[0] else 1
+            })
+    
+    async def resume(self):
+        """ادامه بازی: درخواست دوباره از بازیکنی که نوبت اوست"""
+        # بازی در بازسازی از لاگ تمام شده ولی نتیجه‌اش ثبت نشده بود
+        if self.game.status == schemas.GameStatus.COMPLETED:
+            await self.end_game()
+            return
+        
+        await self.broadcast({
+            "type": "game_resumed",
+            "game_id": self.game_id,
+            "message": "Game resumed",
+            "scores": self.scores
+        })
+        if self.trump_suit is None:
+            await self.start_round()
+        else:
+            await self.next_turn()
@@ -0,0 +1,362 @@
+# backend/game_engine/registry.py
+import asyncio
+import time
+import uuid
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from ..core import models, schemas
+from ..core.database import GameSessionLocal, Session
+from ..core.config import settings
+from ..notification.bus import bus
+from .base import GameEngine, GameFactory
+from .event_log import game_log
+from .snapshots import snapshots
+
+logger = logging.getLogger(__name__)
+
+class GameRoom:
+    """یک موتور بازی زنده که در حافظه پروسه نگهداری می‌شود"""
+
+    def __init__(self, engine: GameEngine, db: Session):
+        self.engine = engine
+        self.db = db
+        self.lock = asyncio.Lock()  # اعمال بازیکنان در هر اتاق به ترتیب اجرا می‌شوند
+        self.created_at = time.monotonic()
+        self.last_activity = self.created_at
+        self.actions = 0
+        self.task: Optional[asyncio.Task] = None  # ادامه بازی پس از resume
+
+    def touch(self):
+        """ثبت زمان آخرین فعالیت اتاق"""
+        self.last_activity = time.monotonic()
+
+    def idle_for(self, now: Optional[float] = None) -> float:
+        """مدت زمان بی‌فعالیتی اتاق بر حسب ثانیه"""
+        return (now or time.monotonic()) - self.last_activity
+
+    def is_evictable(self) -> bool:
+        """اتاق در حال پردازش یا بازی فعال (که وضعیتش فقط در حافظه است) حذف نمی‌شود"""
+        if self.lock.locked():
+            return False
+        return self.engine.game.status != schemas.GameStatus.ACTIVE
+
+    def close(self):
+        """آزادسازی منابع اتاق"""
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+        self.db.close()
+
+
+class GameRoomRegistry:
+    """رجیستری پروسه‌محلی از game_id به موتور بازی زنده
+
+    موتور هر بازی فقط یک بار از دیتابیس ساخته می‌شود و اعمال بعدی بازیکنان
+    یک جستجوی دیکشنری و تغییر وضعیت در حافظه است.
+    عمل بازیکنی که به worker دیگری وصل است از کانال مستقیم bus به worker
+    مالک lease بازی فرستاده می‌شود.
+    تمام متدها باید از داخل event loop اصلی فراخوانی شوند.
+    """
+
+    def __init__(
+        self,
+        max_rooms: int = settings.GAME_ROOM_MAX_ROOMS,
+        idle_timeout: int = settings.GAME_ROOM_IDLE_TIMEOUT,
+        sweep_interval: int = settings.GAME_ROOM_SWEEP_INTERVAL,
+        resume_interval: int = settings.GAME_RESUME_INTERVAL
+    ):
+        self.max_rooms = max_rooms
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self.resume_interval = resume_interval
+        self.rooms: "OrderedDict[uuid.UUID, GameRoom]" = OrderedDict()
+        self._create_lock = asyncio.Lock()
+        self._sweeper: Optional[asyncio.Task] = None
+        self._recoverer: Optional[asyncio.Task] = None
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "actions": 0,
+            "idle_evictions": 0,
+            "capacity_evictions": 0,
+            "rejected": 0,
+            "resumed": 0,
+            "forwarded": 0,
+            "completed": 0
+        }
+
+    async def get(
+        self,
+        game_id: uuid.UUID,
+        game_type: Optional[schemas.GameType] = None
+    ) -> GameRoom:
+        """دریافت اتاق بازی؛ در صورت نبود، موتور یک بار از دیتابیس ساخته می‌شود"""
+        game_id = uuid.UUID(str(game_id))
+        room = self.rooms.get(game_id)
+        if room is not None:
+            self.rooms.move_to_end(game_id)
+            self.stats["hits"] += 1
+            return room
+
+        async with self._create_lock:
+            # ممکن است در زمان انتظار برای قفل، اتاق ساخته شده باشد
+            room = self.rooms.get(game_id)
+            if room is not None:
+                self.stats["hits"] += 1
+                return room
+
+            self.stats["misses"] += 1
+            self._make_room_for_one()
+            # کوئری‌های همگون ساخت موتور (بازی و بازیکنان) روی thread pool اجرا می‌شوند
+            # تا event loop و دورهای بازی‌های دیگر منتظر دیتابیس نمانند
+            loop = asyncio.get_running_loop()
+            room = await loop.run_in_executor(None, self._load_room, game_id, game_type)
+            # بازی فعالی که موتورش در حافظه نیست، از snapshot ادامه داده می‌شود
+            if room.engine.game.status == schemas.GameStatus.ACTIVE:
+                try:
+                    await self._resume(room)
+                except Exception:
+                    room.close()
+                    raise
+            self.rooms[game_id] = room
+            logger.info(f"Game room {game_id} loaded ({len(self.rooms)} resident)")
+            return room
+
+    def _load_room(
+        self,
+        game_id: uuid.UUID,
+        game_type: Optional[schemas.GameType]
+    ) -> GameRoom:
+        """ساخت موتور بازی با session اختصاصی اتاق (در thread pool اجرا می‌شود)"""
+        db = GameSessionLocal()
+        try:
+            if game_type is None:
+                game_type = db.query(models.Game.game_type)\
+                    .filter(models.Game.id == game_id)\
+                    .scalar()
+                if game_type is None:
+                    raise ValueError("Game not found")
+            engine = GameFactory.create_game(game_type, db, game_id)
+        except Exception:
+            db.close()
+            raise
+        return GameRoom(engine, db)
+
+    async def _resume(self, room: GameRoom):
+        """بازسازی موتور بازی فعال از snapshot (یا لاگ محلی رویدادها) و ادامه آن"""
+        engine = room.engine
+        game_id = engine.game_id
+        if not await snapshots.acquire(game_id):
+            raise ValueError("Game is running on another worker")
+
+        data = await snapshots.load(game_id)
+        if data is not None:
+            engine.restore(data)
+            source = "snapshot"
+        else:
+            events = game_log.read(game_id)
+            if not events:
+                await snapshots.release(game_id)
+                raise ValueError("No snapshot or event log to resume game")
+            await engine.replay(events)
+            source = "event log"
+
+        room.task = asyncio.create_task(self._continue(engine))
+        self.stats["resumed"] += 1
+        logger.info(f"Game {game_id} resumed from {source}")
+
+    async def _continue(self, engine: GameEngine):
+        await engine.resume()
+        await self.finish(engine.game_id)
+
+    async def finish(self, game_id: uuid.UUID) -> bool:
+        """پایان بازی تمام شده: حذف اتاق و آزادسازی snapshot و lease آن
+
+        پس از پایان start_game یا resume و پس از هر عمل بازیکن فراخوانی
+        می‌شود؛ برای بازی‌ای که هنوز تمام نشده کاری انجام نمی‌دهد.
+        """
+        room = self.rooms.get(game_id)
+        if room is None or room.engine.game.status != schemas.GameStatus.COMPLETED:
+            return False
+        # task اجرای بازی خودش در حال پایان است و نباید لغو شود
+        if room.task is asyncio.current_task():
+            room.task = None
+        self._evict(game_id)
+        await snapshots.drop(game_id)
+        self.stats["completed"] += 1
+        logger.info(f"Game room {game_id} finished ({len(self.rooms)} resident)")
+        return True
+
+    async def recover_orphans(self) -> int:
+        """ادامه بازی‌های فعالی که lease آن‌ها منقضی شده (worker مالک از دست رفته)"""
+        db = GameSessionLocal()
+        try:
+            active = db.query(models.Game.id, models.Game.game_type)\
+                .filter(models.Game.status == schemas.GameStatus.ACTIVE)\
+                .all()
+        finally:
+            db.close()
+
+        resumed = 0
+        for game_id, game_type in active:
+            if game_id in self.rooms or game_id in snapshots.owned:
+                continue
+            if not await snapshots.acquire(game_id):
+                continue
+            try:
+                await self.get(game_id, game_type)
+                resumed += 1
+            except Exception as e:
+                logger.error(f"Failed to resume orphaned game {game_id}: {str(e)}")
+                await snapshots.release(game_id)
+        return resumed
+
+    async def _recovery_loop(self):
+        while True:
+            await asyncio.sleep(self.resume_interval)
+            try:
+                resumed = await self.recover_orphans()
+                if resumed:
+                    logger.info(f"Resumed {resumed} orphaned games")
+            except Exception as e:
+                logger.error(f"Orphaned game recovery failed: {str(e)}")
+
+    def _make_room_for_one(self):
+        """حذف قدیمی‌ترین اتاق قابل حذف در صورت پر بودن ظرفیت"""
+        if len(self.rooms) < self.max_rooms:
+            return
+
+        for game_id, room in self.rooms.items():
+            if room.is_evictable():
+                self._evict(game_id)
+                self.stats["capacity_evictions"] += 1
+                return
+
+        self.stats["rejected"] += 1
+        raise ValueError("Game room capacity reached")
+
+    async def dispatch(
+        self,
+        game_id: uuid.UUID,
+        player_id: uuid.UUID,
+        action: Dict,
+        forward: bool = True
+    ) -> Any:
+        """ارسال عمل بازیکن به موتور بازی ساکن در حافظه یا worker مالک بازی"""
+        game_id = uuid.UUID(str(game_id))
+        if forward and game_id not in snapshots.owned:
+            owner = await snapshots.owner(game_id)
+            if owner is not None and owner != snapshots.worker_id:
+                # موتور محلی (مثلاً بازی WAITING بارگذاری شده پیش از شروع) دیگر معتبر نیست
+                room = self.rooms.get(game_id)
+                if room is not None and room.is_evictable():
+                    self._evict(game_id)
+                self.stats["forwarded"] += 1
+                return await bus.request(owner, "game_action", {
+                    "game_id": str(game_id),
+                    "player_id": str(player_id),
+                    "action": action
+                })
+
+        room = await self.get(game_id)
+        async with room.lock:
+            room.touch()
+            room.actions += 1
+            self.stats["actions"] += 1
+            result = await room.engine.handle_player_action(player_id, action)
+        await self.finish(game_id)
+        return result
+
+    async def _serve_action(self, request: Dict) -> Any:
+        """اجرای عملی که worker دیگری برای بازی‌های این worker فرستاده است"""
+        return await self.dispatch(
+            uuid.UUID(request["game_id"]),
+            uuid.UUID(request["player_id"]),
+            request["action"],
+            forward=False
+        )
+
+    def evict(self, game_id: uuid.UUID) -> bool:
+        """حذف دستی اتاق (مثلاً پس از پایان بازی)"""
+        game_id = uuid.UUID(str(game_id))
+        if game_id not in self.rooms:
+            return False
+        self._evict(game_id)
+        return True
+
+    def _evict(self, game_id: uuid.UUID):
+        room = self.rooms.pop(game_id)
+        try:
+            room.close()
+        except Exception as e:
+            logger.error(f"Failed to close game room {game_id}: {str(e)}")
+
+    def sweep(self) -> int:
+        """حذف اتاق‌هایی که بیش از idle_timeout بدون فعالیت مانده‌اند"""
+        now = time.monotonic()
+        expired = [
+            game_id for game_id, room in self.rooms.items()
+            if room.idle_for(now) > self.idle_timeout and room.is_evictable()
+        ]
+        for game_id in expired:
+            self._evict(game_id)
+        self.stats["idle_evictions"] += len(expired)
+        return len(expired)
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                evicted = self.sweep()
+                if evicted:
+                    logger.info(f"Evicted {evicted} idle game rooms")
+            except Exception as e:
+                logger.error(f"Game room sweep failed: {str(e)}")
+
+    def start(self):
+        """راه‌اندازی پاکسازی دوره‌ای اتاق‌های بی‌فعالیت و بررسی بازی‌های یتیم"""
+        # inbox این worker در bus همان شناسه مالک lease است (پیش از bus.start)
+        bus.serve(snapshots.worker_id, "game_action", self._serve_action)
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+        if self._recoverer is None or self._recoverer.done():
+            self._recoverer = asyncio.create_task(self._recovery_loop())
+
+    async def stop(self):
+        """توقف پاکسازی و آزادسازی تمام اتاق‌ها"""
+        for task in (self._sweeper, self._recoverer):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._sweeper = None
+        self._recoverer = None
+
+        for game_id in list(self.rooms.keys()):
+            self._evict(game_id)
+
+    def metrics(self) -> Dict[str, Any]:
+        """آمار رجیستری برای endpoint مانیتورینگ"""
+        now = time.monotonic()
+        by_status: Dict[str, int] = {}
+        for room in self.rooms.values():
+            status = str(getattr(room.engine.game.status, "value", room.engine.game.status))
+            by_status[status] = by_status.get(status, 0) + 1
+
+        return {
+            "rooms": len(self.rooms),
+            "max_rooms": self.max_rooms,
+            "idle_timeout": self.idle_timeout,
+            "rooms_by_status": by_status,
+            "oldest_idle_seconds": max(
+                (room.idle_for(now) for room in self.rooms.values()),
+                default=0.0
+            ),
+            "snapshots": snapshots.metrics(),
+            **self.stats
+        }
+
+# نمونه پیش‌فرض برای استفاده در سراسر برنامه
+game_rooms = GameRoomRegistry()
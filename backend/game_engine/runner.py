@@ -0,0 +1,162 @@
+# backend/game_engine/runner.py
+import asyncio
+import uuid
+import logging
+from typing import Any, Dict, Optional
+from ..core.redis_client import RedisClient
+from ..core.config import settings
+from .registry import GameRoomRegistry, game_rooms
+from .snapshots import snapshots
+
+logger = logging.getLogger(__name__)
+
+def enqueue_start(game_id) -> int:
+    """ارسال فرمان شروع بازی به صف game runner (قابل استفاده در کدهای همگون مثل Celery)"""
+    client = RedisClient.get_sync_client()
+    return client.rpush(settings.GAME_RUNNER_QUEUE, str(game_id))
+
+
+class GameRunner:
+    """اجرای هم‌زمان دورهای بازی روی event loop اصلی
+
+    فرمان‌های شروع از صف Redis (یا مستقیماً با submit) دریافت می‌شوند و
+    start_game هر بازی به عنوان یک task مستقل روی همان event loop اجرا
+    می‌شود؛ انتظارهای طولانی (مثل مرحله شرط‌بندی Crash) هیچ پروسه‌ای را
+    مشغول نمی‌کنند. تأخیر event loop به صورت دوره‌ای اندازه‌گیری می‌شود.
+    """
+
+    def __init__(
+        self,
+        rooms: GameRoomRegistry = game_rooms,
+        queue: str = settings.GAME_RUNNER_QUEUE,
+        lag_interval: float = settings.GAME_RUNNER_LAG_INTERVAL,
+        lag_warning: float = settings.GAME_RUNNER_LAG_WARNING,
+        redis=None
+    ):
+        self.rooms = rooms
+        self.queue = queue
+        self.lag_interval = lag_interval
+        self.lag_warning = lag_warning
+        self._redis = redis
+        self.running: Dict[uuid.UUID, asyncio.Task] = {}
+        self._consumer: Optional[asyncio.Task] = None
+        self._monitor: Optional[asyncio.Task] = None
+        self.lag = {"last": 0.0, "avg": 0.0, "max": 0.0, "slow_ticks": 0}
+        self.stats = {"received": 0, "started": 0, "completed": 0, "failed": 0, "duplicates": 0}
+
+    async def _client(self):
+        if self._redis is None:
+            self._redis = await RedisClient.get_async_client()
+        return self._redis
+
+    async def submit(self, game_id) -> bool:
+        """شروع بازی در این پروسه؛ اگر بازی در حال اجرا باشد False"""
+        game_id = uuid.UUID(str(game_id))
+        self.stats["received"] += 1
+        if game_id in self.running:
+            self.stats["duplicates"] += 1
+            return False
+        # مالکیت از همان ابتدا گرفته می‌شود تا اعمال بازیکنان سایر workerها به این worker برسند
+        if not await snapshots.acquire(game_id):
+            self.stats["duplicates"] += 1
+            return False
+
+        try:
+            room = await self.rooms.get(game_id)
+        except Exception:
+            await snapshots.release(game_id)
+            raise
+        task = asyncio.create_task(self._run(game_id, room.engine))
+        room.task = task
+        self.running[game_id] = task
+        self.stats["started"] += 1
+        return True
+
+    async def _run(self, game_id: uuid.UUID, engine):
+        try:
+            await engine.start_game()
+            self.stats["completed"] += 1
+            # Crash تا پایان دور در start_game می‌ماند؛ Hokm با آخرین عمل بازیکن در dispatch تمام می‌شود
+            await self.rooms.finish(game_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"Game {game_id} failed to run: {str(e)}")
+        finally:
+            self.running.pop(game_id, None)
+
+    async def _consume(self):
+        """دریافت فرمان‌های شروع از صف Redis"""
+        retry_delay = 1
+        while True:
+            try:
+                client = await self._client()
+                item = await client.blpop(self.queue, timeout=1)
+                retry_delay = 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Game runner queue read failed: {str(e)}")
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 30)
+                continue
+
+            if item is None:
+                continue
+            _, game_id = item
+            try:
+                await self.submit(game_id)
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error(f"Failed to start game {game_id}: {str(e)}")
+
+    async def _monitor_lag(self):
+        """اندازه‌گیری تأخیر event loop: فاصله بیدار شدن واقعی از زمان مورد انتظار"""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            lag = max(loop.time() - expected, 0.0)
+            self.lag["last"] = lag
+            self.lag["avg"] = lag if not self.lag["avg"] else self.lag["avg"] * 0.9 + lag * 0.1
+            self.lag["max"] = max(self.lag["max"], lag)
+            if lag > self.lag_warning:
+                self.lag["slow_ticks"] += 1
+                logger.warning(f"Event loop lag {lag * 1000:.1f}ms with {len(self.running)} running games")
+
+    def start(self):
+        """راه‌اندازی مصرف‌کننده صف و پایش تأخیر event loop"""
+        if self._consumer is None or self._consumer.done():
+            self._consumer = asyncio.create_task(self._consume())
+        if self._monitor is None or self._monitor.done():
+            self._monitor = asyncio.create_task(self._monitor_lag())
+
+    async def stop(self):
+        """توقف دریافت فرمان‌ها؛ بازی‌های در حال اجرا با رجیستری متوقف و از snapshot ادامه داده می‌شوند"""
+        for task in (self._consumer, self._monitor):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._consumer = None
+        self._monitor = None
+
+    def metrics(self) -> Dict[str, Any]:
+        """آمار runner برای endpoint مانیتورینگ"""
+        return {
+            "running_games": len(self.running),
+            "loop_lag_ms": {
+                "last": self.lag["last"] * 1000,
+                "avg": self.lag["avg"] * 1000,
+                "max": self.lag["max"] * 1000
+            },
+            "slow_ticks": self.lag["slow_ticks"],
+            **self.stats
+        }
+
+
+# نمونه پیش‌فرض برای استفاده در سراسر برنامه
+game_runner = GameRunner()
@@ -0,0 +1,201 @@
+# backend/game_engine/seed_chain.py
+import argparse
+import fcntl
+import hashlib
+import mmap
+import os
+import secrets
+import struct
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# ساختار فایل: هدر ثابت و سپس N هش 32 بایتی پشت سر هم
+# h[0] بذر مخفی است و h[i] = sha256(h[i-1]). تعهد عمومی sha256(h[N-1]) است
+# و بذرها به ترتیب معکوس (h[N-1]، h[N-2]، ...) به بازی‌ها داده می‌شوند.
+MAGIC = b"SEEDCHN1"
+HEADER = struct.Struct("<8sQQ32s")  # magic, count, cursor, commitment
+CURSOR_OFFSET = 16
+HASH_SIZE = 32
+GENERATE_BATCH = 1 << 16
+
+def _sha256(data) -> bytes:
+    return hashlib.sha256(data).digest()
+
+def generate_chain(path: str, count: int, secret: Optional[bytes] = None) -> bytes:
+    """ساخت زنجیره هش معکوس با count دور و بازگرداندن تعهد عمومی
+
+    زنجیره ذاتاً ترتیبی است؛ هش‌ها در بافرهای بزرگ جمع و یک‌جا نوشته می‌شوند.
+    """
+    if count <= 0:
+        raise ValueError("Chain length must be positive")
+
+    current = secret or secrets.token_bytes(HASH_SIZE)
+    tmp_path = f"{path}.tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, count, 0, b"\0" * HASH_SIZE))
+        sha256 = hashlib.sha256
+        remaining = count
+        while remaining:
+            batch = min(remaining, GENERATE_BATCH)
+            buffer = bytearray(batch * HASH_SIZE)
+            for i in range(batch):
+                buffer[i * HASH_SIZE:(i + 1) * HASH_SIZE] = current
+                current = sha256(current).digest()
+            f.write(buffer)
+            remaining -= batch
+
+        # پس از آخرین دور، current برابر sha256(h[N-1]) یعنی همان تعهد است
+        commitment = current
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, count, 0, commitment))
+
+    os.replace(tmp_path, path)
+    logger.info(f"Generated seed chain of {count} rounds at {path}")
+    return commitment
+
+def _verify_chunk(path: str, start: int, stop: int) -> Optional[int]:
+    """بررسی h[i+1] == sha256(h[i]) برای i در [start, stop)؛ اولین اندیس نامعتبر"""
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            _, count, _, commitment = HEADER.unpack_from(mm, 0)
+            sha256 = hashlib.sha256
+            base = HEADER.size
+            for i in range(start, stop):
+                offset = base + i * HASH_SIZE
+                if i + 1 < count:
+                    expected = mm[offset + HASH_SIZE:offset + 2 * HASH_SIZE]
+                else:
+                    expected = commitment
+                if sha256(mm[offset:offset + HASH_SIZE]).digest() != expected:
+                    return i
+            return None
+        finally:
+            mm.close()
+
+def verify_revealed(seeds: Iterable[bytes], commitment: bytes) -> Optional[int]:
+    """بررسی بذرهای افشا شده به ترتیب بازی؛ اندیس اولین بذر نامعتبر یا None"""
+    expected = commitment
+    for index, seed in enumerate(seeds):
+        if _sha256(seed) != expected:
+            return index
+        expected = seed
+    return None
+
+
+class SeedChain:
+    """دسترسی O(1) به بذرهای از پیش ساخته شده از روی فایل memory-mapped"""
+
+    def __init__(self, path: str = settings.CRASH_SEED_CHAIN_PATH):
+        self.path = path
+        if not os.path.exists(path):
+            raise ValueError("Seed chain not generated")
+        self._file = open(path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        magic, self.count, _, self.commitment = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError("Invalid seed chain file")
+
+    @property
+    def cursor(self) -> int:
+        """تعداد بذرهای داده شده تا کنون"""
+        return struct.unpack_from("<Q", self._mm, CURSOR_OFFSET)[0]
+
+    @property
+    def remaining(self) -> int:
+        return self.count - self.cursor
+
+    def seed_at(self, index: int) -> bytes:
+        """بذر ذخیره شده در اندیس index از زنجیره"""
+        offset = HEADER.size + index * HASH_SIZE
+        return self._mm[offset:offset + HASH_SIZE]
+
+    def next_seed(self) -> Tuple[int, bytes]:
+        """گرفتن بذر بعدی (امن بین پروسه‌ها با قفل فایل)"""
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        try:
+            cursor = self.cursor
+            if cursor >= self.count:
+                raise ValueError("Seed chain exhausted")
+            struct.pack_into("<Q", self._mm, CURSOR_OFFSET, cursor + 1)
+            self._mm.flush(0, mmap.PAGESIZE)
+        finally:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+        index = self.count - 1 - cursor
+        return index, self.seed_at(index)
+
+    def verify(
+        self,
+        start: Optional[int] = None,
+        stop: Optional[int] = None,
+        processes: Optional[int] = None,
+        chunk_size: int = 1 << 20
+    ) -> Optional[int]:
+        """ممیزی دسته‌ای زنجیره (پیش‌فرض: تمام دورهای بازی شده) به صورت موازی
+
+        اولین اندیس نامعتبر یا None برمی‌گرداند.
+        """
+        if start is None:
+            start = self.count - self.cursor
+        if stop is None:
+            stop = self.count
+        if start >= stop:
+            return None
+
+        ranges = [
+            (chunk_start, min(chunk_start + chunk_size, stop))
+            for chunk_start in range(start, stop, chunk_size)
+        ]
+        if len(ranges) == 1 or processes == 1:
+            results = [_verify_chunk(self.path, a, b) for a, b in ranges]
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                results = list(pool.map(
+                    _verify_chunk,
+                    [self.path] * len(ranges),
+                    [a for a, _ in ranges],
+                    [b for _, b in ranges]
+                ))
+
+        failures = [index for index in results if index is not None]
+        return min(failures) if failures else None
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+
+_seed_chain: Optional[SeedChain] = None
+
+def get_seed_chain() -> SeedChain:
+    """نمونه مشترک زنجیره بذر در این پروسه"""
+    global _seed_chain
+    if _seed_chain is None:
+        _seed_chain = SeedChain()
+    return _seed_chain
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Crash seed chain tools")
+    parser.add_argument("command", choices=["generate", "verify"])
+    parser.add_argument("--path", default=settings.CRASH_SEED_CHAIN_PATH)
+    parser.add_argument("--rounds", type=int, default=10_000_000)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        commitment = generate_chain(args.path, args.rounds)
+        print(f"commitment: {commitment.hex()}")
+    else:
+        chain = SeedChain(args.path)
+        bad = chain.verify(start=0, processes=args.processes)
+        print("ok" if bad is None else f"invalid at index {bad}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# backend/game_engine/settlement.py
+import uuid
+import logging
+from datetime import datetime
+from typing import Sequence, Tuple
+from sqlalchemy import insert, text
+from ..core import models
+from ..core.ledger import balance_cache
+from ..core.database import Session
+
+logger = logging.getLogger(__name__)
+
+# تمام ردیف‌ها با یک دستور و سه پارامتر آرایه‌ای به‌روز می‌شوند (تعداد پارامترها به تعداد بازیکنان وابسته نیست)
+UPDATE_WALLETS = text("""
+    UPDATE wallets AS w
+    SET credit = w.credit + v.prize,
+        locked_credit = w.locked_credit - v.stake,
+        last_transaction = :now
+    FROM unnest(
+        CAST(:user_ids AS uuid[]),
+        CAST(:prizes AS bigint[]),
+        CAST(:stakes AS bigint[])
+    ) AS v(user_id, prize, stake)
+    WHERE w.user_id = v.user_id AND w.locked_credit >= v.stake
+""")
+
+UPDATE_GAME_PLAYERS = text("""
+    UPDATE game_players AS gp
+    SET credit_change = v.prize - v.stake
+    FROM unnest(
+        CAST(:user_ids AS uuid[]),
+        CAST(:prizes AS bigint[]),
+        CAST(:stakes AS bigint[])
+    ) AS v(user_id, prize, stake)
+    WHERE gp.game_id = :game_id AND gp.user_id = v.user_id
+""")
+
+# شرط هنگام پیوستن با GAME_STAKE قفل شده است؛ تسویه برای هر بازیکن فقط یک ردیف با
+# نتیجه خالص او ثبت می‌کند (بازیکنی که نه برده و نه باخته فقط شرطش آزاد می‌شود)
+SETTLEMENT_TYPES = (
+    models.TransactionType.GAME_WIN,
+    models.TransactionType.GAME_LOSS,
+    models.TransactionType.REFUND
+)
+
+def settlement_row(stake: int, payout: int) -> Tuple[models.TransactionType, int, str]:
+    """نوع، مبلغ و برچسب تراکنش تسویه یک بازیکن از روی شرط قفل شده و مبلغ بازگشتی"""
+    net = payout - stake
+    if net > 0:
+        return models.TransactionType.GAME_WIN, net, "win"
+    if net < 0:
+        return models.TransactionType.GAME_LOSS, -net, "loss"
+    return models.TransactionType.REFUND, stake, "stake released"
+
+def is_settled(db: Session, game_id: uuid.UUID) -> bool:
+    """آیا تراکنش‌های پایان این بازی قبلاً ثبت شده‌اند"""
+    return db.query(models.Transaction.id).filter(
+        models.Transaction.reference_id == game_id,
+        models.Transaction.type.in_(SETTLEMENT_TYPES)
+    ).first() is not None
+
+def settle_game(
+    db: Session,
+    game: models.Game,
+    user_ids: Sequence[uuid.UUID],
+    stakes: Sequence[int],
+    prizes: Sequence[int]
+) -> bool:
+    """تسویه جوایز یک بازی در یک تراکنش دیتابیس
+
+    prizes مبلغی است که از شرط قفل شده هر بازیکن به credit او برمی‌گردد؛
+    تراکنش ثبت شده نتیجه خالص آن نسبت به stake است (settlement_row).
+    تغییرات کیف پول‌ها، credit_change بازیکنان، تراکنش‌ها و خود ردیف بازی
+    با چند دستور دسته‌ای و یک commit ثبت می‌شوند. ردیف بازی قفل می‌شود و
+    تسویه تکراری یک بازی (مثلاً پس از resume) نادیده گرفته می‌شود.
+    اگر بازی قبلاً تسویه شده باشد False برمی‌گرداند.
+    """
+    now = datetime.utcnow()
+    try:
+        # قفل ردیف بازی تا دو تسویه هم‌زمان یک بازی پشت سر هم اجرا شوند
+        db.execute(
+            text("SELECT id FROM games WHERE id = :game_id FOR UPDATE"),
+            {"game_id": game.id}
+        )
+        if is_settled(db, game.id):
+            db.rollback()
+            logger.info(f"Game {game.id} already settled")
+            return False
+
+        params = {
+            "user_ids": [str(user_id) for user_id in user_ids],
+            "prizes": [int(prize) for prize in prizes],
+            "stakes": [int(stake) for stake in stakes],
+            "game_id": game.id,
+            "now": now
+        }
+        # شرطی که قبلاً قفل نشده باشد نباید آزاد شود؛ عدم تطابق کل تسویه را برمی‌گرداند
+        updated = db.execute(UPDATE_WALLETS, params).rowcount
+        if updated != len(params["user_ids"]):
+            raise ValueError(
+                f"Locked credit does not cover stakes for {len(params['user_ids']) - updated} players"
+            )
+        db.execute(UPDATE_GAME_PLAYERS, params)
+
+        rows = []
+        for user_id, stake, prize in zip(user_ids, params["stakes"], params["prizes"]):
+            transaction_type, amount, label = settlement_row(stake, prize)
+            rows.append({
+                "id": uuid.uuid4(),
+                "user_id": user_id,
+                "amount": amount,
+                "type": transaction_type,
+                "description": f"Game {game.id} {label}",
+                "created_at": now,
+                "reference_id": game.id
+            })
+        if rows:
+            db.execute(insert(models.Transaction), rows)
+
+        # تغییرات ردیف بازی (وضعیت، برنده و مجموع جوایز) در همین commit ذخیره می‌شوند
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    # موجودی‌های کش شده این بازیکنان دیگر معتبر نیستند
+    balance_cache.invalidate(user_ids)
+    return True
@@ -0,0 +1,227 @@
+# backend/game_engine/simulator.py
+import argparse
+import asyncio
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+from ..core import models, schemas
+from .cards import (
+    SUITS, CARD_STR, CARD_SUIT, CARD_RANK, SUIT_MASKS, TRICK_STRENGTH,
+    hand_cards, legal_moves, trick_winner
+)
+from .hokm import HokmGame
+
+class NullSession:
+    """جایگزین Session برای اجرای موتور بدون دیتابیس"""
+
+    def commit(self):
+        pass
+
+    def refresh(self, instance):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SimulatedHokmGame(HokmGame):
+    """موتور حکم جدا از دیتابیس و WebSocket برای شبیه‌سازی
+
+    پیام‌های شخصی ارسال نمی‌شوند و فقط آخرین درخواست (بازیکن، نوع پیام)
+    نگهداری می‌شود تا حلقه شبیه‌ساز بداند نوبت کیست.
+    """
+
+    def __init__(self, game: models.Game, players: List[models.User]):
+        super().__init__(NullSession(), game.id, game=game, players=players)
+        self.prompt: Optional[Tuple[uuid.UUID, str]] = None
+
+    async def broadcast(self, message: Dict):
+        pass
+
+    async def notify_player(self, player_id: uuid.UUID, message: Dict):
+        self.prompt = (player_id, message["type"])
+
+    def _distribute_prizes(self, user_ids: Sequence[uuid.UUID], payouts: Sequence[int], stakes=None):
+        return None
+
+    def record_event(self, code: int, *fields):
+        pass
+
+
+class RandomPolicy:
+    """ربات تصادفی: یک کارت مجاز تصادفی بازی می‌کند"""
+    name = "random"
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng or random.Random()
+
+    def choose_trump(self, hand: int) -> int:
+        return self.rng.randrange(len(SUITS))
+
+    def play_card(self, legal: int, played: Sequence[int], trump: int) -> int:
+        return self.rng.choice(hand_cards(legal))
+
+
+class GreedyPolicy:
+    """ربات ابتکاری ساده
+
+    - حکم: خالی که بیشترین کارت (و در تساوی، قوی‌ترین کارت‌ها) را دارد
+    - شروع دست: قوی‌ترین کارت غیرحکم
+    - اگر هم‌تیمی برنده دست است یا بردن ممکن نیست: ضعیف‌ترین کارت (ترجیحاً غیرحکم)
+    - در غیر این صورت: ضعیف‌ترین کارتی که دست را می‌برد
+    """
+    name = "greedy"
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng or random.Random()
+
+    def choose_trump(self, hand: int) -> int:
+        def suit_value(suit: int) -> Tuple[int, int]:
+            cards = hand_cards(hand & SUIT_MASKS[suit])
+            return len(cards), sum(CARD_RANK[card] for card in cards)
+        return max(range(len(SUITS)), key=suit_value)
+
+    def play_card(self, legal: int, played: Sequence[int], trump: int) -> int:
+        cards = hand_cards(legal)
+
+        def discard_order(card: int) -> Tuple[bool, int]:
+            return CARD_SUIT[card] == trump, CARD_RANK[card]
+
+        if not played:
+            return max(cards, key=lambda card: (CARD_SUIT[card] != trump, CARD_RANK[card]))
+
+        winner = trick_winner(played, trump)
+        # هم‌تیمی دو صندلی قبل از ما بازی کرده است
+        if winner == len(played) - 2:
+            return min(cards, key=discard_order)
+
+        strength = TRICK_STRENGTH[trump][CARD_SUIT[played[0]]]
+        best = strength[played[winner]]
+        winning = [card for card in cards if strength[card] > best]
+        if winning:
+            return min(winning, key=lambda card: strength[card])
+        return min(cards, key=discard_order)
+
+
+POLICIES = {
+    RandomPolicy.name: RandomPolicy,
+    GreedyPolicy.name: GreedyPolicy,
+}
+
+def make_policies(policy_names: Sequence[str], rng: random.Random) -> List:
+    """ساخت ربات‌های چهار صندلی از روی نام سیاست‌ها"""
+    if len(policy_names) != 4:
+        raise ValueError("Hokm requires exactly 4 players")
+    try:
+        return [POLICIES[name](rng) for name in policy_names]
+    except KeyError as e:
+        raise ValueError(f"Unknown bot policy: {e.args[0]}")
+
+def bot_action(policy, engine: HokmGame, player_id: uuid.UUID, prompt_type: str) -> Dict:
+    """تبدیل تصمیم ربات به همان action ای که از WebSocket دریافت می‌شود"""
+    hand = engine.player_hands[player_id]
+    if prompt_type == "choose_trump":
+        return {"type": "choose_trump", "suit": SUITS[policy.choose_trump(hand)].value}
+
+    played = [played_card["code"] for played_card in engine.played_cards]
+    lead_suit = CARD_SUIT[played[0]] if played else None
+    card = policy.play_card(legal_moves(hand, lead_suit), played, engine.trump_suit)
+    return {"type": "play_card", "card": CARD_STR[card]}
+
+async def play_game(policies: Sequence) -> Dict:
+    """اجرای کامل یک بازی حکم بین چهار ربات"""
+    players = [models.User(id=uuid.uuid4(), username=f"bot{seat}") for seat in range(4)]
+    game = models.Game(
+        id=uuid.uuid4(),
+        game_type=schemas.GameType.HOKM,
+        status=schemas.GameStatus.WAITING,
+        stake=0
+    )
+    engine = SimulatedHokmGame(game, players)
+    seats = {player.id: seat for seat, player in enumerate(players)}
+
+    await engine.start_game()
+    while engine.game.status != schemas.GameStatus.COMPLETED:
+        player_id, prompt_type = engine.prompt
+        engine.prompt = None
+        action = bot_action(policies[seats[player_id]], engine, player_id, prompt_type)
+        await engine.handle_player_action(player_id, action)
+
+    return {
+        "winning_team": 0 if engine.scores[0] > engine.scores[1] else 1,
+        "tricks": len(engine.game_rounds)
+    }
+
+def run_games(count: int, seed: Optional[int], policy_names: Sequence[str]) -> Dict:
+    """اجرای count بازی پشت سر هم در این پروسه"""
+    # موتور حکم از ماژول random برای بُر زدن استفاده می‌کند
+    random.seed(seed)
+    policies = make_policies(policy_names, random.Random(seed))
+
+    async def run():
+        wins = [0, 0]
+        tricks = 0
+        for _ in range(count):
+            result = await play_game(policies)
+            wins[result["winning_team"]] += 1
+            tricks += result["tricks"]
+        return {"games": count, "wins": wins, "tricks": tricks}
+
+    return asyncio.run(run())
+
+def run_parallel(
+    count: int,
+    policy_names: Sequence[str],
+    processes: Optional[int] = None,
+    seed: Optional[int] = None
+) -> Dict:
+    """پخش شبیه‌سازی‌ها بین هسته‌ها؛ هر پروسه بذر مستقل خودش را دارد
+
+    بدون processes به تعداد هسته‌های ماشین پروسه ساخته می‌شود.
+    """
+    workers = max(1, min(processes or os.cpu_count() or 1, count))
+    chunks = [count // workers + (1 if i < count % workers else 0) for i in range(workers)]
+    seeds = [None if seed is None else seed + i for i in range(workers)]
+
+    if workers == 1:
+        results = [run_games(chunks[0], seeds[0], policy_names)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_games, chunks, seeds, [policy_names] * workers))
+
+    return {
+        "games": sum(result["games"] for result in results),
+        "wins": [sum(result["wins"][team] for result in results) for team in (0, 1)],
+        "tricks": sum(result["tricks"] for result in results)
+    }
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Hokm self-play simulator")
+    parser.add_argument("--games", type=int, default=10_000)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--policies",
+        default="greedy,random,greedy,random",
+        help=f"four comma-separated policies by seat ({', '.join(POLICIES)})"
+    )
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    result = run_parallel(args.games, args.policies.split(","), args.processes, args.seed)
+    elapsed = time.perf_counter() - started
+
+    games = result["games"]
+    print(f"games: {games} in {elapsed:.2f}s ({games / elapsed:.0f} games/sec)")
+    print(f"tricks/game: {result['tricks'] / games:.2f}")
+    for team, wins in enumerate(result["wins"]):
+        print(f"team {team + 1} win rate: {wins / games:.1%}")
+
+if __name__ == "__main__":
+    main()
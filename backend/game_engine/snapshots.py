@@ -0,0 +1,237 @@
+# backend/game_engine/snapshots.py
+import asyncio
+import struct
+import time
+import uuid
+import logging
+from typing import TYPE_CHECKING, Dict, Optional, Set
+from ..core import schemas
+from ..core.redis_client import RedisClient
+from ..core.config import settings
+
+if TYPE_CHECKING:
+    from .base import GameEngine
+
+logger = logging.getLogger(__name__)
+
+# نسخه قالب snapshot؛ snapshot با نسخه متفاوت نادیده گرفته و بازی از لاگ بازسازی می‌شود
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<B")
+
+# تمدید مالکیت فقط اگر هنوز متعلق به همین worker باشد
+RENEW_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# نوشتن snapshot و تمدید lease فقط اگر lease آزاد یا متعلق به همین worker باشد
+SAVE_SNAPSHOT_SCRIPT = """
+local owner = redis.call('get', KEYS[1])
+if owner and owner ~= ARGV[1] then
+    return 0
+end
+redis.call('set', KEYS[1], ARGV[1], 'EX', ARGV[3])
+redis.call('set', KEYS[2], ARGV[2], 'EX', ARGV[4])
+return 1
+"""
+
+# حذف snapshot و lease بازی تمام شده با همان شرط مالکیت
+DROP_SNAPSHOT_SCRIPT = """
+local owner = redis.call('get', KEYS[1])
+if owner and owner ~= ARGV[1] then
+    return 0
+end
+redis.call('del', KEYS[1], KEYS[2])
+return 1
+"""
+
+def snapshot_key(game_id: uuid.UUID) -> str:
+    return f"game:snapshot:{game_id}"
+
+def lease_key(game_id: uuid.UUID) -> str:
+    return f"game:lease:{game_id}"
+
+
+class SnapshotStore:
+    """ذخیره snapshot فشرده موتورهای زنده و مالکیت (lease) بازی‌ها در Redis
+
+    موتورها پس از هر تغییر وضعیت علامت‌گذاری می‌شوند و تمام snapshotهای
+    یک دور event loop در یک pipeline واحد نوشته می‌شوند. worker مالک هر
+    بازی lease آن را دوره‌ای تمدید می‌کند؛ lease منقضی شده یعنی بازی یتیم
+    است و worker دیگری می‌تواند آن را ادامه دهد.
+    """
+
+    def __init__(
+        self,
+        redis=None,
+        ttl: int = settings.GAME_SNAPSHOT_TTL,
+        lease_ttl: int = settings.GAME_LEASE_TTL
+    ):
+        self.worker_id = uuid.uuid4().hex
+        self.ttl = ttl
+        self.lease_ttl = lease_ttl
+        self._redis = redis
+        self._dirty: Dict[uuid.UUID, "GameEngine"] = {}
+        self._flush_scheduled = False
+        self._renewer: Optional[asyncio.Task] = None
+        self.owned: Set[uuid.UUID] = set()
+        self.stats = {"snapshots": 0, "batches": 0, "encode_seconds": 0.0, "errors": 0}
+
+    async def _client(self):
+        if self._redis is None:
+            self._redis = await RedisClient.get_async_binary_client()
+        return self._redis
+
+    def mark(self, engine: "GameEngine"):
+        """علامت‌گذاری موتور برای ذخیره snapshot در انتهای دور جاری event loop"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._dirty[engine.game_id] = engine
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_soon(self._schedule_flush)
+
+    def _schedule_flush(self):
+        asyncio.create_task(self._flush())
+
+    async def _flush(self):
+        batch, self._dirty = self._dirty, {}
+        self._flush_scheduled = False
+        if not batch:
+            return
+
+        try:
+            client = await self._client()
+            pipe = client.pipeline(transaction=False)
+            started = time.perf_counter()
+            active = []
+            for game_id, engine in batch.items():
+                keys = (lease_key(game_id), snapshot_key(game_id))
+                if engine.game.status != schemas.GameStatus.ACTIVE:
+                    # بازی تمام شده دیگر نیازی به ادامه ندارد
+                    pipe.eval(DROP_SNAPSHOT_SCRIPT, 2, *keys, self.worker_id)
+                    self.owned.discard(game_id)
+                    continue
+                data = SNAPSHOT_HEADER.pack(SNAPSHOT_VERSION) + engine.snapshot()
+                pipe.eval(SAVE_SNAPSHOT_SCRIPT, 2, *keys, self.worker_id, data, self.lease_ttl, self.ttl)
+                active.append(game_id)
+            self.stats["encode_seconds"] += time.perf_counter() - started
+            saved = dict(zip(batch, await pipe.execute()))
+            self.stats["batches"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Game snapshot flush failed: {str(e)}")
+            return
+
+        for game_id in active:
+            if saved[game_id]:
+                self.owned.add(game_id)
+                self.stats["snapshots"] += 1
+            else:
+                # worker دیگری بازی را ادامه داده است؛ snapshot او بازنویسی نمی‌شود
+                logger.warning(f"Lost lease of game {game_id}")
+                self.owned.discard(game_id)
+
+    async def load(self, game_id: uuid.UUID) -> Optional[bytes]:
+        """آخرین snapshot بازی (بدون هدر نسخه) یا None"""
+        client = await self._client()
+        data = await client.get(snapshot_key(game_id))
+        if not data:
+            return None
+        (version,) = SNAPSHOT_HEADER.unpack_from(data, 0)
+        if version != SNAPSHOT_VERSION:
+            logger.warning(f"Ignoring snapshot v{version} of game {game_id}")
+            return None
+        return data[SNAPSHOT_HEADER.size:]
+
+    async def owner(self, game_id: uuid.UUID) -> Optional[str]:
+        """شناسه worker مالک فعلی بازی (یا None اگر lease وجود ندارد)"""
+        client = await self._client()
+        owner = await client.get(lease_key(game_id))
+        return owner.decode() if owner is not None else None
+
+    async def acquire(self, game_id: uuid.UUID) -> bool:
+        """گرفتن مالکیت بازی؛ اگر lease متعلق به worker دیگری باشد False"""
+        client = await self._client()
+        key = lease_key(game_id)
+        if await client.set(key, self.worker_id, nx=True, ex=self.lease_ttl):
+            self.owned.add(game_id)
+            return True
+        owner = await client.get(key)
+        if owner is not None and owner.decode() == self.worker_id:
+            self.owned.add(game_id)
+            return True
+        return False
+
+    async def release(self, game_id: uuid.UUID):
+        """رها کردن مالکیت بازی (مثلاً هنگام خاموشی worker)"""
+        self.owned.discard(game_id)
+        try:
+            client = await self._client()
+            await client.eval(RENEW_LEASE_SCRIPT, 1, lease_key(game_id), self.worker_id, 1)
+        except Exception as e:
+            logger.error(f"Failed to release game lease {game_id}: {str(e)}")
+
+    async def drop(self, game_id: uuid.UUID):
+        """حذف snapshot و lease بازی تمام شده (فقط اگر lease متعلق به همین worker باشد)"""
+        self.owned.discard(game_id)
+        self._dirty.pop(game_id, None)
+        try:
+            client = await self._client()
+            await client.eval(DROP_SNAPSHOT_SCRIPT, 2, lease_key(game_id), snapshot_key(game_id), self.worker_id)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Failed to drop snapshot of game {game_id}: {str(e)}")
+
+    async def _renew_loop(self):
+        while True:
+            await asyncio.sleep(self.lease_ttl / 3)
+            if not self.owned:
+                continue
+            try:
+                client = await self._client()
+                pipe = client.pipeline(transaction=False)
+                owned = list(self.owned)
+                for game_id in owned:
+                    pipe.eval(RENEW_LEASE_SCRIPT, 1, lease_key(game_id), self.worker_id, self.lease_ttl)
+                for game_id, renewed in zip(owned, await pipe.execute()):
+                    if not renewed:
+                        logger.warning(f"Lost lease of game {game_id}")
+                        self.owned.discard(game_id)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Game lease renewal failed: {str(e)}")
+
+    def start(self):
+        """راه‌اندازی تمدید دوره‌ای leaseها"""
+        if self._renewer is None or self._renewer.done():
+            self._renewer = asyncio.create_task(self._renew_loop())
+
+    async def stop(self):
+        """نوشتن snapshotهای باقی‌مانده و رها کردن leaseها تا worker دیگری بازی‌ها را ادامه دهد"""
+        if self._renewer is not None:
+            self._renewer.cancel()
+            try:
+                await self._renewer
+            except asyncio.CancelledError:
+                pass
+            self._renewer = None
+        await self._flush()
+        for game_id in list(self.owned):
+            await self.release(game_id)
+
+    def metrics(self) -> Dict:
+        snapshots = self.stats["snapshots"]
+        return {
+            "owned_games": len(self.owned),
+            "avg_encode_us": self.stats["encode_seconds"] / snapshots * 1e6 if snapshots else 0.0,
+            **self.stats
+        }
+
+
+# نمونه پیش‌فرض برای استفاده در سراسر برنامه
+snapshots = SnapshotStore()
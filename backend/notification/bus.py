@@ -0,0 +1,221 @@
+# backend/notification/bus.py
+import asyncio
+import json
+import uuid
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from ..core.redis_client import RedisClient
+from ..core.config import settings
+from .codec import EncodedMessage
+from .websocket import ConnectionManager, manager, TARGET_USER, TARGET_GROUP, TARGET_ALL
+
+logger = logging.getLogger(__name__)
+
+class RedisMessageBus:
+    """انتقال پیام‌های WebSocket بین workerها از طریق Redis pub/sub
+
+    هر worker یک بار در کانال مشترک subscribe می‌کند. پیام‌ها ابتدا به
+    اتصالات محلی تحویل داده می‌شوند و سپس تمام پیام‌های یک دور event loop
+    در قالب یک PUBLISH واحد برای سایر workerها ارسال می‌شوند.
+
+    علاوه بر کانال مشترک، هر worker با inbox ثبت شده (شناسه مالک lease
+    بازی‌ها) در کانال مستقیم خودش هم subscribe می‌کند؛ درخواست‌های
+    request/response (مثل عمل بازیکنی که به worker دیگری وصل است) از این
+    کانال به handler ثبت شده برای نوع درخواست می‌رسند.
+    """
+
+    def __init__(
+        self,
+        manager: ConnectionManager,
+        channel: str = settings.WS_BUS_CHANNEL,
+        redis=None,
+        request_timeout: float = settings.WS_BUS_REQUEST_TIMEOUT
+    ):
+        self.manager = manager
+        self.channel = channel
+        self.worker_id = uuid.uuid4().hex
+        self.request_timeout = request_timeout
+        self._redis = redis
+        self._pending: List[list] = []
+        self._flush_scheduled = False
+        self._listener: Optional[asyncio.Task] = None
+        self.inbox: Optional[str] = None
+        self.handlers: Dict[str, Callable[[Dict], Awaitable[Any]]] = {}
+        self._replies: Dict[str, asyncio.Future] = {}
+        self.stats = {"published": 0, "batches": 0, "received": 0, "requests": 0, "served": 0, "errors": 0}
+
+    async def _client(self):
+        if self._redis is None:
+            self._redis = await RedisClient.get_async_client()
+        return self._redis
+
+    def publish(self, target_type: str, target: Optional[str], text: str):
+        """قرار دادن پیام در batch جاری برای ارسال به سایر workerها"""
+        self._pending.append([target_type, target, text])
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._schedule_flush)
+
+    def _schedule_flush(self):
+        asyncio.create_task(self._flush())
+
+    async def _flush(self):
+        batch, self._pending = self._pending, []
+        self._flush_scheduled = False
+        if not batch:
+            return
+
+        payload = json.dumps({"w": self.worker_id, "m": batch}, separators=(",", ":"))
+        try:
+            client = await self._client()
+            await client.publish(self.channel, payload)
+            self.stats["published"] += len(batch)
+            self.stats["batches"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"WebSocket bus publish failed: {str(e)}")
+
+    def dispatch(self, payload: str):
+        """تحویل یک batch دریافتی به اتصالات محلی"""
+        data = json.loads(payload)
+        if data["w"] == self.worker_id:
+            return  # پیام‌های خود این worker قبلاً به صورت محلی تحویل شده‌اند
+
+        for target_type, target, text in data["m"]:
+            self.stats["received"] += 1
+            payload = EncodedMessage(json_text=text)
+            if target_type == TARGET_USER:
+                self.manager.deliver_to_user(uuid.UUID(target), payload)
+            elif target_type == TARGET_GROUP:
+                self.manager.deliver_to_group(target, payload)
+            elif target_type == TARGET_ALL:
+                self.manager.deliver_to_all(payload)
+
+    def direct_channel(self, inbox: str) -> str:
+        return f"{self.channel}:{inbox}"
+
+    def serve(self, inbox: str, kind: str, handler: Callable[[Dict], Awaitable[Any]]):
+        """ثبت handler درخواست‌های مستقیم از نوع kind (پیش از start)"""
+        self.inbox = inbox
+        self.handlers[kind] = handler
+
+    async def request(self, inbox: str, kind: str, data: Dict) -> Any:
+        """ارسال درخواست به worker صاحب inbox و انتظار برای پاسخ آن
+
+        خطای handler در worker مقصد (و نبود یا پاسخ ندادن آن) به صورت
+        ValueError همین‌جا دوباره ایجاد می‌شود.
+        """
+        if self._listener is None or self.inbox is None:
+            raise ValueError("Cross-worker requests are not available")
+
+        request_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self._replies[request_id] = future
+        payload = json.dumps(
+            {"t": "req", "id": request_id, "r": self.inbox, "k": kind, "d": data},
+            separators=(",", ":")
+        )
+        try:
+            client = await self._client()
+            self.stats["requests"] += 1
+            if not await client.publish(self.direct_channel(inbox), payload):
+                raise ValueError("Target worker is not listening")
+            return await asyncio.wait_for(future, self.request_timeout)
+        except asyncio.TimeoutError:
+            raise ValueError("Target worker did not respond")
+        finally:
+            self._replies.pop(request_id, None)
+
+    def handle_direct(self, payload: str):
+        """پردازش یک درخواست یا پاسخ دریافتی در کانال مستقیم این worker"""
+        data = json.loads(payload)
+        if data["t"] == "req":
+            asyncio.create_task(self._serve(data))
+            return
+        future = self._replies.get(data["id"])
+        if future is None or future.done():
+            return  # پاسخ دیرهنگام پس از timeout
+        if data["ok"]:
+            future.set_result(data.get("v"))
+        else:
+            future.set_exception(ValueError(data["e"]))
+
+    async def _serve(self, request: Dict):
+        reply = {"t": "rep", "id": request["id"], "ok": True}
+        try:
+            handler = self.handlers.get(request["k"])
+            if handler is None:
+                raise ValueError(f"Unknown request type {request['k']}")
+            reply["v"] = await handler(request["d"])
+            self.stats["served"] += 1
+        except (ValueError, KeyError) as e:
+            reply.update(ok=False, e=str(e))
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"WebSocket bus request {request['k']} failed: {str(e)}")
+            reply.update(ok=False, e="Request failed")
+
+        try:
+            client = await self._client()
+            await client.publish(self.direct_channel(request["r"]), json.dumps(reply, separators=(",", ":"), default=str))
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"WebSocket bus reply failed: {str(e)}")
+
+    async def _listen(self):
+        backoff = 1
+        while True:
+            pubsub = None
+            try:
+                client = await self._client()
+                pubsub = client.pubsub()
+                channels = [self.channel]
+                if self.inbox is not None:
+                    channels.append(self.direct_channel(self.inbox))
+                await pubsub.subscribe(*channels)
+                logger.info(f"WebSocket bus subscribed to {', '.join(channels)}")
+                backoff = 1
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    try:
+                        if message["channel"] == self.channel:
+                            self.dispatch(message["data"])
+                        else:
+                            self.handle_direct(message["data"])
+                    except Exception as e:
+                        self.stats["errors"] += 1
+                        logger.error(f"Invalid WebSocket bus message: {str(e)}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"WebSocket bus connection lost: {str(e)}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.close()
+                    except Exception:
+                        pass
+
+    def start(self):
+        """اتصال bus به ConnectionManager و شروع دریافت پیام‌ها"""
+        self.manager.bus = self
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        """توقف دریافت پیام‌ها و ارسال batch باقی‌مانده"""
+        self.manager.bus = None
+        await self._flush()
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+# نمونه پیش‌فرض برای استفاده در سراسر برنامه
+bus = RedisMessageBus(manager)
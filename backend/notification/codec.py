@@ -0,0 +1,150 @@
+# backend/notification/codec.py
+import json
+import struct
+from typing import Callable, Dict, List, Optional, Union
+
+# فرمت‌های قابل مذاکره برای هر اتصال WebSocket
+ENCODING_JSON = "json"
+ENCODING_COMPACT = "compact"
+
+# کد عملیات فریم‌های باینری
+OP_FLIGHT_STARTED = 1
+OP_CRASHED = 2
+
+# شروع پرواز: کد عملیات، زمان شروع (epoch ثانیه) و نرخ رشد منحنی (17 بایت)
+FLIGHT_STARTED_FRAME = struct.Struct("<Bdd")
+# Crash: کد عملیات و نقطه Crash × 100 (5 بایت)
+CRASHED_FRAME = struct.Struct("<BI")
+
+Frame = Union[str, bytes]
+
+def encode_json(message: dict) -> str:
+    """سریالایز JSON فشرده پیام"""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False, default=str)
+
+def encode_flight_started_frame(message: dict) -> bytes:
+    """فریم باینری پیام flight_started؛ کلاینت ضریب را خودش از منحنی رسم می‌کند"""
+    return FLIGHT_STARTED_FRAME.pack(OP_FLIGHT_STARTED, message["started_at"], message["growth_rate"])
+
+def encode_crashed_frame(message: dict) -> bytes:
+    """فریم باینری پیام crashed"""
+    return CRASHED_FRAME.pack(OP_CRASHED, int(round(message["crash_point"] * 100)))
+
+def decode_frame(frame: bytes) -> dict:
+    """بازگردانی فریم باینری به پیام (برای تست و ابزارها)"""
+    if frame[0] == OP_FLIGHT_STARTED:
+        _, started_at, growth_rate = FLIGHT_STARTED_FRAME.unpack(frame)
+        return {"type": "flight_started", "started_at": started_at, "growth_rate": growth_rate}
+    if frame[0] == OP_CRASHED:
+        _, crash_point = CRASHED_FRAME.unpack(frame)
+        return {"type": "crashed", "crash_point": crash_point / 100}
+    raise ValueError(f"Unknown frame opcode {frame[0]}")
+
+# پیام‌هایی که در حالت compact به صورت فریم باینری ارسال می‌شوند
+BINARY_FRAMES: Dict[str, Callable[[dict], bytes]] = {
+    "flight_started": encode_flight_started_frame,
+    "crashed": encode_crashed_frame
+}
+
+
+# پیام‌هایی که مبنای تغییرات دست بازی را پاک می‌کنند (دست بعدی کامل ارسال می‌شود)
+HAND_RESETS = frozenset(("game_started", "game_resumed", "game_result"))
+
+def game_key(message: dict) -> Optional[str]:
+    """کلید بازی پیام؛ پیام‌هایی که از Redis می‌رسند game_id را به صورت رشته دارند"""
+    game_id = message.get("game_id")
+    return str(game_id) if game_id is not None else None
+
+
+class EncodedMessage:
+    """پیامی که هر فرمت آن فقط یک بار برای تمام گیرندگان ساخته می‌شود"""
+
+    __slots__ = ("_message", "_json", "_frames")
+
+    def __init__(self, message: Optional[dict] = None, json_text: Optional[str] = None):
+        self._message = message
+        self._json = json_text
+        self._frames: Dict[str, bytes] = {}
+
+    @property
+    def message(self) -> dict:
+        if self._message is None:
+            self._message = json.loads(self._json)
+        return self._message
+
+    @property
+    def json(self) -> str:
+        if self._json is None:
+            self._json = encode_json(self._message)
+        return self._json
+
+    def frame(self, key: str, builder: Callable[[dict], bytes]) -> bytes:
+        """فریم باینری کش شده برای این پیام"""
+        frame = self._frames.get(key)
+        if frame is None:
+            frame = self._frames[key] = builder(self.message)
+        return frame
+
+
+class JSONCodec:
+    """فرمت پیش‌فرض: متن JSON یکسان برای همه"""
+
+    name = ENCODING_JSON
+
+    def encode(self, payload: EncodedMessage) -> Frame:
+        return payload.json
+
+
+class CompactCodec:
+    """فرمت فشرده: فریم باینری برای پیام‌های پرواز Crash و ارسال تغییرات دست به جای کل دست
+
+    آخرین دست ارسال شده برای هر بازی (game_id پیام) جدا نگهداری می‌شود، پس
+    اولین دست هر بازی کامل ارسال می‌شود و پیام‌های دو بازی هم‌زمان روی یک
+    اتصال با هم مخلوط نمی‌شوند. وضعیت هر اتصال جداست، بنابراین برای هر
+    اتصال یک نمونه جدا ساخته می‌شود.
+    """
+
+    name = ENCODING_COMPACT
+
+    def __init__(self):
+        self.hands: Dict[Optional[str], List[str]] = {}  # {game_id: آخرین دست ارسال شده}
+
+    def encode(self, payload: EncodedMessage) -> Frame:
+        message = payload.message
+        message_type = message.get("type")
+        builder = BINARY_FRAMES.get(message_type)
+        if builder is not None:
+            return payload.frame(message_type, builder)
+
+        # شروع و پایان بازی مبنای تغییرات دست آن بازی را پاک می‌کند
+        if message_type in HAND_RESETS:
+            self.hands.pop(game_key(message), None)
+
+        hand = message.get("your_hand")
+        if hand is None:
+            return payload.json
+        return encode_json(self._hand_delta(message, hand))
+
+    def _hand_delta(self, message: dict, hand: List[str]) -> dict:
+        """جایگزینی your_hand با کارت‌های اضافه/حذف شده نسبت به ارسال قبلی همان بازی"""
+        key = game_key(message)
+        previous = self.hands.get(key)
+        self.hands[key] = list(hand)
+        if previous is None:
+            return message
+
+        previous_set = set(previous)
+        current_set = set(hand)
+        delta = {key: value for key, value in message.items() if key != "your_hand"}
+        delta["hand_added"] = [card for card in hand if card not in previous_set]
+        delta["hand_removed"] = [card for card in previous if card not in current_set]
+        return delta
+
+
+JSON_CODEC = JSONCodec()
+
+def make_codec(encoding: Optional[str]):
+    """ساخت codec اتصال بر اساس فرمت درخواستی کلاینت"""
+    if encoding == ENCODING_COMPACT:
+        return CompactCodec()
+    return JSON_CODEC
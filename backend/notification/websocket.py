@@ -1,30 +1,76 @@
 # backend/notification/websocket.py
-from fastapi import WebSocket, WebSocketDisconnect, status
-from typing import Dict, List
+from fastapi import WebSocket, WebSocketDisconnect, HTTPException, status
+from typing import Dict, List, Set, Iterable
+from datetime import datetime
 import uuid
 import json
 import asyncio
+import logging
 from ..core import auth, models
-from ..core.database import Session
+from ..core.database import Session, AsyncSessionLocal
 from ..core.config import settings
+from .codec import EncodedMessage, JSON_CODEC, ENCODING_JSON, make_codec
+
+logger = logging.getLogger(__name__)
+
+# انواع مقصد پیام‌ها در bus بین workerها
+TARGET_USER = "user"
+TARGET_GROUP = "group"
+TARGET_ALL = "all"
 
 class ConnectionManager:
-    """مدیریت اتصالات WebSocket"""
+    """مدیریت اتصالات WebSocket
+
+    هر اتصال یک صف ارسال محدود و یک task نویسنده دارد؛ ارسال پیام فقط قرار
+    دادن فریم سریالایز شده در صف‌هاست و منتظر هیچ کلاینتی نمی‌ماند. اتصالی که
+    صفش پر شود (کلاینت کند) قطع می‌شود تا بقیه معطل نمانند. هر فرمت پیام
+    (JSON یا compact) فقط یک بار برای تمام گیرندگان ساخته می‌شود.
+    """
     
-    def __init__(self):
+    def __init__(
+        self,
+        send_queue_size: int = settings.WS_SEND_QUEUE_SIZE,
+        send_timeout: float = settings.WS_SEND_TIMEOUT
+    ):
         self.active_connections: Dict[uuid.UUID, WebSocket] = {}
         self.user_connections: Dict[uuid.UUID, List[uuid.UUID]] = {}
         self.connection_user_map: Dict[uuid.UUID, uuid.UUID] = {}
+        self.groups: Dict[str, Set[uuid.UUID]] = {}  # {group: {connection_id}}
+        self.connection_groups: Dict[uuid.UUID, Set[str]] = {}
+        self.send_queues: Dict[uuid.UUID, asyncio.Queue] = {}
+        self.writers: Dict[uuid.UUID, asyncio.Task] = {}
+        self.codecs: Dict[uuid.UUID, object] = {}  # فرمت مذاکره شده هر اتصال
+        self.send_queue_size = send_queue_size
+        self.send_timeout = send_timeout
+        self.bus = None  # RedisMessageBus برای ارسال به اتصالات سایر workerها
     
-    async def connect(self, websocket: WebSocket, user_id: uuid.UUID, connection_id: uuid.UUID):
+    @staticmethod
+    def game_group(game_id: uuid.UUID) -> str:
+        """نام گروه اتصالات یک بازی"""
+        return f"game:{game_id}"
+    
+    async def connect(
+        self,
+        websocket: WebSocket,
+        user_id: uuid.UUID,
+        connection_id: uuid.UUID,
+        encoding: str = ENCODING_JSON
+    ):
         """اتصال جدید WebSocket"""
         await websocket.accept()
         self.active_connections[connection_id] = websocket
         self.connection_user_map[connection_id] = user_id
+        self.codecs[connection_id] = make_codec(encoding)
         
         if user_id not in self.user_connections:
             self.user_connections[user_id] = []
         self.user_connections[user_id].append(connection_id)
+        
+        queue = asyncio.Queue(maxsize=self.send_queue_size)
+        self.send_queues[connection_id] = queue
+        self.writers[connection_id] = asyncio.create_task(
+            self._writer(connection_id, websocket, queue)
+        )
     
     def disconnect(self, connection_id: uuid.UUID):
         """قطع اتصال WebSocket"""
@@ -35,24 +81,132 @@ class ConnectionManager:
                 del self.user_connections[user_id]
             del self.connection_user_map[connection_id]
             del self.active_connections[connection_id]
+            
+            for group in self.connection_groups.pop(connection_id, set()):
+                self._discard_from_group(group, connection_id)
+            
+            self.send_queues.pop(connection_id, None)
+            self.codecs.pop(connection_id, None)
+            writer = self.writers.pop(connection_id, None)
+            if writer is not None and writer is not asyncio.current_task():
+                writer.cancel()
+    
+    def join(self, connection_id: uuid.UUID, group: str):
+        """افزودن اتصال به یک گروه"""
+        if connection_id not in self.active_connections:
+            return
+        self.groups.setdefault(group, set()).add(connection_id)
+        self.connection_groups.setdefault(connection_id, set()).add(group)
+    
+    def leave(self, connection_id: uuid.UUID, group: str):
+        """حذف اتصال از یک گروه"""
+        groups = self.connection_groups.get(connection_id)
+        if groups is not None:
+            groups.discard(group)
+        self._discard_from_group(group, connection_id)
+    
+    def _discard_from_group(self, group: str, connection_id: uuid.UUID):
+        members = self.groups.get(group)
+        if members is not None:
+            members.discard(connection_id)
+            if not members:
+                del self.groups[group]
+    
+    def join_game(self, connection_id: uuid.UUID, game_id: uuid.UUID):
+        """افزودن اتصال به گروه یک بازی"""
+        self.join(connection_id, self.game_group(game_id))
+    
+    async def _writer(self, connection_id: uuid.UUID, websocket: WebSocket, queue: asyncio.Queue):
+        """ارسال پیام‌های صف یک اتصال به ترتیب"""
+        try:
+            # wait_for لغو شدن را اگر ارسال همزمان تمام شده باشد نادیده می‌گیرد؛
+            # پس از disconnect صف دیگر ثبت نیست و نویسنده خودش خارج می‌شود
+            while self.send_queues.get(connection_id) is queue:
+                frame = await queue.get()
+                if isinstance(frame, bytes):
+                    await asyncio.wait_for(websocket.send_bytes(frame), self.send_timeout)
+                else:
+                    await asyncio.wait_for(websocket.send_text(frame), self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug(f"WebSocket send failed for {connection_id}: {str(e)}")
+            self.disconnect(connection_id)
+    
+    def _enqueue(self, connection_id: uuid.UUID, payload: EncodedMessage):
+        """قرار دادن پیام با فرمت اتصال در صف آن بدون انتظار"""
+        queue = self.send_queues.get(connection_id)
+        if queue is None:
+            return
+        try:
+            frame = self.codecs.get(connection_id, JSON_CODEC).encode(payload)
+        except Exception as e:
+            logger.error(f"WebSocket encode failed for {connection_id}: {str(e)}")
+            frame = payload.json
+        try:
+            queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            logger.warning(f"Dropping slow WebSocket connection {connection_id}")
+            websocket = self.active_connections.get(connection_id)
+            self.disconnect(connection_id)
+            if websocket is not None:
+                asyncio.create_task(self._close_quietly(websocket))
+    
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket):
+        try:
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        except Exception:
+            pass
+    
+    def _fan_out(self, connection_ids: Iterable[uuid.UUID], payload: EncodedMessage) -> int:
+        count = 0
+        for connection_id in list(connection_ids):
+            self._enqueue(connection_id, payload)
+            count += 1
+        return count
+    
+    def deliver_to_user(self, user_id: uuid.UUID, payload: EncodedMessage) -> int:
+        """تحویل پیام به اتصالات محلی یک کاربر"""
+        return self._fan_out(self.user_connections.get(user_id, ()), payload)
+    
+    def deliver_to_group(self, group: str, payload: EncodedMessage) -> int:
+        """تحویل پیام به اتصالات محلی یک گروه"""
+        return self._fan_out(self.groups.get(group, ()), payload)
+    
+    def deliver_to_all(self, payload: EncodedMessage) -> int:
+        """تحویل پیام به تمام اتصالات محلی"""
+        return self._fan_out(self.active_connections.keys(), payload)
+    
+    async def send_to_connection(self, connection_id: uuid.UUID, message: dict):
+        """ارسال پیام به یک اتصال مشخص (فقط همین worker)"""
+        self._fan_out((connection_id,), EncodedMessage(message))
     
     async def send_personal_message(self, message: dict, user_id: uuid.UUID):
         """ارسال پیام به کاربر خاص"""
-        if user_id in self.user_connections:
-            for connection_id in self.user_connections[user_id]:
-                if connection_id in self.active_connections:
-                    try:
-                        await self.active_connections[connection_id].send_json(message)
-                    except:
-                        self.disconnect(connection_id)
+        payload = EncodedMessage(message)
+        self.deliver_to_user(user_id, payload)
+        if self.bus is not None:
+            self.bus.publish(TARGET_USER, str(user_id), payload.json)
+    
+    async def send_to_group(self, group: str, message: dict) -> int:
+        """ارسال پیام به تمام اتصالات یک گروه"""
+        payload = EncodedMessage(message)
+        count = self.deliver_to_group(group, payload)
+        if self.bus is not None:
+            self.bus.publish(TARGET_GROUP, group, payload.json)
+        return count
+    
+    async def send_to_game(self, game_id: uuid.UUID, message: dict) -> int:
+        """ارسال پیام به تمام اتصالات یک بازی"""
+        return await self.send_to_group(self.game_group(game_id), message)
     
     async def broadcast(self, message: dict):
         """ارسال پیام به تمام اتصالات فعال"""
-        for connection_id, websocket in list(self.active_connections.items()):
-            try:
-                await websocket.send_json(message)
-            except:
-                self.disconnect(connection_id)
+        payload = EncodedMessage(message)
+        self.deliver_to_all(payload)
+        if self.bus is not None:
+            self.bus.publish(TARGET_ALL, None, payload.json)
 
 manager = ConnectionManager()
 
@@ -62,10 +216,11 @@ async def websocket_endpoint(
     db: Session
 ):
     """Endpoint اصلی WebSocket"""
+    connection_id = uuid.uuid4()
     try:
-        # احراز هویت کاربر
-        user = await auth.get_current_user_from_token(token, db)
-        connection_id = uuid.uuid4()
+        # احراز هویت کاربر (session async کوتاه‌مدت، بدون اشغال thread)
+        async with AsyncSessionLocal() as auth_db:
+            user = await auth.get_current_user_from_token(token, auth_db)
         
         # اتصال به سیستم
         await manager.connect(websocket, user.id, connection_id)
@@ -1,37 +1,206 @@
 # backend/payment_gateway/providers.py
-import requests
-from typing import Optional, Dict
+import asyncio
+import importlib.util
+import time
+import uuid
+import logging
+import httpx
+from typing import Any, Optional, Dict
 from decimal import Decimal
 from ..core.config import settings
 from ..core import schemas
 
+logger = logging.getLogger(__name__)
+
+# پاسخ این وضعیت‌ها خطای موقت درگاه یا پیکربندی است، نه نتیجه پرداخت
+TRANSIENT_STATUS_CODES = {401, 403, 408, 429}
+
+# HTTP/2 فقط در صورت نصب بودن بسته h2 (httpx[http2]) فعال می‌شود
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+class GatewayError(Exception):
+    """خطای گذرای درگاه (شبکه، timeout، 5xx)؛ پرداخت باید دوباره بررسی شود"""
+
+
+class CircuitOpenError(GatewayError):
+    """درگاه پس از خطاهای پشت سر هم موقتاً فراخوانی نمی‌شود"""
+
+
+class CircuitBreaker:
+    """قطع موقت فراخوانی درگاهی که پشت سر هم خطای گذرا می‌دهد
+
+    پس از failure_threshold خطای متوالی مدار باز می‌شود و درخواست‌ها بدون
+    ارسال رد می‌شوند. در هر reset_timeout فقط یک درخواست آزمایشی عبور
+    می‌کند؛ موفقیت آن مدار را می‌بندد و شکست آن دوباره بازش می‌کند.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = settings.PAYMENT_BREAKER_FAILURES,
+        reset_timeout: float = settings.PAYMENT_BREAKER_RESET
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.stats = {"opened": 0, "rejected": 0}
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - self.opened_at >= self.reset_timeout:
+            self.opened_at = now
+            return True
+        self.stats["rejected"] += 1
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> bool:
+        """ثبت یک خطای گذرا؛ اگر مدار همین حالا باز شده باشد True"""
+        self.failures += 1
+        if self.failures < self.failure_threshold:
+            return False
+        opened = self.opened_at is None
+        if opened:
+            self.stats["opened"] += 1
+        self.opened_at = time.monotonic()
+        return opened
+
+
+def client_options() -> Dict[str, Any]:
+    """تنظیمات client مشترک هر درگاه: اتصال‌های keep-alive و timeoutهای جدا"""
+    return {
+        "http2": settings.PAYMENT_HTTP2 and HTTP2_AVAILABLE,
+        "timeout": httpx.Timeout(
+            settings.PAYMENT_HTTP_TIMEOUT,
+            connect=settings.PAYMENT_HTTP_CONNECT_TIMEOUT,
+            pool=settings.PAYMENT_HTTP_POOL_TIMEOUT
+        ),
+        "limits": httpx.Limits(
+            max_connections=settings.PAYMENT_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.PAYMENT_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.PAYMENT_HTTP_KEEPALIVE_EXPIRY
+        ),
+        "headers": {"Accept": "application/json"},
+    }
+
+
 class PaymentProvider:
-    """کلاس پایه برای ارائه‌دهندگان پرداخت"""
-    
-    def __init__(self):
+    """کلاس پایه برای ارائه‌دهندگان پرداخت
+
+    درخواست‌ها بدون مسدود کردن event loop از یک httpx.AsyncClient مشترک
+    برای هر درگاه ارسال می‌شوند تا اتصال‌ها (و TLS) دوباره استفاده شوند.
+    اتصال‌ها به event loop وابسته‌اند، پس در loop جدید (مثلاً asyncio.run
+    در وظایف Celery) client تازه‌ای ساخته می‌شود. client داده شده از
+    بیرون (مثلاً در تست با یک درگاه محلی) به جای client مشترک استفاده
+    می‌شود و بستن آن با سازنده‌اش است.
+    """
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
         self.name = "base"
-    
+        self.base_url = ""
+        self.client = client
+        self.breaker = CircuitBreaker()
+        self._shared: Optional[httpx.AsyncClient] = None
+        self._shared_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _client(self) -> httpx.AsyncClient:
+        if self.client is not None:
+            return self.client
+        loop = asyncio.get_running_loop()
+        if self._shared is None or self._shared_loop is not loop:
+            self._shared = httpx.AsyncClient(**client_options())
+            self._shared_loop = loop
+        return self._shared
+
+    async def _post(self, path: str, data: Dict, headers: Optional[Dict] = None) -> Dict:
+        """ارسال درخواست JSON؛ خطاهای گذرا GatewayError می‌شوند"""
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.name} circuit open")
+        try:
+            response = await self._client().post(f"{self.base_url}{path}", json=data, headers=headers)
+        except httpx.HTTPError as e:
+            self._record_failure()
+            raise GatewayError(str(e) or type(e).__name__)
+
+        if response.status_code >= 500 or response.status_code in TRANSIENT_STATUS_CODES:
+            self._record_failure()
+            raise GatewayError(f"{self.name} returned HTTP {response.status_code}")
+        self.breaker.record_success()
+        try:
+            return response.json()
+        except ValueError:
+            raise GatewayError(f"{self.name} returned invalid JSON")
+
+    def _record_failure(self):
+        if self.breaker.record_failure():
+            logger.warning(
+                f"Payment gateway {self.name} circuit opened after "
+                f"{self.breaker.failures} consecutive failures"
+            )
+
+    async def close(self):
+        """بستن اتصال‌های client مشترک (فقط در همان event loop سازنده)"""
+        if self._shared is not None and self._shared_loop is asyncio.get_running_loop():
+            await self._shared.aclose()
+        self._shared = None
+        self._shared_loop = None
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            **self.breaker.stats,
+            "http2": settings.PAYMENT_HTTP2 and HTTP2_AVAILABLE
+        }
+
     async def initiate_payment(self, amount: Decimal, callback_url: str, description: str) -> Dict:
         """آغاز فرآیند پرداخت"""
         raise NotImplementedError
-    
-    async def verify_payment(self, authority: str, amount: Decimal) -> bool:
-        """تایید پرداخت"""
+
+    async def verify_payment(self, authority: str, amount: Decimal) -> Dict:
+        """تایید پرداخت
+
+        status برابر success (پرداخت تایید شد)، failed (درگاه پرداخت را رد
+        کرد) یا error (خطای گذرا؛ بعداً دوباره بررسی شود) است. در success،
+        already_verified یعنی درگاه پرداخت را پیش‌تر تایید کرده بود.
+        """
         raise NotImplementedError
 
 
 class ZarinpalProvider(PaymentProvider):
     """ارائه‌دهنده زرین‌پال"""
-    
-    def __init__(self):
-        super().__init__()
+
+    # 101: پرداخت قبلاً تایید شده است
+    VERIFIED_CODES = (100, 101)
+    ALREADY_VERIFIED = 101
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        super().__init__(client)
         self.name = "zarinpal"
-        self.base_url = "https://api.zarinpal.com/pg/v4"
+        self.base_url = settings.ZARINPAL_BASE_URL
         self.merchant_id = settings.ZARINPAL_MERCHANT_ID
-    
+
+    @staticmethod
+    def _error_message(result: Dict) -> str:
+        errors = result.get('errors') or {}
+        return errors.get('message', 'Unknown error') if isinstance(errors, dict) else str(errors)
+
     async def initiate_payment(self, amount: Decimal, callback_url: str, description: str) -> Dict:
         amount_in_rials = int(amount * 10)  # تبدیل به ریال
-        
+
         data = {
             "merchant_id": self.merchant_id,
             "amount": amount_in_rials,
@@ -42,61 +211,53 @@ class ZarinpalProvider(PaymentProvider):
                 "email": None
             }
         }
-        
+
         try:
-            response = requests.post(
-                f"{self.base_url}/payment/request.json",
-                json=data,
-                timeout=10
-            )
-            response.raise_for_status()
-            result = response.json()
-            
-            if result['data']['code'] == 100:
+            result = await self._post("/payment/request.json", data)
+
+            # در پاسخ ناموفق data یک لیست خالی است
+            payment = result.get('data') or {}
+            if payment.get('code') == 100:
                 return {
                     "status": "success",
-                    "payment_url": f"https://www.zarinpal.com/pg/StartPay/{result['data']['authority']}",
-                    "authority": result['data']['authority']
+                    "payment_url": f"https://www.zarinpal.com/pg/StartPay/{payment['authority']}",
+                    "authority": payment['authority']
                 }
             else:
                 return {
                     "status": "failed",
-                    "message": result['errors']['message']
+                    "message": self._error_message(result)
                 }
         except Exception as e:
             return {
                 "status": "error",
                 "message": str(e)
             }
-    
+
     async def verify_payment(self, authority: str, amount: Decimal) -> Dict:
         amount_in_rials = int(amount * 10)  # تبدیل به ریال
-        
+
         data = {
             "merchant_id": self.merchant_id,
             "amount": amount_in_rials,
             "authority": authority
         }
-        
+
         try:
-            response = requests.post(
-                f"{self.base_url}/payment/verify.json",
-                json=data,
-                timeout=10
-            )
-            response.raise_for_status()
-            result = response.json()
-            
-            if result['data']['code'] == 100:
+            result = await self._post("/payment/verify.json", data)
+
+            payment = result.get('data') or {}
+            if payment.get('code') in self.VERIFIED_CODES:
                 return {
                     "status": "success",
-                    "ref_id": result['data']['ref_id'],
-                    "amount": Decimal(result['data']['amount']) / 10  # تبدیل به تومان
+                    "ref_id": payment['ref_id'],
+                    "amount": Decimal(payment['amount']) / 10,  # تبدیل به تومان
+                    "already_verified": payment['code'] == self.ALREADY_VERIFIED
                 }
             else:
                 return {
                     "status": "failed",
-                    "message": result['errors']['message']
+                    "message": self._error_message(result)
                 }
         except Exception as e:
             return {
@@ -107,13 +268,23 @@ class ZarinpalProvider(PaymentProvider):
 
 class IDPayProvider(PaymentProvider):
     """ارائه‌دهنده IDPay"""
-    
-    def __init__(self):
-        super().__init__()
+
+    # 100: تایید شده، 101: قبلاً تایید شده
+    VERIFIED_STATUSES = (100, 101)
+    ALREADY_VERIFIED = 101
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        super().__init__(client)
         self.name = "idpay"
-        self.base_url = "https://api.idpay.ir/v1.1"
+        self.base_url = settings.IDPAY_BASE_URL
         self.api_key = settings.IDPAY_API_KEY
-    
+
+    def _headers(self) -> Dict:
+        return {
+            "X-API-KEY": self.api_key,
+            "X-SANDBOX": str(settings.DEBUG).lower()
+        }
+
     async def initiate_payment(self, amount: Decimal, callback_url: str, description: str) -> Dict:
         data = {
             "order_id": str(uuid.uuid4()),
@@ -124,64 +295,47 @@ class IDPayProvider(PaymentProvider):
             "desc": description,
             "callback": callback_url
         }
-        
-        headers = {
-            "X-API-KEY": self.api_key,
-            "X-SANDBOX": str(settings.DEBUG).lower()
-        }
-        
+
         try:
-            response = requests.post(
-                f"{self.base_url}/payment",
-                json=data,
-                headers=headers,
-                timeout=10
-            )
-            response.raise_for_status()
-            result = response.json()
-            
+            result = await self._post("/payment", data, self._headers())
+
+            if 'id' not in result:
+                return {
+                    "status": "failed",
+                    "message": result.get('error_message', 'Unknown error')
+                }
             return {
                 "status": "success",
                 "payment_url": result['link'],
-                "id": result['id']
+                "id": result['id'],
+                "authority": result['id']
             }
         except Exception as e:
             return {
                 "status": "error",
                 "message": str(e)
             }
-    
+
     async def verify_payment(self, payment_id: str, amount: Decimal) -> Dict:
         data = {
             "id": payment_id,
             "order_id": str(uuid.uuid4())
         }
-        
-        headers = {
-            "X-API-KEY": self.api_key,
-            "X-SANDBOX": str(settings.DEBUG).lower()
-        }
-        
+
         try:
-            response = requests.post(
-                f"{self.base_url}/payment/verify",
-                json=data,
-                headers=headers,
-                timeout=10
-            )
-            response.raise_for_status()
-            result = response.json()
-            
-            if result['status'] in [100, 101]:
+            result = await self._post("/payment/verify", data, self._headers())
+
+            if result.get('status') in self.VERIFIED_STATUSES:
                 return {
                     "status": "success",
                     "track_id": result['track_id'],
-                    "amount": Decimal(result['amount'])
+                    "amount": Decimal(result['amount']),
+                    "already_verified": result['status'] == self.ALREADY_VERIFIED
                 }
             else:
                 return {
                     "status": "failed",
-                    "message": result['message']
+                    "message": result.get('message') or result.get('error_message', 'Unknown error')
                 }
         except Exception as e:
             return {
@@ -190,14 +344,31 @@ class IDPayProvider(PaymentProvider):
             }
 
 
-def get_payment_provider(provider_name: str = None) -> PaymentProvider:
-    """فکتوری برای ایجاد نمونه ارائه‌دهنده پرداخت"""
+PROVIDERS = {
+    "zarinpal": ZarinpalProvider,
+    "idpay": IDPayProvider,
+}
+
+# یک نمونه (و یک client و circuit breaker) برای هر درگاه در هر پروسه
+_providers: Dict[str, PaymentProvider] = {}
+
+def get_payment_provider(provider_name: str = None, client: Optional[httpx.AsyncClient] = None) -> PaymentProvider:
+    """نمونه مشترک ارائه‌دهنده پرداخت؛ با client داده شده نمونه جدا ساخته می‌شود"""
     if not provider_name:
         provider_name = settings.PAYMENT_PROVIDER
-    
-    if provider_name == "zarinpal":
-        return ZarinpalProvider()
-    elif provider_name == "idpay":
-        return IDPayProvider()
-    else:
+
+    if provider_name not in PROVIDERS:
         raise ValueError(f"Unsupported payment provider: {provider_name}")
+    if client is not None:
+        return PROVIDERS[provider_name](client)
+    if provider_name not in _providers:
+        _providers[provider_name] = PROVIDERS[provider_name]()
+    return _providers[provider_name]
+
+async def close_payment_providers():
+    """بستن اتصال‌های همه درگاه‌ها هنگام خاموشی برنامه"""
+    for provider in _providers.values():
+        await provider.close()
+
+def payment_metrics() -> Dict[str, Dict[str, Any]]:
+    return {name: provider.metrics() for name, provider in _providers.items()}
@@ -0,0 +1,240 @@
+# backend/payment_gateway/reconciler.py
+import asyncio
+import random
+import time
+import uuid
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+from sqlalchemy import text
+from ..core import models
+from ..core.database import Session
+from ..core.config import settings
+from .providers import PaymentProvider, close_payment_providers, get_payment_provider
+from .service import PaymentService
+
+logger = logging.getLogger(__name__)
+
+# ردیف‌های سررسیده از ایندکس جزئی ix_transactions_pending_payments خوانده و
+# برای مدت lease از دید workerهای دیگر کنار گذاشته می‌شوند
+CLAIM_PENDING = text("""
+    UPDATE transactions
+    SET payment_next_check_at = :lease_until
+    WHERE (id, created_at) IN (
+        SELECT id, created_at
+        FROM transactions
+        WHERE payment_status = 'PENDING' AND payment_next_check_at <= :now
+        ORDER BY payment_next_check_at
+        LIMIT :limit
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, created_at, amount, payment_provider, payment_authority, payment_attempts
+""").columns(
+    models.Transaction.id, models.Transaction.created_at, models.Transaction.amount,
+    models.Transaction.payment_provider, models.Transaction.payment_authority,
+    models.Transaction.payment_attempts
+)
+
+MARK_FAILED = text("""
+    UPDATE transactions AS t
+    SET payment_status = 'FAILED',
+        payment_next_check_at = NULL,
+        description = v.message
+    FROM unnest(
+        CAST(:ids AS uuid[]),
+        CAST(:created_ats AS timestamp[]),
+        CAST(:messages AS text[])
+    ) AS v(id, created_at, message)
+    WHERE t.id = v.id AND t.created_at = v.created_at AND t.payment_status = 'PENDING'
+""")
+
+SCHEDULE_RETRY = text("""
+    UPDATE transactions AS t
+    SET payment_attempts = t.payment_attempts + 1,
+        payment_next_check_at = v.next_check_at
+    FROM unnest(
+        CAST(:ids AS uuid[]),
+        CAST(:created_ats AS timestamp[]),
+        CAST(:next_check_ats AS timestamp[])
+    ) AS v(id, created_at, next_check_at)
+    WHERE t.id = v.id AND t.created_at = v.created_at AND t.payment_status = 'PENDING'
+""")
+
+
+class PendingPayment(NamedTuple):
+    id: uuid.UUID
+    created_at: datetime
+    amount: Decimal
+    payment_provider: Optional[str]
+    payment_authority: Optional[str]
+    payment_attempts: int
+
+
+class PaymentReconciler:
+    """تایید هم‌زمان پرداخت‌های معلق با درگاه‌ها
+
+    درخواست‌ها از client مشترک هر درگاه (اتصال‌های keep-alive و circuit
+    breaker) ارسال می‌شوند. تعداد درخواست‌های هم‌زمان کل و هر درگاه محدود
+    است و خطاهای گذرا با تأخیر نمایی (با jitter) دوباره امتحان می‌شوند؛ semaphoreها در
+    زمان انتظار آزادند و محدودیت درگاه پیش از محدودیت کل گرفته می‌شود تا
+    صف یک درگاه کند سهم درگاه‌های دیگر را اشغال نکند.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = settings.PAYMENT_RECONCILE_CONCURRENCY,
+        provider_concurrency: Optional[Dict[str, int]] = None,
+        retries: int = settings.PAYMENT_VERIFY_RETRIES,
+        retry_delay: float = settings.PAYMENT_VERIFY_RETRY_DELAY
+    ):
+        self.concurrency = concurrency
+        self.provider_concurrency = provider_concurrency or settings.PAYMENT_PROVIDER_CONCURRENCY
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+    async def _verify(
+        self,
+        payment: PendingPayment,
+        provider: PaymentProvider,
+        limit: asyncio.Semaphore,
+        provider_limit: asyncio.Semaphore
+    ) -> Dict[str, Any]:
+        if not payment.payment_authority:
+            # اتصال به درگاه هیچ‌وقت کامل نشده و پرداختی آغاز نشده است
+            return {"status": "failed", "message": "Missing payment authority"}
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1) * (0.5 + random.random()))
+            async with provider_limit, limit:
+                result = await provider.verify_payment(payment.payment_authority, payment.amount)
+            if result["status"] != "error":
+                break
+        return result
+
+    async def verify_all(self, payments: Sequence[PendingPayment]) -> List[Dict[str, Any]]:
+        """نتیجه درگاه برای هر پرداخت، به همان ترتیب ورودی"""
+        limit = asyncio.Semaphore(self.concurrency)
+        provider_limits: Dict[str, asyncio.Semaphore] = {}
+        tasks = []
+        for payment in payments:
+            name = payment.payment_provider or settings.PAYMENT_PROVIDER
+            if name not in provider_limits:
+                provider_limits[name] = asyncio.Semaphore(
+                    self.provider_concurrency.get(name, self.concurrency)
+                )
+            tasks.append(self._verify(payment, get_payment_provider(name), limit, provider_limits[name]))
+        return await asyncio.gather(*tasks)
+
+
+async def _verify_batch(reconciler: PaymentReconciler, payments: Sequence[PendingPayment]) -> List[Dict[str, Any]]:
+    # اتصال‌های client مشترک به event loop همین دسته وابسته‌اند
+    try:
+        return await reconciler.verify_all(payments)
+    finally:
+        await close_payment_providers()
+
+def retry_at(now: datetime, attempts: int) -> datetime:
+    """زمان بررسی بعدی پس از خطای درگاه با backoff نمایی"""
+    delay = min(settings.PAYMENT_RECONCILE_BACKOFF * 2 ** attempts, settings.PAYMENT_RECONCILE_MAX_BACKOFF)
+    return now + timedelta(seconds=delay)
+
+def apply_results(
+    db: Session,
+    payments: Sequence[PendingPayment],
+    results: Sequence[Dict[str, Any]],
+    now: datetime
+) -> Dict[str, int]:
+    """ثبت نتیجه‌ها: واریز موفق‌ها از مسیر ledger و بقیه با دو UPDATE آرایه‌ای"""
+    service = PaymentService(db)
+    stats = {"verified": 0, "already_processed": 0, "failed": 0, "retry": 0}
+    failed: List[tuple] = []
+    retry: List[tuple] = []
+
+    for payment, result in zip(payments, results):
+        # «قبلاً تایید شده» اینجا پذیرفته است: authority همان مقدار ذخیره شده خود تراکنش است
+        if result["status"] == "success":
+            try:
+                transaction = db.get(models.Transaction, (payment.id, payment.created_at))
+                balance = service.complete_deposit(transaction) if transaction is not None else None
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Failed to complete deposit {payment.id}: {str(e)}")
+                retry.append((payment, retry_at(now, payment.payment_attempts)))
+                continue
+            stats["verified" if balance is not None else "already_processed"] += 1
+        elif result["status"] == "failed":
+            failed.append((payment, f"Deposit failed: {result.get('message', '')}"[:255]))
+        else:
+            retry.append((payment, retry_at(now, payment.payment_attempts)))
+
+    try:
+        if failed:
+            db.execute(MARK_FAILED, {
+                "ids": [str(payment.id) for payment, _ in failed],
+                "created_ats": [payment.created_at for payment, _ in failed],
+                "messages": [message for _, message in failed]
+            })
+        if retry:
+            db.execute(SCHEDULE_RETRY, {
+                "ids": [str(payment.id) for payment, _ in retry],
+                "created_ats": [payment.created_at for payment, _ in retry],
+                "next_check_ats": [next_check_at for _, next_check_at in retry]
+            })
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    stats["failed"] = len(failed)
+    stats["retry"] = len(retry)
+    return stats
+
+def reconcile_pending_payments(
+    db: Session,
+    reconciler: Optional[PaymentReconciler] = None,
+    batch_size: int = settings.PAYMENT_RECONCILE_BATCH_SIZE,
+    max_seconds: float = settings.PAYMENT_RECONCILE_MAX_SECONDS
+) -> Dict[str, Any]:
+    """تطبیق دسته‌ای پرداخت‌های معلق سررسیده تا خالی شدن صف یا پایان زمان
+
+    هر دسته با یک UPDATE ... SKIP LOCKED برداشته و commit می‌شود، سپس
+    خارج از تراکنش دیتابیس با درگاه‌ها تایید می‌شود. اگر worker در این
+    فاصله از کار بیفتد ردیف‌ها پس از PAYMENT_RECONCILE_LEASE دوباره
+    برداشته می‌شوند.
+    """
+    reconciler = reconciler or PaymentReconciler()
+    started = time.monotonic()
+    totals = {"claimed": 0, "verified": 0, "already_processed": 0, "failed": 0, "retry": 0, "batches": 0}
+
+    while time.monotonic() - started < max_seconds:
+        now = datetime.utcnow()
+        try:
+            payments = [PendingPayment(*row) for row in db.execute(CLAIM_PENDING, {
+                "now": now,
+                "lease_until": now + timedelta(seconds=settings.PAYMENT_RECONCILE_LEASE),
+                "limit": batch_size
+            }).all()]
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        if not payments:
+            break
+
+        results = asyncio.run(_verify_batch(reconciler, payments))
+        for key, value in apply_results(db, payments, results, datetime.utcnow()).items():
+            totals[key] += value
+        totals["claimed"] += len(payments)
+        totals["batches"] += 1
+        if len(payments) < batch_size:
+            break
+
+    elapsed = time.monotonic() - started
+    totals["elapsed"] = round(elapsed, 3)
+    totals["per_minute"] = round(totals["claimed"] * 60 / elapsed) if elapsed > 0 else 0
+    logger.info(
+        f"Reconciled {totals['claimed']} pending payments: {totals['verified']} verified, "
+        f"{totals['failed']} failed, {totals['retry']} rescheduled ({totals['per_minute']}/min)"
+    )
+    return totals
@@ -1,12 +1,16 @@
 # backend/payment_gateway/service.py
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
 import uuid
+from datetime import datetime, timedelta
 from decimal import Decimal
-import requests
 from fastapi import HTTPException
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
 from ..core.config import settings
-from ..core import models, schemas, crud
+from ..core import models
 from ..core.database import Session
+from ..core.ledger import WalletLedger
+from .providers import get_payment_provider
 
 class PaymentService:
     """سرویس مدیریت پرداخت‌ها"""
@@ -28,21 +32,44 @@ class PaymentService:
                 detail=f"Minimum deposit is {settings.MIN_DEPOSIT}"
             )
         
-        # ایجاد تراکنش در حالت pending
-        transaction = crud.create_transaction(
-            self.db,
-            user_id,
-            amount,
-            schemas.TransactionType.DEPOSIT,
-            f"Deposit request via {payment_method}"
+        # ایجاد تراکنش در حالت pending؛ اگر callback نرسد check_pending_payments آن را تطبیق می‌دهد
+        transaction = models.Transaction(
+            user_id=user_id,
+            amount=amount,
+            type=models.TransactionType.DEPOSIT,
+            description=f"Deposit request via {payment_method}",
+            payment_status=models.PaymentStatus.PENDING,
+            payment_provider=settings.PAYMENT_PROVIDER,
+            payment_next_check_at=datetime.utcnow() + timedelta(seconds=settings.PAYMENT_RECONCILE_DELAY)
         )
+        self.db.add(transaction)
+        self.db.commit()
         
         # اتصال به درگاه پرداخت
-        payment_url = await self._connect_to_gateway(
-            amount,
-            transaction.id,
-            payment_method
-        )
+        try:
+            payment_url, authority = await self._connect_to_gateway(
+                amount,
+                transaction.id,
+                payment_method
+            )
+        except HTTPException:
+            self._mark_failed(transaction)
+            raise
+        
+        # کلید یکتای payment_authorities مانع تعلق یک authority به دو تراکنش می‌شود
+        transaction.payment_authority = authority
+        self.db.add(models.PaymentAuthority(
+            payment_provider=transaction.payment_provider,
+            payment_authority=authority,
+            transaction_id=transaction.id,
+            transaction_created_at=transaction.created_at
+        ))
+        try:
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            self._mark_failed(transaction)
+            raise HTTPException(status_code=502, detail="Duplicate payment authority")
         
         return {
             "payment_url": payment_url,
@@ -63,33 +90,71 @@ class PaymentService:
         if not transaction:
             raise HTTPException(status_code=404, detail="Transaction not found")
         
-        if transaction.type != schemas.TransactionType.DEPOSIT.value:
+        if transaction.type != models.TransactionType.DEPOSIT:
             raise HTTPException(status_code=400, detail="Invalid transaction type")
         
+        if transaction.payment_status != models.PaymentStatus.PENDING:
+            raise HTTPException(status_code=409, detail="Transaction already processed")
+        
+        # callback فقط برای authority همین تراکنش پذیرفته می‌شود (نه پرداخت تایید شده دیگری)
+        if not transaction.payment_authority or authority != transaction.payment_authority:
+            raise HTTPException(status_code=400, detail="Payment authority mismatch")
+        
         # تایید پرداخت با درگاه
         is_verified = await self._verify_payment(
             transaction.amount,
             authority,
-            status
+            status,
+            transaction.payment_provider
         )
         
         if not is_verified:
             raise HTTPException(status_code=400, detail="Payment verification failed")
         
-        # افزایش موجودی کیف پول
-        wallet = crud.get_wallet(self.db, transaction.user_id)
-        wallet.real_balance += transaction.amount
-        self.db.commit()
-        
-        # به‌روزرسانی وضعیت تراکنش
-        transaction.description = "Deposit completed successfully"
-        self.db.commit()
+        balance = self.complete_deposit(transaction)
+        if balance is None:
+            raise HTTPException(status_code=409, detail="Transaction already processed")
         
         return {
             "status": "success",
-            "new_balance": wallet.real_balance
+            "new_balance": balance["real_balance"]
         }
     
+    def _mark_failed(self, transaction: models.Transaction):
+        transaction.payment_status = models.PaymentStatus.FAILED
+        transaction.payment_next_check_at = None
+        self.db.commit()
+    
+    def complete_deposit(self, transaction: models.Transaction) -> Optional[Dict]:
+        """افزایش موجودی و تکمیل تراکنش pending واریز در یک commit
+        
+        وضعیت با UPDATE شرطی از PENDING به COMPLETED می‌رود تا callback و
+        check_pending_payments هم‌زمان یک واریز را دو بار اعمال نکنند. اگر
+        تراکنش دیگر pending نباشد None برمی‌گرداند.
+        """
+        claimed = self.db.execute(
+            update(models.Transaction)
+            .where(
+                models.Transaction.id == transaction.id,
+                models.Transaction.created_at == transaction.created_at,
+                models.Transaction.payment_status == models.PaymentStatus.PENDING
+            )
+            .values(payment_status=models.PaymentStatus.COMPLETED, payment_next_check_at=None)
+        ).rowcount
+        if not claimed:
+            self.db.rollback()
+            return None
+        
+        balance, _ = WalletLedger(self.db).apply(
+            transaction.user_id,
+            models.TransactionType.DEPOSIT,
+            transaction.amount,
+            real_delta=transaction.amount,
+            description="Deposit completed successfully",
+            transaction=transaction
+        )
+        return balance
+    
     async def create_withdrawal_request(
         self,
         user_id: uuid.UUID,
@@ -104,26 +169,17 @@ class PaymentService:
                 detail=f"Minimum withdrawal is {settings.MIN_WITHDRAWAL}"
             )
         
-        # بررسی موجودی کافی
-        wallet = crud.get_wallet(self.db, user_id)
-        if wallet.real_balance < amount:
-            raise HTTPException(
-                status_code=400,
-                detail="Insufficient balance"
+        # کسر موقت موجودی (فقط در صورت کافی بودن) و ایجاد تراکنش در یک commit
+        try:
+            _, transaction = WalletLedger(self.db).apply(
+                user_id,
+                models.TransactionType.WITHDRAWAL,
+                amount,
+                real_delta=-amount,
+                description=f"Withdrawal request to bank account {bank_account_id}"
             )
-        
-        # کسر موقت موجودی
-        wallet.real_balance -= amount
-        self.db.commit()
-        
-        # ایجاد تراکنش
-        transaction = crud.create_transaction(
-            self.db,
-            user_id,
-            amount,
-            schemas.TransactionType.WITHDRAWAL,
-            f"Withdrawal request to bank account {bank_account_id}"
-        )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         return {
             "status": "pending",
@@ -135,88 +191,37 @@ class PaymentService:
         amount: Decimal,
         transaction_id: uuid.UUID,
         payment_method: str
-    ) -> str:
-        """اتصال به درگاه پرداخت خارجی"""
-        # این بخش بسته به درگاه پرداخت می‌تواند متفاوت باشد
-        # نمونه کد برای درگاه زرین‌پال:
-        
-        if settings.PAYMENT_PROVIDER == "zarinpal":
-            amount_in_rials = int(amount * 10)  # تبدیل به ریال
-            
-            data = {
-                "merchant_id": settings.ZARINPAL_MERCHANT_ID,
-                "amount": amount_in_rials,
-                "callback_url": settings.PAYMENT_CALLBACK_URL,
-                "description": f"Deposit for transaction {transaction_id}",
-                "metadata": {
-                    "transaction_id": str(transaction_id),
-                    "payment_method": payment_method
-                }
-            }
-            
-            headers = {
-                "Accept": "application/json",
-                "Content-Type": "application/json"
-            }
-            
-            try:
-                response = requests.post(
-                    "https://api.zarinpal.com/pg/v4/payment/request.json",
-                    json=data,
-                    headers=headers,
-                    timeout=10
-                )
-                response.raise_for_status()
-                result = response.json()
-                
-                if result['data']['code'] == 100:
-                    return f"https://www.zarinpal.com/pg/StartPay/{result['data']['authority']}"
-                else:
-                    raise HTTPException(
-                        status_code=400,
-                        detail="Payment gateway error"
-                    )
-            except Exception as e:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Payment gateway connection failed: {str(e)}"
-                )
-        
-        raise HTTPException(
-            status_code=501,
-            detail="Payment provider not implemented"
+    ) -> Tuple[str, str]:
+        """اتصال به درگاه پرداخت خارجی؛ آدرس پرداخت و authority را برمی‌گرداند"""
+        result = await get_payment_provider().initiate_payment(
+            amount,
+            settings.PAYMENT_CALLBACK_URL,
+            f"Deposit for transaction {transaction_id} via {payment_method}"
         )
+        
+        if result["status"] == "error":
+            raise HTTPException(
+                status_code=500,
+                detail=f"Payment gateway connection failed: {result['message']}"
+            )
+        if result["status"] != "success":
+            raise HTTPException(
+                status_code=400,
+                detail="Payment gateway error"
+            )
+        return result["payment_url"], result["authority"]
     
     async def _verify_payment(
         self,
         amount: Decimal,
         authority: str,
-        status: str
+        status: str,
+        provider_name: Optional[str] = None
     ) -> bool:
         """تایید پرداخت با درگاه خارجی"""
         if status != "OK":
             return False
         
-        if settings.PAYMENT_PROVIDER == "zarinpal":
-            amount_in_rials = int(amount * 10)  # تبدیل به ریال
-            
-            data = {
-                "merchant_id": settings.ZARINPAL_MERCHANT_ID,
-                "amount": amount_in_rials,
-                "authority": authority
-            }
-            
-            try:
-                response = requests.post(
-                    "https://api.zarinpal.com/pg/v4/payment/verify.json",
-                    json=data,
-                    timeout=10
-                )
-                response.raise_for_status()
-                result = response.json()
-                
-                return result['data']['code'] == 100
-            except Exception:
-                return False
-        
-        return False
+        # «قبلاً تایید شده» فقط در check_pending_payments و برای authority ذخیره شده پذیرفته می‌شود
+        result = await get_payment_provider(provider_name).verify_payment(authority, amount)
+        return result["status"] == "success" and not result.get("already_verified")
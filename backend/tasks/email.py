@@ -1,7 +1,7 @@
 # backend/tasks/email.py
 from ..core.celery_app import celery_app
 from ..notification.email import EmailService
-from ..core.database import SessionLocal
+from ..core.database import db_router
 from ..core import models
 from datetime import datetime, timedelta
 import logging
@@ -38,7 +38,8 @@ def send_bulk_emails(emails: list, subject: str, body: str, is_html: bool = Fals
 @celery_app.task(name="send_daily_stats_email")
 def send_daily_stats_email():
     """وظیفه ارسال آمار روزانه به ادمین"""
-    db = SessionLocal()
+    # فقط خواندن: در صورت امکان از replica
+    db = db_router.read_session()
     try:
         from ..admin.dashboard import AdminDashboard
         dashboard = AdminDashboard(db)
@@ -2,26 +2,30 @@
 from ..core.celery_app import celery_app
 from ..core.database import SessionLocal
 from ..core import models
-from datetime import datetime, timedelta
 import logging
 
 logger = logging.getLogger(__name__)
 
 @celery_app.task(name="start_scheduled_game")
 def start_scheduled_game(game_id: str):
-    """وظیفه شروع بازی زمان‌بندی شده"""
+    """وظیفه شروع بازی زمان‌بندی شده
+
+    خود بازی در game runner (روی event loop برنامه) اجرا می‌شود و این
+    وظیفه فقط فرمان شروع را در صف قرار می‌دهد تا worker مشغول نماند.
+    """
     db = SessionLocal()
     try:
         game = db.query(models.Game).filter(models.Game.id == game_id).first()
         if not game:
             raise ValueError("Game not found")
         
-        # TODO: پیاده‌سازی منطق شروع بازی
-        from ..game_engine.base import GameFactory
-        game_engine = GameFactory.create_game(game.game_type, db, game.id)
-        game_engine.start_game()
+        if game.status != models.GameStatus.WAITING:
+            raise ValueError("Game is not in waiting state")
         
-        return {"status": "success", "game_id": game_id}
+        from ..game_engine.runner import enqueue_start
+        enqueue_start(game.id)
+        
+        return {"status": "queued", "game_id": game_id}
     except Exception as e:
         logger.error(f"Failed to start game {game_id}: {str(e)}")
         raise
@@ -30,41 +34,14 @@ def start_scheduled_game(game_id: str):
 
 @celery_app.task(name="cleanup_old_games")
 def cleanup_old_games():
-    """وظیفه پاکسازی بازی‌های قدیمی"""
+    """وظیفه بایگانی و پاکسازی دسته‌ای بازی‌های قدیمی"""
     db = SessionLocal()
     try:
-        cutoff_time = datetime.utcnow() - timedelta(days=7)
-        
-        # بازی‌های تکمیل شده قدیمی
-        completed_games = db.query(models.Game).filter(
-            models.Game.status == models.GameStatus.COMPLETED.value,
-            models.Game.completed_at < cutoff_time
-        ).all()
-        
-        # بازی‌های رها شده قدیمی
-        abandoned_games = db.query(models.Game).filter(
-            models.Game.status.in_([
-                models.GameStatus.WAITING.value,
-                models.GameStatus.ACTIVE.value
-            ]),
-            models.Game.created_at < cutoff_time
-        ).all()
-        
-        # انجام عملیات پاکسازی
-        for game in completed_games + abandoned_games:
-            try:
-                # TODO: می‌توانید لاگ‌های بازی را ذخیره کنید قبل از حذف
-                db.delete(game)
-            except Exception as e:
-                logger.error(f"Failed to cleanup game {game.id}: {str(e)}")
-                db.rollback()
-        
-        db.commit()
-        return {
-            "status": "success",
-            "completed_games_cleaned": len(completed_games),
-            "abandoned_games_cleaned": len(abandoned_games)
-        }
+        from ..game_engine.cleanup import cleanup_games
+        return cleanup_games(db)
+    except Exception as e:
+        logger.error(f"Failed to cleanup old games: {str(e)}")
+        return {"status": "error", "error": str(e)}
     finally:
         db.close()
 
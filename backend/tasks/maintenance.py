@@ -0,0 +1,62 @@
+# backend/tasks/maintenance.py
+from ..core.celery_app import celery_app
+from ..core.database import SessionLocal
+from sqlalchemy import text
+import logging
+
+logger = logging.getLogger(__name__)
+
+# تعداد ماه‌های آینده که پارتیشن تراکنش‌های آن‌ها از قبل وجود داشته باشد
+TRANSACTION_PARTITION_MONTHS_AHEAD = 3
+
+@celery_app.task(name="backend.tasks.maintenance.ensure_transaction_partitions")
+def ensure_transaction_partitions():
+    """وظیفه ساخت پارتیشن‌های ماهانه آینده جدول transactions
+
+    اگر پارتیشن یک ماه پیش از رسیدن آن ساخته نشود ردیف‌ها در پارتیشن
+    default می‌نشینند و ساخت پارتیشن آن ماه بعداً خطا می‌دهد.
+    """
+    db = SessionLocal()
+    try:
+        partitions = db.execute(text("""
+            SELECT create_transactions_partition(month::date)
+            FROM generate_series(
+                date_trunc('month', now()),
+                date_trunc('month', now()) + make_interval(months => :months_ahead),
+                interval '1 month'
+            ) AS month
+        """), {"months_ahead": TRANSACTION_PARTITION_MONTHS_AHEAD}).scalars().all()
+        db.commit()
+        return {"status": "success", "partitions": partitions}
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Transaction partition maintenance failed: {str(e)}")
+        return {"status": "error", "error": str(e)}
+    finally:
+        db.close()
+
+@celery_app.task(name="backend.tasks.maintenance.refresh_activity_rollups")
+def refresh_activity_rollups():
+    """وظیفه به‌روزرسانی افزایشی خلاصه‌های زمانی داشبورد"""
+    db = SessionLocal()
+    try:
+        from ..admin.rollups import refresh_rollups
+        return refresh_rollups(db)
+    except Exception as e:
+        logger.error(f"Activity rollup refresh failed: {str(e)}")
+        return {"status": "error", "error": str(e)}
+    finally:
+        db.close()
+
+@celery_app.task(name="backend.tasks.maintenance.export_columnar_history")
+def export_columnar_history():
+    """وظیفه خروجی روزانه تراکنش‌ها و تاریخچه بازی‌ها به فایل‌های ستونی"""
+    db = SessionLocal()
+    try:
+        from ..admin.export import ColumnarExporter
+        return {"status": "success", "exported": ColumnarExporter().export_pending(db)}
+    except Exception as e:
+        logger.error(f"Columnar export failed: {str(e)}")
+        return {"status": "error", "error": str(e)}
+    finally:
+        db.close()
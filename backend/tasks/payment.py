@@ -3,7 +3,7 @@ from ..core.celery_app import celery_app
 from ..payment_gateway.service import PaymentService
 from ..core.database import SessionLocal
 from ..core import models, schemas
-from datetime import datetime, timedelta
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,9 +14,9 @@ def process_payment_verification(self, transaction_id: str, authority: str):
     db = SessionLocal()
     try:
         payment_service = PaymentService(db)
-        result = payment_service.verify_deposit(transaction_id, authority)
+        result = asyncio.run(payment_service.verify_deposit(transaction_id, authority, "OK"))
         
-        if not result.get("success"):
+        if result.get("status") != "success":
             raise Exception(result.get("message", "Payment verification failed"))
         
         return {"status": "success", "transaction_id": transaction_id}
@@ -28,63 +28,17 @@ def process_payment_verification(self, transaction_id: str, authority: str):
 
 @celery_app.task(name="check_pending_payments")
 def check_pending_payments():
-    """وظیفه بررسی پرداخت‌های معلق"""
+    """وظیفه تطبیق پرداخت‌های معلق با درگاه‌ها"""
     db = SessionLocal()
     try:
-        from ..payment_gateway.providers import get_payment_provider
-        payment_service = PaymentService(db)
-        provider = get_payment_provider()
-        
-        # یافتن تراکنش‌های pending قدیمی
-        cutoff_time = datetime.utcnow() - timedelta(hours=1)
-        pending_transactions = db.query(models.Transaction).filter(
-            models.Transaction.type == schemas.TransactionType.DEPOSIT.value,
-            models.Transaction.created_at < cutoff_time,
-            models.Transaction.description.like("%pending%")
-        ).all()
-        
-        results = []
-        for transaction in pending_transactions:
-            try:
-                # تلاش برای تایید پرداخت
-                # (در اینجا باید authority از description استخراج شود)
-                authority = extract_authority_from_description(transaction.description)
-                if authority:
-                    result = provider.verify_payment(authority, transaction.amount)
-                    if result.get("status") == "success":
-                        payment_service.verify_deposit(
-                            transaction.id,
-                            authority,
-                            "success"
-                        )
-                        results.append({
-                            "transaction_id": str(transaction.id),
-                            "status": "verified"
-                        })
-                    else:
-                        results.append({
-                            "transaction_id": str(transaction.id),
-                            "status": "still_pending"
-                        })
-            except Exception as e:
-                logger.error(f"Error checking transaction {transaction.id}: {str(e)}")
-                results.append({
-                    "transaction_id": str(transaction.id),
-                    "status": "error",
-                    "error": str(e)
-                })
-        
-        return results
+        from ..payment_gateway.reconciler import reconcile_pending_payments
+        return reconcile_pending_payments(db)
+    except Exception as e:
+        logger.error(f"Pending payment reconciliation failed: {str(e)}")
+        return {"status": "error", "error": str(e)}
     finally:
         db.close()
 
-def extract_authority_from_description(description: str) -> Optional[str]:
-    """استخراج authority از description تراکنش"""
-    # این تابع بسته به درگاه پرداخت می‌تواند متفاوت باشد
-    if "authority:" in description:
-        return description.split("authority:")[1].strip()
-    return None
-
 @celery_app.task(name="process_withdrawal")
 def process_withdrawal(transaction_id: str):
     """وظیفه پردازش برداشت"""
@@ -0,0 +1,36 @@
+# backend/tests/conftest.py
+import os
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, text
+
+
+@pytest.fixture
+def pg_url():
+    """آدرس PostgreSQL تست (بدون TEST_DATABASE_URL تست‌های وابسته به دیتابیس رد می‌شوند)"""
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    return url
+
+
+@pytest.fixture
+def pg_schema(pg_url):
+    """یک schema موقت و خالی در دیتابیس تست که پس از تست حذف می‌شود"""
+    name = f"test_{uuid.uuid4().hex[:12]}"
+    admin = create_engine(pg_url)
+    with admin.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA {name}"))
+    yield name
+    with admin.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA {name} CASCADE"))
+    admin.dispose()
+
+
+@pytest.fixture
+def pg_engine(pg_url, pg_schema):
+    """engine با search_path روی schema موقت"""
+    engine = create_engine(pg_url, connect_args={"options": f"-csearch_path={pg_schema}"})
+    yield engine
+    engine.dispose()
@@ -0,0 +1,50 @@
+# backend/tests/test_codec.py
+import json
+import uuid
+
+from backend.notification.codec import CompactCodec, EncodedMessage
+
+
+def send(codec: CompactCodec, message: dict) -> dict:
+    # پیام‌های bus با game_id رشته‌ای می‌رسند و پیام‌های محلی با UUID
+    return json.loads(codec.encode(EncodedMessage(message)))
+
+
+def your_turn(game_id, hand):
+    return {"type": "your_turn", "game_id": game_id, "your_hand": list(hand)}
+
+
+def apply(hand: list, message: dict) -> list:
+    """بازسازی دست در سمت کلاینت"""
+    if "your_hand" in message:
+        return list(message["your_hand"])
+    return [card for card in hand if card not in message["hand_removed"]] + message["hand_added"]
+
+
+def test_each_game_starts_with_full_hand():
+    codec = CompactCodec()
+    first, second = uuid.uuid4(), uuid.uuid4()
+
+    assert send(codec, your_turn(first, ["AH", "KH", "2S"]))["your_hand"] == ["AH", "KH", "2S"]
+    delta = send(codec, your_turn(str(first), ["AH", "2S"]))
+    assert (delta["hand_added"], delta["hand_removed"]) == ([], ["KH"])
+    send(codec, {"type": "game_result", "game_id": first})
+
+    # بازی دوم روی همان اتصال: مبنای دست بازی قبلی استفاده نمی‌شود
+    send(codec, {"type": "game_started", "game_id": second})
+    assert send(codec, your_turn(second, ["QD", "JD"]))["your_hand"] == ["QD", "JD"]
+    assert "your_hand" not in send(codec, your_turn(second, ["QD"]))
+    assert codec.hands == {str(second): ["QD"]}
+
+
+def test_concurrent_games_keep_separate_baselines():
+    codec = CompactCodec()
+    first, second = uuid.uuid4(), uuid.uuid4()
+    hands = {first: ["AH", "KH", "QH"], second: ["2C", "3C", "4C"]}
+    client = {}
+
+    for turn in range(3):
+        for game_id in (first, second):
+            hand = hands[game_id][turn:]
+            client[game_id] = apply(client.get(game_id, []), send(codec, your_turn(game_id, hand)))
+            assert client[game_id] == hand
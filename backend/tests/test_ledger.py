@@ -0,0 +1,95 @@
+# backend/tests/test_ledger.py
+import uuid
+from decimal import Decimal
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.core import models
+from backend.core.database import Base
+from backend.core.ledger import BalanceCache, WalletLedger
+
+CREDIT = 1000
+
+
+class LocalCache(BalanceCache):
+    """کش بدون اعلام invalidation به Redis"""
+
+    def publish(self, user_ids):
+        self.published = list(user_ids)
+
+    async def publish_async(self, user_ids):
+        self.published = list(user_ids)
+
+
+@pytest.fixture
+def user_id(pg_engine):
+    Base.metadata.create_all(pg_engine)
+    db = sessionmaker(bind=pg_engine)()
+    user = models.User(username=f"ledger-{uuid.uuid4().hex[:12]}", password_hash="x")
+    db.add(user)
+    db.flush()
+    user_id = user.id
+    db.add(models.Wallet(user_id=user_id, credit=CREDIT, locked_credit=0, real_balance=0))
+    db.commit()
+    db.close()
+    return user_id
+
+
+@pytest_asyncio.fixture
+async def async_db(pg_url, pg_schema):
+    engine = create_async_engine(
+        make_url(pg_url).set(drivername="postgresql+asyncpg"),
+        connect_args={"server_settings": {"search_path": pg_schema}}
+    )
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as db:
+        yield db
+    await engine.dispose()
+
+
+def stakes(db, user_id):
+    return db.query(models.Transaction).filter(
+        models.Transaction.user_id == user_id,
+        models.Transaction.type == models.TransactionType.GAME_STAKE
+    ).count()
+
+
+def test_apply_with_session(pg_engine, user_id):
+    cache = LocalCache()
+    db = sessionmaker(bind=pg_engine)()
+    ledger = WalletLedger(db, cache)
+
+    balance, transaction = ledger.apply(
+        user_id, models.TransactionType.GAME_STAKE, Decimal(10), credit_delta=-10, locked_delta=10
+    )
+    assert (balance["credit"], balance["locked_credit"]) == (CREDIT - 10, 10)
+    assert transaction.id is not None and cache.get(user_id) == balance and cache.published == [user_id]
+
+    with pytest.raises(ValueError, match="Insufficient balance"):
+        ledger.apply(user_id, models.TransactionType.GAME_STAKE, Decimal(CREDIT), credit_delta=-CREDIT)
+    assert stakes(db, user_id) == 1
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_apply_async_with_async_session(pg_engine, user_id, async_db):
+    cache = LocalCache()
+    ledger = WalletLedger(async_db, cache)
+
+    balance, transaction = await ledger.apply_async(
+        user_id, models.TransactionType.GAME_STAKE, Decimal(10), credit_delta=-10, locked_delta=10
+    )
+    assert (balance["credit"], balance["locked_credit"]) == (CREDIT - 10, 10)
+    assert transaction.id is not None and cache.get(user_id) == balance and cache.published == [user_id]
+
+    with pytest.raises(ValueError, match="Insufficient balance"):
+        await ledger.apply_async(user_id, models.TransactionType.GAME_STAKE, Decimal(CREDIT), credit_delta=-CREDIT)
+    with pytest.raises(ValueError, match="Wallet not found"):
+        await ledger.apply_async(uuid.uuid4(), models.TransactionType.GAME_STAKE, Decimal(1), credit_delta=-1)
+
+    db = sessionmaker(bind=pg_engine)()
+    assert stakes(db, user_id) == 1
+    db.close()
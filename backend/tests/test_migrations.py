@@ -0,0 +1,70 @@
+# backend/tests/test_migrations.py
+import uuid
+from datetime import datetime
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import text
+
+from backend.core.config import settings
+
+
+def alembic_config(connection) -> Config:
+    config = Config()
+    config.set_main_option("script_location", "backend/core/alembic")
+    config.attributes["connection"] = connection
+    return config
+
+
+def test_payment_status_backfill_only_marks_gateway_requests_pending(pg_engine):
+    user_id = uuid.uuid4()
+    created_at = datetime(2026, 10, 1, 12, 0)
+    deposits = {
+        "request": "Deposit request via zarinpal authority: A0000001",
+        "completed": "Deposit completed successfully",
+        "direct": "Deposit via card",
+    }
+    ids = {name: uuid.uuid4() for name in deposits}
+
+    # بعضی مهاجرت‌ها (CREATE INDEX CONCURRENTLY) خارج از تراکنش اجرا می‌شوند،
+    # پس تراکنش‌ها را خود alembic باز می‌کند
+    with pg_engine.connect() as conn:
+        command.upgrade(alembic_config(conn), "0005")
+        conn.execute(
+            text("INSERT INTO users (id, username, password_hash) VALUES (:id, 'payer', 'x')"),
+            {"id": user_id}
+        )
+        for name, description in deposits.items():
+            conn.execute(text("""
+                INSERT INTO transactions (id, user_id, amount, type, description, created_at)
+                VALUES (:id, :user_id, 50000, 'DEPOSIT', :description, :created_at)
+            """), {"id": ids[name], "user_id": user_id, "description": description, "created_at": created_at})
+        conn.commit()
+        command.upgrade(alembic_config(conn), "0006")
+
+        rows = {
+            row.id: row for row in conn.execute(text("""
+                SELECT id, payment_status, payment_provider, payment_authority, payment_next_check_at
+                FROM transactions
+            """))
+        }
+        pending = conn.execute(text(
+            "SELECT transaction_id FROM payment_authorities WHERE payment_authority = 'A0000001'"
+        )).scalar()
+
+    request = rows[ids["request"]]
+    assert request.payment_status == "PENDING"
+    assert request.payment_provider == settings.PAYMENT_PROVIDER
+    assert request.payment_authority == "A0000001"
+    assert request.payment_next_check_at is not None
+    assert pending == ids["request"]
+
+    completed = rows[ids["completed"]]
+    assert completed.payment_status == "COMPLETED"
+    assert completed.payment_next_check_at is None
+
+    # واریز مستقیم قبلاً به کیف پول اضافه شده و نباید به صف تطبیق درگاه برود
+    direct = rows[ids["direct"]]
+    assert direct.payment_status is None
+    assert direct.payment_provider is None
+    assert direct.payment_next_check_at is None
@@ -0,0 +1,162 @@
+# backend/tests/test_payment_providers.py
+import asyncio
+import socket
+from decimal import Decimal
+
+import httpx
+import pytest
+
+from backend.payment_gateway.providers import (
+    CircuitBreaker, CircuitOpenError, GatewayError, IDPayProvider, ZarinpalProvider
+)
+
+
+def zarinpal_verified(code: int = 100) -> httpx.Response:
+    return httpx.Response(200, json={"data": {"code": code, "ref_id": 1234, "amount": 100000}, "errors": []})
+
+
+def mock_provider(handler, failure_threshold: int = 2, reset_timeout: float = 0.05):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    provider = ZarinpalProvider(client)
+    provider.breaker = CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+    return provider, client
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.mark.asyncio
+async def test_verify_maps_gateway_codes():
+    responses = iter([zarinpal_verified(100), zarinpal_verified(101)])
+    provider, client = mock_provider(lambda request: next(responses))
+    async with client:
+        first = await provider.verify_payment("A1", Decimal(10000))
+        second = await provider.verify_payment("A1", Decimal(10000))
+
+    assert first["status"] == "success" and first["amount"] == Decimal(10000)
+    assert first["already_verified"] is False
+    assert second["already_verified"] is True
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_after_consecutive_failures():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503)
+
+    provider, client = mock_provider(handler)
+    async with client:
+        for _ in range(2):
+            with pytest.raises(GatewayError):
+                await provider._post("/payment/verify.json", {})
+        assert provider.breaker.state == "open"
+
+        # مدار باز: درخواست بدون رسیدن به درگاه رد می‌شود
+        with pytest.raises(CircuitOpenError):
+            await provider._post("/payment/verify.json", {})
+        result = await provider.verify_payment("A1", Decimal(10000))
+
+    assert len(calls) == 2
+    assert result["status"] == "error"
+    assert provider.breaker.stats == {"opened": 1, "rejected": 2}
+    assert provider.metrics()["circuit"] == "open"
+
+
+@pytest.mark.asyncio
+async def test_half_open_probe_closes_circuit_on_success():
+    responses = iter([httpx.Response(503), httpx.Response(503), zarinpal_verified()])
+    provider, client = mock_provider(lambda request: next(responses))
+    async with client:
+        for _ in range(2):
+            await provider.verify_payment("A1", Decimal(10000))
+        assert provider.breaker.state == "open"
+
+        await asyncio.sleep(0.06)
+        assert provider.breaker.state == "half_open"
+        result = await provider.verify_payment("A1", Decimal(10000))
+
+    assert result["status"] == "success"
+    assert provider.breaker.state == "closed"
+    assert provider.breaker.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_half_open_allows_single_probe_and_reopens_on_failure():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(502)
+
+    provider, client = mock_provider(handler)
+    async with client:
+        for _ in range(2):
+            await provider.verify_payment("A1", Decimal(10000))
+        await asyncio.sleep(0.06)
+
+        with pytest.raises(GatewayError):
+            await provider._post("/payment/verify.json", {})
+        # درخواست آزمایشی شکست خورد؛ تا reset_timeout بعدی درخواستی ارسال نمی‌شود
+        assert provider.breaker.state == "open"
+        with pytest.raises(CircuitOpenError):
+            await provider._post("/payment/verify.json", {})
+
+    assert len(calls) == 3
+    assert provider.breaker.stats["opened"] == 1
+
+
+@pytest.mark.asyncio
+async def test_business_failure_does_not_open_circuit():
+    def handler(request):
+        return httpx.Response(200, json={"data": [], "errors": {"code": -51, "message": "Payment failed"}})
+
+    provider, client = mock_provider(handler)
+    async with client:
+        for _ in range(5):
+            result = await provider.verify_payment("A1", Decimal(10000))
+
+    assert result == {"status": "failed", "message": "Payment failed"}
+    assert provider.breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_shared_client_reuses_connections():
+    uvicorn = pytest.importorskip("uvicorn")
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    peers = []
+
+    async def verify(request):
+        peers.append(request.client.port)
+        return JSONResponse({"id": "P1", "status": 100, "track_id": 1, "amount": 10000})
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(
+        Starlette(routes=[Route("/payment/verify", verify, methods=["POST"])]),
+        host="127.0.0.1", port=port, log_level="warning"
+    ))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    provider = IDPayProvider()
+    provider.base_url = f"http://127.0.0.1:{port}"
+    try:
+        results = [await provider.verify_payment("P1", Decimal(10000)) for _ in range(5)]
+        client = provider._client()
+    finally:
+        await provider.close()
+        server.should_exit = True
+        await serving
+
+    assert all(result["status"] == "success" for result in results)
+    # هر پنج درخواست از یک اتصال keep-alive ارسال شده‌اند
+    assert len(peers) == 5 and len(set(peers)) == 1
+    assert client.is_closed
@@ -0,0 +1,79 @@
+# backend/tests/test_session_router.py
+import pytest
+from sqlalchemy import create_engine, text
+
+from backend.core.database import SessionRouter
+
+
+def sqlite_engine(path, name: str):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE source (name TEXT)"))
+        conn.execute(text("INSERT INTO source VALUES (:name)"), {"name": name})
+    return engine
+
+
+def read_source(db) -> str:
+    try:
+        return db.execute(text("SELECT name FROM source")).scalar()
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def engines(tmp_path):
+    primary = sqlite_engine(tmp_path / "primary.db", "primary")
+    replica = sqlite_engine(tmp_path / "replica.db", "replica")
+    yield primary, replica
+    primary.dispose()
+    replica.dispose()
+
+
+def test_reads_go_to_healthy_replica(engines):
+    router = SessionRouter(*engines, max_lag=5, check_interval=60)
+
+    db = router.read_session()
+    assert db.info.get("replica") is True
+    assert read_source(db) == "replica"
+    assert read_source(router.read_session()) == "replica"
+    assert read_source(router.write_session()) == "primary"
+
+    # نتیجه بررسی تا check_interval کش می‌شود
+    assert router.stats == {"replica_reads": 2, "primary_reads": 0, "fallbacks": 0, "checks": 1}
+    assert router.metrics()["replica_healthy"] is True
+
+
+def test_falls_back_to_primary_when_replica_lags(engines):
+    router = SessionRouter(*engines, max_lag=5, check_interval=0)
+    lag = [12.0]
+    router._measure_lag = lambda: lag[0]
+
+    assert read_source(router.read_session()) == "primary"
+    assert router.lag == 12.0
+    assert router.stats["fallbacks"] == 1
+
+    # با رسیدن replica به primary خواندن‌ها دوباره به replica برمی‌گردند
+    lag[0] = 1.0
+    assert read_source(router.read_session()) == "replica"
+    assert router.stats["replica_reads"] == 1
+
+
+def test_falls_back_to_primary_when_probe_fails(engines, tmp_path):
+    primary, _ = engines
+    unreachable = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    router = SessionRouter(primary, unreachable, check_interval=60)
+
+    assert read_source(router.read_session()) == "primary"
+    assert read_source(router.read_session()) == "primary"
+    assert router.lag is None
+    assert router.stats == {"replica_reads": 0, "primary_reads": 2, "fallbacks": 2, "checks": 1}
+    assert router.metrics()["replica_healthy"] is False
+
+
+def test_without_replica_reads_primary(engines):
+    primary, _ = engines
+    router = SessionRouter(primary)
+
+    assert read_source(router.read_session()) == "primary"
+    assert router.stats["fallbacks"] == 0
+    assert router.metrics()["replica_configured"] is False
@@ -0,0 +1,109 @@
+# backend/tests/test_settlement.py
+import uuid
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from backend.core import models
+from backend.core.database import Base
+from backend.game_engine.bet_book import BetBook
+from backend.game_engine.settlement import settle_game
+
+STAKE = 100
+CREDIT = 1000
+
+
+@pytest.fixture
+def db(pg_engine):
+    Base.metadata.create_all(pg_engine)
+    session = sessionmaker(bind=pg_engine, autoflush=False, expire_on_commit=False)()
+    yield session
+    session.close()
+
+
+def joined_game(db, count: int):
+    """بازی فعال با count بازیکن که stake هر کدام هنگام پیوستن قفل شده است"""
+    game = models.Game(game_type=models.GameType.CRASH, status=models.GameStatus.ACTIVE, stake=STAKE)
+    users = [models.User(username=f"player-{uuid.uuid4().hex[:12]}", password_hash="x") for _ in range(count)]
+    db.add(game)
+    db.add_all(users)
+    db.flush()
+    for position, user in enumerate(users):
+        db.add(models.Wallet(user_id=user.id, credit=CREDIT - STAKE, locked_credit=STAKE))
+        db.add(models.GamePlayer(game_id=game.id, user_id=user.id, position=position))
+        db.add(models.Transaction(
+            user_id=user.id, amount=STAKE, type=models.TransactionType.GAME_STAKE, reference_id=game.id
+        ))
+    db.commit()
+    return game, [user.id for user in users]
+
+
+def finish(game):
+    game.status = models.GameStatus.COMPLETED
+
+
+def settlement_rows(db, game):
+    rows = db.query(models.Transaction).filter(
+        models.Transaction.reference_id == game.id,
+        models.Transaction.type != models.TransactionType.GAME_STAKE
+    ).all()
+    return {row.user_id: (row.type, row.amount) for row in rows}
+
+
+def test_crash_round_records_net_result_per_player(db):
+    game, players = joined_game(db, 4)
+    winner, partial_loser, full_loser, idle = players
+    bets = BetBook(len(players))
+    bets.set_cashout(bets.place(0, 10), 2.5)
+    bets.place(1, 10)
+    bets.place(2, STAKE)
+    payouts = bets.payouts(STAKE, bets.prizes()).tolist()
+
+    finish(game)
+    assert settle_game(db, game, players, [STAKE] * 4, payouts)
+
+    # یک ردیف برای هر بازیکن با نتیجه خالص؛ شرط قفل شده دوباره به عنوان باخت ثبت نمی‌شود
+    assert settlement_rows(db, game) == {
+        winner: (models.TransactionType.GAME_WIN, Decimal(15)),
+        partial_loser: (models.TransactionType.GAME_LOSS, Decimal(10)),
+        full_loser: (models.TransactionType.GAME_LOSS, Decimal(STAKE)),
+        idle: (models.TransactionType.REFUND, Decimal(STAKE)),
+    }
+    wallets = {wallet.user_id: wallet for wallet in db.query(models.Wallet)}
+    assert {user_id: wallets[user_id].credit for user_id in players} == {
+        winner: CREDIT + 15, partial_loser: CREDIT - 10, full_loser: CREDIT - STAKE, idle: CREDIT
+    }
+    assert all(wallet.locked_credit == 0 for wallet in wallets.values())
+    changes = dict(db.query(models.GamePlayer.user_id, models.GamePlayer.credit_change))
+    assert changes == {winner: 15, partial_loser: -10, full_loser: -STAKE, idle: 0}
+
+    # تسویه دوباره همان بازی (مثلاً پس از resume) چیزی ثبت نمی‌کند
+    assert not settle_game(db, game, players, [STAKE] * 4, payouts)
+    assert len(settlement_rows(db, game)) == 4
+
+
+def test_game_without_bets_is_settled_by_its_refunds(db):
+    game, players = joined_game(db, 2)
+
+    finish(game)
+    assert settle_game(db, game, players, [STAKE, STAKE], [STAKE, STAKE])
+    assert not settle_game(db, game, players, [STAKE, STAKE], [STAKE, STAKE])
+    assert set(settlement_rows(db, game).values()) == {(models.TransactionType.REFUND, Decimal(STAKE))}
+
+
+def test_statement_count_does_not_grow_with_players(db, pg_engine):
+    statements = []
+    event.listen(pg_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    counts = []
+    for size in (3, 300):
+        game, players = joined_game(db, size)
+        statements.clear()
+        finish(game)
+        settle_game(db, game, players, [STAKE] * size, [2 * STAKE if i % 2 else 0 for i in range(size)])
+        counts.append(len(statements))
+
+    # قفل بازی، بررسی تسویه، دو UPDATE دسته‌ای، یک INSERT و به‌روزرسانی ردیف بازی
+    assert counts == [6, 6]
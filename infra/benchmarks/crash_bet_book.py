@@ -0,0 +1,133 @@
+# infra/benchmarks/crash_bet_book.py
+"""بنچمارک حافظه و هزینه پایان دور دفتر شرط Crash
+
+دفتر قبلی (دیکشنری {"amount", "cashout"} برای هر UUID و حلقه Python در
+end_game) همین‌جا بازسازی شده و با BetBook روی همان شرط‌ها مقایسه می‌شود:
+- حافظه هر شرط: tracemalloc برای دفتر قبلی، nbytes ستون‌ها برای BetBook
+- تسویه: جایزه‌ها، مجموع، برنده و مبلغ بازگشتی هر بازیکن
+- payload: ساخت prize_distribution با کلید UUID و لیست‌های ورودی settle_game
+
+جایزه در دفتر قبلی با ضرب float محاسبه می‌شد (int(10 * 2.3) == 22)؛ BetBook
+ضرایب را به صدم صحیح نگه می‌دارد. نتایج هر دو با حساب دقیق مقایسه و تعداد
+جایزه‌های یک واحد کمتر دفتر قبلی گزارش می‌شود. بدون دیتابیس.
+
+    python infra/benchmarks/crash_bet_book.py --bets 50000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+def legacy_end_game(bets: dict, player_ids, stake: int):
+    """حلقه end_game قبلی به همراه مبلغ بازگشتی هر بازیکن"""
+    prize_distribution = {}
+    winner_id = None
+    max_prize = 0
+    for player_id, bet_info in bets.items():
+        if bet_info["cashout"] is not None:
+            prize = int(bet_info["amount"] * bet_info["cashout"])
+            prize_distribution[player_id] = prize
+            if prize > max_prize:
+                max_prize = prize
+                winner_id = player_id
+        else:
+            prize_distribution[player_id] = 0
+    if not winner_id and bets:
+        winner_id = next(iter(bets))
+    prize_pool = sum(prize_distribution.values())
+
+    payouts = dict.fromkeys(player_ids, stake)
+    for player_id, bet_info in bets.items():
+        payouts[player_id] += prize_distribution[player_id] - bet_info["amount"]
+    return prize_distribution, winner_id, prize_pool, payouts
+
+
+def timed(function, repeat: int):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - started) / repeat, result
+
+
+def run(args):
+    from backend.game_engine.bet_book import BetBook, to_cents
+
+    rng = random.Random(args.seed)
+    player_ids = [uuid.uuid4() for _ in range(args.bets)]
+    amounts = [rng.randint(1, args.stake) for _ in range(args.bets)]
+    cashouts = [
+        round(rng.uniform(1.01, 5.0), 2) if rng.random() < args.cashout_ratio else None
+        for _ in range(args.bets)
+    ]
+
+    tracemalloc.start()
+    legacy = {}
+    for player_id, amount, cashout in zip(player_ids, amounts, cashouts):
+        legacy[player_id] = {"amount": amount, "cashout": cashout}
+    legacy_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    book = BetBook(args.bets)
+    for seat, (amount, cashout) in enumerate(zip(amounts, cashouts)):
+        slot = book.place(seat, amount)
+        if cashout is not None:
+            book.set_cashout(slot, cashout)
+
+    legacy_time, (legacy_prizes, legacy_winner, legacy_pool, legacy_payouts) = timed(
+        lambda: legacy_end_game(legacy, player_ids, args.stake), args.repeat
+    )
+
+    def settle():
+        prizes, winner_seat, prize_pool = book.settle()
+        return prizes, winner_seat, prize_pool, book.payouts(args.stake, prizes)
+
+    def payload():
+        prize_distribution = book.prize_distribution(prizes, player_ids)
+        return prize_distribution, payouts.tolist()
+
+    settle_time, (prizes, winner_seat, prize_pool, payouts) = timed(settle, args.repeat)
+    payload_time, (prize_distribution, payout_list) = timed(payload, args.repeat)
+
+    # مرجع دقیق: floor(amount × cents / 100)
+    exact = [
+        amount * to_cents(cashout) // 100 if cashout is not None else 0
+        for amount, cashout in zip(amounts, cashouts)
+    ]
+    assert prize_distribution == dict(zip(player_ids, exact)), "prizes differ from exact arithmetic"
+    assert payout_list == [args.stake - amount + prize for amount, prize in zip(amounts, exact)], "payouts differ"
+    assert prize_pool == sum(exact) and exact[winner_seat] == max(exact), "pool or winner differ"
+    short = sum(exact[seat] - legacy_prizes[player_id] for seat, player_id in enumerate(player_ids))
+    assert legacy_winner is not None and legacy_pool == sum(exact) - short and len(legacy_payouts) == args.bets
+
+    print(f"bet book: {args.bets:,} bets, {sum(cashout is not None for cashout in cashouts):,} cashed out")
+    print(
+        f"  memory   legacy {legacy_bytes / args.bets:6.1f} B/bet   book {book.nbytes / args.bets:6.1f} B/bet "
+        f"{legacy_bytes / book.nbytes:6.1f}x"
+    )
+    print(f"  legacy end_game loop     {legacy_time * 1000:7.2f} ms")
+    print(f"  book settle + payouts    {settle_time * 1000:7.2f} ms  {legacy_time / settle_time:6.1f}x")
+    print(
+        f"  book + payload           {(settle_time + payload_time) * 1000:7.2f} ms  "
+        f"{legacy_time / (settle_time + payload_time):6.1f}x  (UUID-keyed prize_distribution and payout list)"
+    )
+    print(f"  legacy float prizes one unit short: {short:,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crash bet book memory and settlement benchmark")
+    parser.add_argument("--bets", type=int, default=50_000)
+    parser.add_argument("--cashout-ratio", type=float, default=0.5, help="share of bets that cashed out")
+    parser.add_argument("--stake", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
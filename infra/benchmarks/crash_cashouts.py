@@ -0,0 +1,122 @@
+# infra/benchmarks/crash_cashouts.py
+"""بنچمارک هزینه تسویه auto-cashout در هر تیک یک دور Crash
+
+روش قبلی (حلقه تیک و پیمایش همه شرط‌ها در هر تیک) همین‌جا بازسازی شده و
+با heap هدف‌ها در CrashGame.check_cashouts روی همان شرط‌ها مقایسه می‌شود.
+ضریب در گام‌های 0.01x تا نقطه Crash بالا می‌رود؛ مجموعه خروج‌های دو روش
+باید یکسان باشد. تعداد بیدار شدن‌های run_multiplier (هدف‌های متمایز زیر
+نقطه Crash) و هزینه محاسبه جوایز پایان دور هم گزارش می‌شوند. بدون دیتابیس
+و WebSocket.
+
+    python infra/benchmarks/crash_cashouts.py --bets 50000 --crash-point 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+def make_engine(bets: int, stake: int):
+    from backend.core import models, schemas
+    from backend.game_engine.crash import CrashGame
+    from backend.game_engine.simulator import NullSession
+
+    class BenchCrashGame(CrashGame):
+        async def broadcast(self, message):
+            pass
+
+        async def notify_player(self, player_id, message):
+            pass
+
+        def record_event(self, code, *fields):
+            pass
+
+    game = models.Game(id=uuid.uuid4(), game_type=models.GameType.CRASH, status=schemas.GameStatus.ACTIVE, stake=stake)
+    players = [SimpleNamespace(id=uuid.uuid4()) for _ in range(bets)]
+    return BenchCrashGame(NullSession(), game.id, game=game, players=players), players
+
+
+def random_target(rng: random.Random) -> float:
+    """هدف با توزیع دم‌بلند مثل انتخاب بازیکنان: بیشتر بین 1.1x و 3x"""
+    return round(min(1.01 + 0.5 / (1.0 - rng.random()), 100.0), 2)
+
+
+def legacy_check(bets: dict, multiplier: float, crash_point: float) -> int:
+    """پیمایش همه شرط‌ها در هر تیک (روش قبلی)"""
+    settled = 0
+    for bet in bets.values():
+        target = bet["auto_cashout"]
+        if bet["cashout"] is None and target is not None and target <= multiplier and target < crash_point:
+            bet["cashout"] = target
+            settled += 1
+    return settled
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    engine, players = make_engine(args.bets, args.stake)
+    engine.crash_point = args.crash_point
+
+    legacy = {}
+    for player in players:
+        amount = rng.randint(1, args.stake)
+        target = random_target(rng) if rng.random() < args.auto_ratio else None
+        await engine.handle_bet(player.id, {"type": "place_bet", "amount": amount, "auto_cashout": target})
+        legacy[player.id] = {"amount": amount, "auto_cashout": target, "cashout": None}
+
+    steps = [round(1.0 + step / 100, 2) for step in range(1, int(round((args.crash_point - 1.0) * 100)) + 1)]
+    wakeups = len({target for target, _ in engine.auto_cashouts if target < engine.crash_point})
+
+    started = time.perf_counter()
+    for multiplier in steps:
+        legacy_check(legacy, multiplier, engine.crash_point)
+    legacy_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for multiplier in steps:
+        await engine.check_cashouts(multiplier)
+    heap_time = time.perf_counter() - started
+
+    expected = {player_id: bet["cashout"] for player_id, bet in legacy.items() if bet["cashout"] is not None}
+    actual = {
+        players[engine.bets.seat_of(slot)].id: engine.bets.cashout_of(slot)
+        for slot in range(len(engine.bets)) if engine.bets.cashout_of(slot) is not None
+    }
+    assert actual == expected, "settled cashouts differ"
+
+    started = time.perf_counter()
+    prizes, _, _ = engine.bets.settle()
+    engine.bets.payouts(args.stake, prizes)
+    payout_time = time.perf_counter() - started
+
+    print(
+        f"auto-cashout: {args.bets:,} bets, {len(expected):,} settled over {len(steps):,} ticks "
+        f"of 0.01x up to {args.crash_point}x (results identical)"
+    )
+    print(f"  legacy scan   {legacy_time / len(steps) * 1e6:9.1f} us/tick")
+    print(f"  heap          {heap_time / len(steps) * 1e6:9.1f} us/tick  {legacy_time / heap_time:6.1f}x")
+    print(
+        f"  event-driven  {wakeups:,} wakeups instead of {len(steps):,} ticks, "
+        f"{heap_time / max(wakeups, 1) * 1e6:.1f} us/wakeup"
+    )
+    print(f"round payouts: {payout_time * 1000:.1f} ms for {args.bets:,} bets")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crash auto-cashout settlement benchmark")
+    parser.add_argument("--bets", type=int, default=50_000)
+    parser.add_argument("--crash-point", type=float, default=20.0)
+    parser.add_argument("--auto-ratio", type=float, default=0.8, help="share of bets with an auto-cashout target")
+    parser.add_argument("--stake", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
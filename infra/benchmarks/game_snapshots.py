@@ -0,0 +1,150 @@
+# infra/benchmarks/game_snapshots.py
+"""بنچمارک هزینه snapshot موتورهای زنده (بودجه: کمتر از 1 میلی‌ثانیه برای هر بازی)
+
+snapshot پس از هر تغییر وضعیت (هر نوبت Hokm و هر شرط یا خروج Crash)
+گرفته می‌شود، پس هزینه آن روی همان event loop بازی است:
+- Hokm: snapshot در تمام نوبت‌های بازی‌های کامل شبیه‌ساز
+- Crash: snapshot دور با تعداد شرط‌های مختلف (نیمی با هدف auto-cashout)
+
+برای هر snapshot بازگردانی در یک موتور تازه و snapshot دوباره آن با
+بایت‌های اصلی مقایسه می‌شود. اگر p99 هزینه snapshot از بودجه بیشتر شود
+اسکریپت با کد خطا خارج می‌شود. بدون دیتابیس، Redis و WebSocket.
+
+    python infra/benchmarks/game_snapshots.py --hokm-games 200 --crash-bets 100,10000,50000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+def percentiles(samples: list) -> tuple:
+    ordered = sorted(samples)
+    return statistics.median(ordered), ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], ordered[-1]
+
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return time.perf_counter() - started, result
+
+
+async def hokm_snapshots(games: int, seed: int):
+    from backend.core import models, schemas
+    from backend.game_engine.simulator import GreedyPolicy, SimulatedHokmGame, bot_action
+
+    random.seed(seed)
+    policy = GreedyPolicy(random.Random(seed))
+    encode, decode, sizes = [], [], []
+    for _ in range(games):
+        players = [models.User(id=uuid.uuid4(), username=f"bot{seat}") for seat in range(4)]
+        game = models.Game(id=uuid.uuid4(), game_type=schemas.GameType.HOKM, status=schemas.GameStatus.WAITING, stake=0)
+        engine = SimulatedHokmGame(game, players)
+        await engine.start_game()
+        while engine.game.status != schemas.GameStatus.COMPLETED:
+            elapsed, data = timed(engine.snapshot)
+            encode.append(elapsed)
+            sizes.append(len(data))
+
+            copy = SimulatedHokmGame(game, players)
+            elapsed, _ = timed(lambda: copy.restore(data))
+            decode.append(elapsed)
+            assert copy.snapshot() == data, "hokm snapshot round trip differs"
+
+            player_id, prompt_type = engine.prompt
+            engine.prompt = None
+            await engine.handle_player_action(player_id, bot_action(policy, engine, player_id, prompt_type))
+    return encode, decode, sizes
+
+
+def crash_engine(players: list):
+    from backend.core import models, schemas
+    from backend.game_engine.crash import CrashGame
+    from backend.game_engine.simulator import NullSession
+
+    class BenchCrashGame(CrashGame):
+        async def broadcast(self, message):
+            pass
+
+        async def notify_player(self, player_id, message):
+            pass
+
+        def record_event(self, code, *fields):
+            pass
+
+    game = models.Game(id=uuid.uuid4(), game_type=models.GameType.CRASH, status=schemas.GameStatus.ACTIVE, stake=1000)
+    return BenchCrashGame(NullSession(), game.id, game=game, players=players)
+
+
+async def crash_snapshots(bets: int, repeat: int, seed: int):
+    rng = random.Random(seed)
+    players = [SimpleNamespace(id=uuid.uuid4()) for _ in range(bets)]
+    engine = crash_engine(players)
+    engine.seed_index, engine.server_seed, engine.crash_point = 1, os.urandom(32), 20.0
+    for player in players:
+        target = round(rng.uniform(1.01, 10.0), 2) if rng.random() < 0.5 else None
+        await engine.handle_bet(player.id, {"type": "place_bet", "amount": rng.randint(1, 1000), "auto_cashout": target})
+    await engine.check_cashouts(3.0)
+
+    encode, decode = [], []
+    for _ in range(repeat):
+        elapsed, data = timed(engine.snapshot)
+        encode.append(elapsed)
+        copy = crash_engine(players)
+        elapsed, _ = timed(lambda: copy.restore(data))
+        decode.append(elapsed)
+    assert copy.snapshot() == data and sorted(copy.auto_cashouts) == sorted(engine.auto_cashouts), \
+        "crash snapshot round trip differs"
+    return encode, decode, len(data)
+
+
+def report(label: str, encode: list, decode: list, size: str) -> float:
+    p50, p99, worst = percentiles(encode)
+    restore_p50, restore_p99, _ = percentiles(decode)
+    print(
+        f"  {label:<16} {size:>10}  snapshot p50 {p50 * 1e6:7.1f} us  p99 {p99 * 1e6:7.1f} us  "
+        f"max {worst * 1e6:7.1f} us   restore p50 {restore_p50 * 1e6:8.1f} us  p99 {restore_p99 * 1e6:8.1f} us"
+    )
+    return p99
+
+
+async def run(args) -> bool:
+    budget = args.budget_ms / 1000
+    within = True
+    print(f"engine snapshot cost (budget p99 < {args.budget_ms} ms per game)")
+
+    encode, decode, sizes = await hokm_snapshots(args.hokm_games, args.seed)
+    label = f"hokm x{args.hokm_games}"
+    within &= report(label, encode, decode, f"{max(sizes)} B max") < budget
+
+    for bets in args.crash_bets:
+        encode, decode, size = await crash_snapshots(bets, args.repeat, args.seed)
+        within &= report(f"crash {bets:,} bets", encode, decode, f"{size:,} B") < budget
+
+    print("within budget" if within else "OVER BUDGET")
+    return within
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live engine snapshot cost benchmark")
+    parser.add_argument("--hokm-games", type=int, default=200)
+    parser.add_argument(
+        "--crash-bets", type=lambda value: [int(part) for part in value.split(",")],
+        default=[100, 10_000, 50_000], help="comma separated bet counts"
+    )
+    parser.add_argument("--repeat", type=int, default=200, help="snapshots per crash round")
+    parser.add_argument("--budget-ms", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=1)
+    if not asyncio.run(run(parser.parse_args())):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
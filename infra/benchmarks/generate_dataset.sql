@@ -0,0 +1,54 @@
+-- infra/benchmarks/generate_dataset.sql
+-- داده آزمایشی برای مقایسه plan کوئری‌ها قبل و بعد از مهاجرت‌های 0002 و 0003
+--
+-- ترتیب اجرا روی یک دیتابیس خالی:
+--   alembic upgrade 0001
+--   psql -f infra/benchmarks/generate_dataset.sql
+--   psql -f infra/benchmarks/query_plans.sql > before.txt
+--   alembic upgrade head
+--   psql -f infra/benchmarks/query_plans.sql > after.txt
+--
+-- اندازه: 1M کاربر، 50M تراکنش در 24 ماه گذشته، 5M بازی، 15M ردیف game_players
+-- برای داده کوچک‌تر: psql -v scale=0.1 -f ... (تعداد همه ردیف‌ها ضرب در scale)
+
+\if :{?scale}
+\else
+\set scale 1
+\endif
+\timing on
+SET synchronous_commit = off;
+
+INSERT INTO users (id, username, password_hash, is_active, is_verified, created_at)
+SELECT md5('user' || i)::uuid, 'user' || i, 'x', i % 50 <> 0, true,
+       now() - (random() * interval '730 days')
+FROM generate_series(1, (1000000 * :scale)::int) AS i;
+
+INSERT INTO wallets (user_id, credit, real_balance, locked_credit)
+SELECT id, 100, 0, 0 FROM users;
+
+INSERT INTO transactions (id, user_id, amount, type, description, created_at, reference_id)
+SELECT gen_random_uuid(),
+       md5('user' || (1 + (random() * (1000000 * :scale - 1))::int))::uuid,
+       (random() * 100000)::numeric(15, 2),
+       (ARRAY['DEPOSIT', 'WITHDRAWAL', 'GAME_STAKE', 'GAME_WIN', 'GAME_LOSS', 'COMMISSION'])
+           [1 + (random() * 5)::int]::transactiontype,
+       CASE WHEN random() < 0.01 THEN 'Deposit request pending' ELSE NULL END,
+       now() - (random() * interval '730 days'),
+       CASE WHEN random() < 0.6 THEN gen_random_uuid() ELSE NULL END
+FROM generate_series(1, (50000000 * :scale)::int);
+
+INSERT INTO games (id, game_type, status, stake, created_at, completed_at)
+SELECT md5('game' || i)::uuid,
+       (ARRAY['CRASH', 'HOKM'])[1 + (i % 2)]::gametype,
+       CASE WHEN i % 100 = 0 THEN 'WAITING'::gamestatus
+            WHEN i % 250 = 0 THEN 'ACTIVE'::gamestatus
+            ELSE 'COMPLETED'::gamestatus END,
+       100, g.created_at, g.created_at + interval '5 minutes'
+FROM generate_series(1, (5000000 * :scale)::int) AS i,
+     LATERAL (SELECT now() - (random() * interval '730 days') AS created_at) AS g;
+
+INSERT INTO game_players (game_id, user_id, joined_at, position, credit_change)
+SELECT md5('game' || g)::uuid, md5('user' || ((g * 3 + p) % (1000000 * :scale)::int + 1))::uuid, now(), p, 0
+FROM generate_series(1, (5000000 * :scale)::int) AS g, generate_series(0, 2) AS p;
+
+VACUUM ANALYZE;
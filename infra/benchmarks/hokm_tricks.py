@@ -0,0 +1,129 @@
+# infra/benchmarks/hokm_tricks.py
+"""بنچمارک تعیین برنده دست و حرکت‌های مجاز Hokm
+
+پیاده‌سازی قبلی (اشیاء Card، تبدیل رشته به کارت در هر مقایسه و
+rank_order.index) برای مقایسه همین‌جا بازسازی شده و با جدول قدرت و
+ماسک‌های بیتی cards.py روی همان دست‌های تصادفی اندازه گرفته می‌شود.
+نتیجه هر دو روش روی تمام دست‌ها مقایسه می‌شود. در پایان تعداد بازی کامل
+در ثانیه با شبیه‌ساز (بدون دیتابیس و WebSocket) گزارش می‌شود.
+
+    python infra/benchmarks/hokm_tricks.py --tricks 200000 --games 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.game_engine.cards import (  # noqa: E402
+    CARD_STR, DECK_SIZE, Rank, Suit, SUITS, hand_cards, legal_moves, parse_card, trick_winner
+)
+
+LEGACY_SUITS = {"h": Suit.HEARTS, "d": Suit.DIAMONDS, "c": Suit.CLUBS, "s": Suit.SPADES}
+LEGACY_RANK_ORDER = list(Rank)
+
+
+class LegacyCard:
+    def __init__(self, suit: Suit, rank: Rank):
+        self.suit = suit
+        self.rank = rank
+
+
+def legacy_parse(card_str: str) -> LegacyCard:
+    return LegacyCard(LEGACY_SUITS[card_str[-1].lower()], Rank(card_str[:-1]))
+
+
+def legacy_compare(rank1: Rank, rank2: Rank) -> int:
+    return LEGACY_RANK_ORDER.index(rank1) - LEGACY_RANK_ORDER.index(rank2)
+
+
+def legacy_winner(played: list, trump: Suit) -> int:
+    """همان منطق _determine_round_winner قبلی روی رشته‌های کارت"""
+    first_card = legacy_parse(played[0])
+    leading_suit = first_card.suit
+    winning_card = first_card
+    winning_index = 0
+    for index, card_str in enumerate(played[1:], start=1):
+        card = legacy_parse(card_str)
+        if card.suit == trump:
+            if winning_card.suit != trump or legacy_compare(card.rank, winning_card.rank) > 0:
+                winning_card = card
+                winning_index = index
+        elif card.suit == leading_suit and winning_card.suit != trump:
+            if legacy_compare(card.rank, winning_card.rank) > 0:
+                winning_card = card
+                winning_index = index
+    return winning_index
+
+
+def legacy_legal(hand: list, lead: Suit) -> list:
+    follow = [card for card in hand if card.suit == lead]
+    return follow or hand
+
+
+def timed(function, *args) -> tuple:
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def run_tricks(count: int, rng: random.Random):
+    tricks = [(rng.sample(range(DECK_SIZE), 4), rng.randrange(4)) for _ in range(count)]
+    strings = [([CARD_STR[card] for card in cards], SUITS[trump]) for cards, trump in tricks]
+
+    legacy, legacy_time = timed(lambda: [legacy_winner(played, trump) for played, trump in strings])
+    table, table_time = timed(lambda: [trick_winner(cards, trump) for cards, trump in tricks])
+    parsed, parsed_time = timed(
+        lambda: [trick_winner([parse_card(card) for card in played], SUITS.index(trump)) for played, trump in strings]
+    )
+    assert legacy == table == parsed, "trick winners differ"
+
+    print(f"trick winner: {count:,} tricks (all results identical)")
+    for label, elapsed in (("legacy", legacy_time), ("table", table_time), ("parse+table", parsed_time)):
+        print(f"  {label:<12} {elapsed / count * 1e6:6.2f} us/trick  {legacy_time / elapsed:5.1f}x")
+
+
+def run_legal_moves(count: int, rng: random.Random):
+    hands = []
+    for _ in range(count):
+        cards = rng.sample(range(DECK_SIZE), rng.randint(1, 13))
+        hands.append((sum(1 << card for card in cards), rng.randrange(4)))
+    legacy_hands = [([legacy_parse(CARD_STR[card]) for card in hand_cards(mask)], SUITS[lead]) for mask, lead in hands]
+
+    legacy, legacy_time = timed(lambda: [legacy_legal(hand, lead) for hand, lead in legacy_hands])
+    masks, mask_time = timed(lambda: [legal_moves(mask, lead) for mask, lead in hands])
+    assert [len(moves) for moves in legacy] == [bin(mask).count("1") for mask in masks], "legal moves differ"
+
+    print(f"legal moves: {count:,} hands (all results identical)")
+    for label, elapsed in (("legacy", legacy_time), ("bitmask", mask_time)):
+        print(f"  {label:<12} {elapsed / count * 1e6:6.2f} us/hand   {legacy_time / elapsed:5.1f}x")
+
+
+def run_games(count: int, seed: int):
+    from backend.game_engine.simulator import run_games as simulate
+
+    result, elapsed = timed(simulate, count, seed, ["greedy", "random", "greedy", "random"])
+    print(
+        f"self-play: {result['games']:,} games, {result['tricks']:,} tricks in {elapsed:.2f}s "
+        f"({result['games'] / elapsed:,.0f} games/s, one process)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hokm trick resolution benchmark")
+    parser.add_argument("--tricks", type=int, default=200_000)
+    parser.add_argument("--games", type=int, default=2000, help="self-play games (0 to skip)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    run_tricks(args.tricks, rng)
+    run_legal_moves(args.tricks, rng)
+    if args.games:
+        run_games(args.games, args.seed)
+
+
+if __name__ == "__main__":
+    main()
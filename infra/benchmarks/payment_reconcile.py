@@ -0,0 +1,134 @@
+# infra/benchmarks/payment_reconcile.py
+"""بنچمارک تطبیق پرداخت‌های معلق در برابر یک درگاه آزمایشی محلی
+
+درگاه آزمایشی endpointهای verify زرین‌پال و IDPay را با تأخیر ثابت
+پاسخ می‌دهد؛ بخشی از پرداخت‌ها رد و بخشی با 503 (خطای گذرا) پاسخ
+داده می‌شوند تا مسیر تلاش دوباره هم اندازه‌گیری شود. بدون دیتابیس:
+فقط verify_all اندازه گرفته می‌شود.
+
+    python infra/benchmarks/payment_reconcile.py --payments 5000 --latency 0.1
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import sys
+import time
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def gateway_app(latency: float, failure_rate: float, error_rate: float):
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    async def outcome():
+        await asyncio.sleep(latency)
+        roll = random.random()
+        if roll < error_rate:
+            return "error"
+        return "failed" if roll < error_rate + failure_rate else "success"
+
+    async def zarinpal_verify(request: Request):
+        data = await request.json()
+        result = await outcome()
+        if result == "error":
+            return JSONResponse({"errors": "unavailable"}, status_code=503)
+        if result == "failed":
+            return JSONResponse({"data": [], "errors": {"code": -51, "message": "Payment failed"}})
+        return JSONResponse({"data": {"code": 100, "ref_id": random.randint(1, 10**9), "amount": data["amount"]}, "errors": []})
+
+    async def idpay_verify(request: Request):
+        data = await request.json()
+        result = await outcome()
+        if result == "error":
+            return JSONResponse({"error_message": "unavailable"}, status_code=503)
+        if result == "failed":
+            return JSONResponse({"status": 7, "message": "Payment canceled"})
+        return JSONResponse({"status": 100, "track_id": random.randint(1, 10**9), "amount": 10000, "id": data["id"]})
+
+    return Starlette(routes=[
+        Route("/zarinpal/payment/verify.json", zarinpal_verify, methods=["POST"]),
+        Route("/idpay/payment/verify", idpay_verify, methods=["POST"]),
+    ])
+
+
+async def run(args):
+    import uvicorn
+
+    port = free_port()
+    os.environ["ZARINPAL_BASE_URL"] = f"http://127.0.0.1:{port}/zarinpal"
+    os.environ["IDPAY_BASE_URL"] = f"http://127.0.0.1:{port}/idpay"
+    from backend.payment_gateway.reconciler import PaymentReconciler, PendingPayment
+
+    server = uvicorn.Server(uvicorn.Config(
+        gateway_app(args.latency, args.failure_rate, args.error_rate),
+        host="127.0.0.1", port=port, log_level="warning", backlog=4096
+    ))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    payments = [
+        PendingPayment(
+            uuid.uuid4(), datetime.utcnow(), Decimal(10000),
+            "zarinpal" if index % 3 else "idpay", str(uuid.uuid4()), 0
+        )
+        for index in range(args.payments)
+    ]
+    reconciler = PaymentReconciler(
+        concurrency=args.concurrency,
+        provider_concurrency={"zarinpal": args.provider_concurrency, "idpay": args.provider_concurrency},
+        retry_delay=0.05
+    )
+
+    try:
+        if args.serial:
+            serial = PaymentReconciler(concurrency=1, provider_concurrency={"zarinpal": 1, "idpay": 1}, retry_delay=0.05)
+            sample = payments[:args.serial]
+            started = time.perf_counter()
+            await serial.verify_all(sample)
+            elapsed = time.perf_counter() - started
+            print(f"serial:     {len(sample)} payments in {elapsed:.2f}s = {len(sample) * 60 / elapsed:,.0f}/min")
+
+        started = time.perf_counter()
+        results = await reconciler.verify_all(payments)
+        elapsed = time.perf_counter() - started
+        counts = {}
+        for result in results:
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+        print(
+            f"concurrent: {len(payments)} payments in {elapsed:.2f}s = {len(payments) * 60 / elapsed:,.0f}/min "
+            f"(concurrency {args.concurrency}, per provider {args.provider_concurrency}) {counts}"
+        )
+    finally:
+        server.should_exit = True
+        await serving
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pending payment reconciliation benchmark")
+    parser.add_argument("--payments", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.1, help="gateway response time (seconds)")
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--provider-concurrency", type=int, default=50)
+    parser.add_argument("--serial", type=int, default=50, help="payments to verify one at a time for comparison (0 to skip)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+-- infra/benchmarks/query_plans.sql
+-- plan کوئری‌های داشبورد، پنل ادمین و وظایف زمان‌بندی شده (نحوه اجرا در generate_dataset.sql)
+
+\pset pager off
+
+-- list_transactions با فیلتر کاربر
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM transactions WHERE user_id = md5('user42')::uuid
+ORDER BY created_at DESC LIMIT 100;
+
+-- list_transactions با بازه زمانی
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM transactions
+WHERE created_at >= now() - interval '7 days' AND created_at <= now()
+ORDER BY created_at DESC LIMIT 100;
+
+-- get_recent_activity: آخرین تراکنش‌ها
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM transactions WHERE created_at >= now() - interval '7 days'
+ORDER BY created_at DESC LIMIT 10;
+
+-- get_system_stats: جمع واریزها
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT coalesce(sum(amount), 0) FROM transactions WHERE type = 'DEPOSIT';
+
+-- check_pending_payments
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM transactions
+WHERE type = 'DEPOSIT' AND created_at < now() - interval '1 hour'
+  AND created_at >= now() - interval '2 days' AND description LIKE '%pending%';
+
+-- is_settled (تسویه تکراری بازی)
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT id FROM transactions
+WHERE reference_id = md5('game42')::uuid AND type IN ('GAME_WIN', 'GAME_LOSS') LIMIT 1;
+
+-- cleanup_old_games: بازی‌های تکمیل شده و رها شده
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT id FROM games WHERE status = 'COMPLETED' AND completed_at < now() - interval '7 days';
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT id FROM games
+WHERE status IN ('WAITING', 'ACTIVE') AND created_at < now() - interval '7 days';
+
+-- list_games با فیلتر وضعیت
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM games WHERE status = 'ACTIVE' ORDER BY created_at DESC LIMIT 100;
+
+-- get_user_activity_report: آخرین بازی‌های کاربر
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT g.* FROM games g JOIN game_players gp ON gp.game_id = g.id
+WHERE gp.user_id = md5('user42')::uuid ORDER BY g.created_at DESC LIMIT 5;
+
+-- get_recent_activity: کاربران جدید
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT count(*) FROM users WHERE created_at >= now() - interval '7 days';
@@ -0,0 +1,143 @@
+# infra/benchmarks/ws_broadcast.py
+"""بنچمارک پخش پیام ConnectionManager به 1k و 10k اتصال
+
+اتصال‌ها WebSocketهای درون‌حافظه‌ای هستند که هر ارسال را با تأخیر ثابت
+(شبیه‌سازی شبکه) انجام می‌دهند؛ بخشی از آن‌ها کند هستند و هرگز پاسخ
+نمی‌دهند. دو عدد گزارش می‌شود: زمان fan-out (قرار دادن فریم در صف‌ها،
+همان زمانی که موتور بازی منتظر می‌ماند) و زمان تحویل کامل به همه
+کلاینت‌های سالم. برای مقایسه، ارسال ترتیبی await به await (روش قبلی
+broadcast) هم روی نمونه کوچک‌تری اندازه گرفته می‌شود.
+
+    python infra/benchmarks/ws_broadcast.py --connections 1000 10000 --messages 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+class FakeWebSocket:
+    """WebSocket درون‌حافظه‌ای با تأخیر ارسال ثابت؛ نمونه کند هیچ‌وقت ارسال را تمام نمی‌کند"""
+
+    def __init__(self, latency: float, slow: bool = False):
+        self.latency = latency
+        self.slow = slow
+        self.received = 0
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def _send(self):
+        if self.slow:
+            await asyncio.sleep(3600)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.received += 1
+
+    async def send_text(self, text: str):
+        await self._send()
+
+    async def send_bytes(self, data: bytes):
+        await self._send()
+
+
+def message(index: int) -> dict:
+    return {
+        "type": "game_state",
+        "round": index,
+        "players": [{"id": str(uuid.uuid4()), "score": seat * 10} for seat in range(4)],
+        "message": "Round update"
+    }
+
+
+async def run_manager(connections: int, messages: int, latency: float, slow_ratio: float, encoding: str):
+    from backend.notification.websocket import ConnectionManager
+
+    manager = ConnectionManager(send_queue_size=max(messages * 2, 256), send_timeout=1.0)
+    game_id = uuid.uuid4()
+    sockets = {}
+    slow_every = int(1 / slow_ratio) if slow_ratio else 0
+    for index in range(connections):
+        websocket = FakeWebSocket(latency, slow=bool(slow_every) and index % slow_every == 0)
+        connection_id = uuid.uuid4()
+        await manager.connect(websocket, uuid.uuid4(), connection_id, encoding)
+        manager.join_game(connection_id, game_id)
+        sockets[connection_id] = websocket
+    healthy = {connection_id: websocket for connection_id, websocket in sockets.items() if not websocket.slow}
+
+    started = time.perf_counter()
+    fan_out = 0.0
+    for index in range(messages):
+        before = time.perf_counter()
+        await manager.send_to_game(game_id, message(index))
+        fan_out += time.perf_counter() - before
+    # کلاینت سالمی که به خاطر timeout ارسال قطع شده دیگر چیزی دریافت نمی‌کند
+    while any(
+        websocket.received < messages and connection_id in manager.active_connections
+        for connection_id, websocket in healthy.items()
+    ):
+        await asyncio.sleep(0.005)
+    delivered = time.perf_counter() - started
+    frames = sum(websocket.received for websocket in healthy.values())
+    dropped = sum(connection_id not in manager.active_connections for connection_id in healthy)
+
+    writers = list(manager.writers.values())
+    for connection_id in list(manager.active_connections):
+        manager.disconnect(connection_id)
+    await asyncio.gather(*writers, return_exceptions=True)
+    return fan_out, delivered, len(healthy), frames, dropped
+
+
+async def run_sequential(connections: int, messages: int, latency: float):
+    """روش قبلی: ارسال به اتصال‌ها یکی پس از دیگری با سریالایز جدا برای هر کدام"""
+    import json
+
+    sockets = [FakeWebSocket(latency) for _ in range(connections)]
+    started = time.perf_counter()
+    for index in range(messages):
+        payload = message(index)
+        for websocket in sockets:
+            await websocket.send_text(json.dumps(payload))
+    return time.perf_counter() - started
+
+
+async def run(args):
+    for connections in args.connections:
+        fan_out, delivered, healthy, frames, dropped = await run_manager(
+            connections, args.messages, args.latency, args.slow_ratio, args.encoding
+        )
+        print(
+            f"manager    {connections:>6} connections: fan-out {fan_out / args.messages * 1000:7.2f} ms/message, "
+            f"delivered {frames:,} frames to {healthy} healthy clients in {delivered:.2f}s "
+            f"({frames / delivered:,.0f} frames/s, {dropped} healthy clients dropped)"
+        )
+        if args.sequential:
+            sample = min(connections, args.sequential)
+            elapsed = await run_sequential(sample, args.messages, args.latency)
+            per_message = elapsed / args.messages * connections / sample
+            print(
+                f"sequential {connections:>6} connections: {per_message * 1000:7.2f} ms/message "
+                f"(measured on {sample} connections and scaled)"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket broadcast benchmark")
+    parser.add_argument("--connections", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.002, help="per-send latency of each client (seconds)")
+    parser.add_argument("--slow-ratio", type=float, default=0.01, help="fraction of clients that never finish a send")
+    parser.add_argument("--encoding", choices=["json", "compact"], default="json")
+    parser.add_argument("--sequential", type=int, default=200, help="connections for the sequential baseline (0 to skip)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
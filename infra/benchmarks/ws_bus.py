@@ -0,0 +1,175 @@
+# infra/benchmarks/ws_bus.py
+"""تست بار bus پیام‌های WebSocket بین workerها روی Redis
+
+چند RedisMessageBus (هر کدام با ConnectionManager و اتصال‌های درون‌حافظه‌ای
+خودش، مثل workerهای جدا) به یک Redis وصل می‌شوند. worker اول پیام‌های یک
+بازی را در دورهای چندتایی (مثل tickهای موتور بازی) می‌فرستد و تأخیر رسیدن
+هر پیام به کلاینت‌های workerهای دیگر اندازه گرفته می‌شود؛ تعداد PUBLISHها
+نشان می‌دهد batch شدن پیام‌های یک دور event loop چقدر کار Redis را کم می‌کند.
+در پایان رفت و برگشت request/response کانال‌های مستقیم (مسیر ارسال عمل
+بازیکن به worker مالک بازی) هم اندازه گرفته می‌شود.
+
+    python infra/benchmarks/ws_bus.py --redis-url redis://localhost:6379 --workers 4 --messages 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+class FakeWebSocket:
+    """WebSocket درون‌حافظه‌ای؛ اتصال probe تأخیر هر پیام را از زمان ارسال داخل آن حساب می‌کند"""
+
+    def __init__(self, latencies: Optional[list] = None):
+        self.latencies = latencies
+        self.received = 0
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, text: str):
+        if self.latencies is not None:
+            self.latencies.append(time.perf_counter() - json.loads(text)["sent"])
+        self.received += 1
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def start_workers(args, channel: str):
+    import redis.asyncio as aioredis
+    from backend.notification.bus import RedisMessageBus
+    from backend.notification.websocket import ConnectionManager
+
+    game_id = uuid.uuid4()
+    workers = []
+    for index in range(args.workers):
+        manager = ConnectionManager(send_queue_size=args.messages + 16)
+        bus = RedisMessageBus(manager, channel=channel, redis=aioredis.from_url(args.redis_url, decode_responses=True))
+        latencies = []
+        sockets = []
+        for position in range(args.connections):
+            websocket = FakeWebSocket(latencies if position == 0 else None)
+            connection_id = uuid.uuid4()
+            await manager.connect(websocket, uuid.uuid4(), connection_id)
+            manager.join_game(connection_id, game_id)
+            sockets.append(websocket)
+
+        async def echo(data, worker=index):
+            return {"worker": worker, "seq": data["seq"]}
+
+        bus.serve(f"bench-{index}", "echo", echo)
+        bus.start()
+        workers.append((bus, manager, sockets, latencies))
+
+    # پیش از ارسال همه workerها باید در هر دو کانال subscribe شده باشند
+    client = await workers[0][0]._client()
+    while (await client.pubsub_numsub(channel))[0][1] < args.workers:
+        await asyncio.sleep(0.01)
+    for bus, _, _, _ in workers:
+        while (await client.pubsub_numsub(bus.direct_channel(bus.inbox)))[0][1] < 1:
+            await asyncio.sleep(0.01)
+    return game_id, workers
+
+
+async def run_broadcast(args, game_id, workers):
+    sender = workers[0][1]
+    remote = [websocket for _, _, sockets, _ in workers[1:] for websocket in sockets]
+    started = time.perf_counter()
+    sent = 0
+    while sent < args.messages:
+        for _ in range(min(args.burst, args.messages - sent)):
+            await sender.send_to_game(game_id, {"type": "game_state", "seq": sent, "sent": time.perf_counter()})
+            sent += 1
+        await asyncio.sleep(args.interval)
+    deadline = time.perf_counter() + args.drain_timeout
+    while any(websocket.received < args.messages for websocket in remote) and time.perf_counter() < deadline:
+        await asyncio.sleep(0.005)
+    elapsed = time.perf_counter() - started
+
+    latencies = [value for _, _, _, values in workers[1:] for value in values]
+    stats = workers[0][0].stats
+    delivered = sum(websocket.received for websocket in remote)
+    print(
+        f"broadcast: {args.messages} messages from 1 of {args.workers} workers, "
+        f"{delivered:,}/{len(remote) * args.messages:,} remote frames in {elapsed:.2f}s "
+        f"({args.messages / elapsed:,.0f} messages/s)"
+    )
+    print(
+        f"  {stats['batches']} PUBLISH for {stats['published']} messages "
+        f"({stats['published'] / max(stats['batches'], 1):.1f} per batch, burst {args.burst})"
+    )
+    if latencies:
+        print(
+            f"  remote delivery latency p50 {statistics.median(latencies) * 1000:.2f} ms, "
+            f"p99 {percentile(latencies, 0.99) * 1000:.2f} ms, max {max(latencies) * 1000:.2f} ms"
+        )
+
+
+async def run_requests(args, workers):
+    limit = asyncio.Semaphore(args.request_concurrency)
+    timings = []
+
+    async def one(seq: int):
+        source = workers[seq % len(workers)][0]
+        target = workers[(seq + 1) % len(workers)][0]
+        async with limit:
+            before = time.perf_counter()
+            reply = await source.request(target.inbox, "echo", {"seq": seq})
+            timings.append(time.perf_counter() - before)
+        assert reply["seq"] == seq
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(seq) for seq in range(args.requests)))
+    elapsed = time.perf_counter() - started
+    print(
+        f"requests: {args.requests} cross-worker round trips in {elapsed:.2f}s "
+        f"({args.requests / elapsed:,.0f}/s, concurrency {args.request_concurrency}), "
+        f"p50 {statistics.median(timings) * 1000:.2f} ms, p99 {percentile(timings, 0.99) * 1000:.2f} ms"
+    )
+
+
+async def run(args):
+    channel = f"ws:bench:{uuid.uuid4().hex[:8]}"
+    game_id, workers = await start_workers(args, channel)
+    try:
+        await run_broadcast(args, game_id, workers)
+        if args.requests:
+            await run_requests(args, workers)
+    finally:
+        for bus, manager, _, _ in workers:
+            await bus.stop()
+            writers = list(manager.writers.values())
+            for connection_id in list(manager.active_connections):
+                manager.disconnect(connection_id)
+            await asyncio.gather(*writers, return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-worker WebSocket bus load test")
+    parser.add_argument("--redis-url", default=os.environ.get("REDIS_URL", "redis://localhost:6379"))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--connections", type=int, default=100, help="connections per worker")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--burst", type=int, default=20, help="messages sent per event loop iteration")
+    parser.add_argument("--interval", type=float, default=0.02, help="pause between bursts (seconds)")
+    parser.add_argument("--drain-timeout", type=float, default=60, help="max wait for remote delivery (seconds)")
+    parser.add_argument("--requests", type=int, default=2000, help="cross-worker requests (0 to skip)")
+    parser.add_argument("--request-concurrency", type=int, default=50)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# infra/benchmarks/ws_codec.py
+"""بنچمارک بایت و CPU فرمت‌های پیام WebSocket
+
+سه مسیر برای همان پیام‌ها مقایسه می‌شوند:
+- send_json: روش قبلی؛ json.dumps جدا برای هر اتصال (مثل WebSocket.send_json)
+- json: EncodedMessage که متن JSON را یک بار برای همه گیرندگان می‌سازد
+- compact: CompactCodec هر اتصال (فریم باینری پیام‌های پرواز Crash و تغییرات دست Hokm)
+
+پیام‌ها یک دور Crash (flight_started و crashed برای همه بازیکنان) و نوبت‌های
+یک دست Hokm (your_turn با کل دست بازیکن) هستند.
+
+    python infra/benchmarks/ws_codec.py --players 5000 --rounds 20
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+SUITS = "HDCS"
+RANKS = ["2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K", "A"]
+
+
+def crash_round(rng: random.Random) -> list:
+    return [
+        {"type": "flight_started", "started_at": time.time(), "growth_rate": 0.06},
+        {"type": "crashed", "crash_point": round(rng.uniform(1.0, 20.0), 2)},
+    ]
+
+
+def hokm_turns(rng: random.Random) -> list:
+    """پیام‌های your_turn یک بازیکن در 13 دور یک دست"""
+    deck = [rank + suit for suit in SUITS for rank in RANKS]
+    rng.shuffle(deck)
+    hand = sorted(deck[:13])
+    messages = []
+    for trick in range(13):
+        played = rng.sample(deck[13:], rng.randint(0, 3))
+        messages.append({
+            "type": "your_turn",
+            "message": "It's your turn to play",
+            "your_hand": list(hand),
+            "played_cards": played,
+            "trump_suit": "hearts",
+            "leading_suit": played[0][-1].lower() if played else None
+        })
+        hand.remove(rng.choice(hand))
+    return messages
+
+
+def send_json_path(messages: list, connections: int) -> int:
+    total = 0
+    for message in messages:
+        for _ in range(connections):
+            total += len(json.dumps(message, separators=(",", ":"), ensure_ascii=False).encode())
+    return total
+
+
+def frame_size(frame) -> int:
+    return len(frame) if isinstance(frame, bytes) else len(frame.encode())
+
+
+def codec_path(messages: list, codecs: list) -> int:
+    from backend.notification.codec import EncodedMessage
+
+    total = 0
+    for message in messages:
+        payload = EncodedMessage(message)
+        for codec in codecs:
+            total += frame_size(codec.encode(payload))
+    return total
+
+
+def measure(label: str, run) -> tuple:
+    started = time.process_time()
+    total = run()
+    return label, total, time.process_time() - started
+
+
+def report(title: str, frames: int, results: list):
+    print(f"{title}: {frames:,} frames")
+    baseline = results[0][1]
+    for label, total, cpu in results:
+        print(
+            f"  {label:<9} {total / frames:8.1f} bytes/frame  {total / baseline:6.1%} of send_json  "
+            f"{cpu / frames * 1e6:6.2f} us/frame CPU"
+        )
+
+
+def main():
+    from backend.notification.codec import JSON_CODEC, make_codec, ENCODING_COMPACT
+
+    parser = argparse.ArgumentParser(description="WebSocket encoding benchmark")
+    parser.add_argument("--players", type=int, default=5000, help="crash players receiving each message")
+    parser.add_argument("--rounds", type=int, default=20, help="crash rounds and Hokm hands")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    crash = [message for _ in range(args.rounds) for message in crash_round(rng)]
+    frames = len(crash) * args.players
+    compact = [make_codec(ENCODING_COMPACT) for _ in range(args.players)]
+    report("crash", frames, [
+        measure("send_json", lambda: send_json_path(crash, args.players)),
+        measure("json", lambda: codec_path(crash, [JSON_CODEC] * args.players)),
+        measure("compact", lambda: codec_path(crash, compact)),
+    ])
+
+    # هر دست برای یک بازیکن و codec تازه (اولین نوبت کل دست را می‌فرستد)
+    hands = [hokm_turns(rng) for _ in range(args.rounds * 50)]
+    frames = sum(len(hand) for hand in hands)
+    report("hokm your_turn", frames, [
+        measure("send_json", lambda: sum(send_json_path(hand, 1) for hand in hands)),
+        measure("json", lambda: sum(codec_path(hand, [JSON_CODEC]) for hand in hands)),
+        measure("compact", lambda: sum(codec_path(hand, [make_codec(ENCODING_COMPACT)]) for hand in hands)),
+    ])
+
+
+if __name__ == "__main__":
+    main()